@@ -1,8 +1,4 @@
-import matplotlib.pyplot as plt
 import math
-from numpy.lib.financial import irr
-from sklearn import metrics
-from scipy.integrate import odeint
 import numpy as np
 
 """ ------ SIMULACIÓN DINÁMICA: FILTRACIÓN EN UN TAMBOR ROTATORIO DE VACÍO ------ """
@@ -0,0 +1,316 @@
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import numpy as np
+
+import bx_calc
+import cycle
+import results_store
+
+""" ------ CORRIDA POR LOTES DE ESCENARIOS DESDE ARCHIVO ------ """
+### Lee escenarios (JSON, JSON por línea, YAML o CSV), cada uno con parámetros de tambor, lodos y lavado (claves de
+### cycle.DEFAULTS; los que faltan toman el valor por defecto). Los escenarios se normalizan y los repetidos se
+### evalúan una sola vez. Se ordenan por sus parámetros aguas arriba (geometría, torta, formación y secado) y en
+### cada bloque esas etapas se calculan una vez por combinación distinta; el lavado y la calidad se evalúan para
+### todos los escenarios del bloque. Los bloques se reparten en un ProcessPoolExecutor y cada bloque terminado se
+### agrega a un results_store.ResultsStore, que es a la vez el resultado y el punto de control: al relanzar con el
+### mismo directorio solo se calculan los escenarios que aún no están guardados.
+###
+### Uso:
+###   python batch_runner.py escenarios.csv --out corrida --workers 4
+###   python batch_runner.py escenarios.yaml --out corrida --csv resultados.csv     # reanuda si se interrumpió
+
+UPSTREAM = ('geometry', 'cake', 'formation', 'dewatering')     # etapas compartidas dentro de un bloque
+
+UPSTREAM_PARAMS = tuple(dict.fromkeys(param for name, _, params, _ in cycle.STAGES if name in UPSTREAM
+                                      for param in params))
+
+PARAMS = tuple(cycle.DEFAULTS)
+
+LABEL_KEYS = ('id', 'name', 'scenario')      # identificadores del escenario (no son parámetros)
+
+
+def load_scenarios(path):
+    '''
+    ESCENARIOS DE UN ARCHIVO
+    .json: lista de escenarios o {"defaults": {...}, "scenarios": [...]}
+    .jsonl: un escenario por línea
+    .yaml/.yml: como .json (requiere PyYAML)
+    .csv: encabezado con los nombres de los parámetros; las celdas vacías toman el valor por defecto
+    Retorna una lista de diccionarios (con los valores tal como vienen del archivo).
+    '''
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.csv':
+        with open(path, newline='') as fh:
+            return [{key.strip(): value for key, value in row.items() if value not in (None, '')}
+                    for row in csv.DictReader(fh)]
+    if ext == '.jsonl':
+        with open(path) as fh:
+            return [json.loads(line) for line in fh if line.strip()]
+    if ext in ('.yaml', '.yml'):
+        try:
+            import yaml     # dependencia opcional: solo para escenarios en YAML
+        except ImportError as exc:
+            raise ImportError("Los escenarios en YAML requieren PyYAML (pip install pyyaml)") from exc
+        with open(path) as fh:
+            data = yaml.safe_load(fh)
+    elif ext == '.json':
+        with open(path) as fh:
+            data = json.load(fh)
+    else:
+        raise ValueError("Formato de escenarios no soportado: " + ext)
+
+    if isinstance(data, dict):
+        defaults = data.get('defaults', {})
+        return [dict(defaults, **scenario) for scenario in data.get('scenarios', [])]
+    return list(data)
+
+
+def _value(name,value):
+    if name == 'incompressible':
+        if isinstance(value, str):
+            if value.strip().lower() not in ('true', 'false', '1', '0'):
+                raise ValueError("incompressible debe ser true o false: " + value)
+            return value.strip().lower() in ('true', '1')
+        return bool(value)
+    return float(value)
+
+
+def normalize(scenarios):
+    '''
+    ESCENARIOS -> MATRIZ DE PARÁMETROS COMPLETOS
+    Completa con cycle.DEFAULTS, convierte a número (incompressible a booleano) y fija filtrate_dens con
+    bx_calc.calc_dens(Bx_0) cuando no se da, para que dos escenarios iguales tengan la misma fila.
+    Retorna (X (escenarios, len(PARAMS)) de float, etiquetas).
+    '''
+    X = np.empty((len(scenarios), len(PARAMS)))
+    labels = []
+    for i, scenario in enumerate(scenarios):
+        label = next((scenario[key] for key in LABEL_KEYS if key in scenario), i)
+        unknown = set(scenario) - set(PARAMS) - set(LABEL_KEYS)
+        if unknown:
+            raise ValueError("Escenario {}: parámetros desconocidos: {}".format(label, ", ".join(sorted(unknown))))
+        p = dict(cycle.DEFAULTS)
+        try:
+            p.update((name, _value(name, value)) for name, value in scenario.items() if name in p)
+        except (TypeError, ValueError) as exc:
+            raise ValueError("Escenario {}: {}".format(label, exc)) from exc
+        if p['filtrate_dens'] is None:
+            p['filtrate_dens'] = bx_calc.calc_dens(p['Bx_0'])
+        X[i] = [p[name] for name in PARAMS]
+        labels.append(str(label))
+    return X, labels
+
+
+def scenario_keys(X):
+    '''
+    CLAVE DE CONTENIDO DE CADA FILA NORMALIZADA (entero de 63 bits del hash de los bytes de la fila)
+    '''
+    X = np.ascontiguousarray(X + 0.0)       # + 0.0 unifica -0.0 y 0.0
+    keys = np.empty(len(X), dtype=np.int64)
+    for i, row in enumerate(X):
+        digest = hashlib.blake2b(row.tobytes(), digest_size=8).digest()
+        keys[i] = int.from_bytes(digest, 'little') >> 1
+    return keys
+
+
+def _run_chunk(X,keys,ts,outputs,trajectories):
+    '''
+    EVALÚA UN BLOQUE DE ESCENARIOS ÚNICOS (se ejecuta en un proceso del pool)
+    Las etapas de UPSTREAM se calculan una vez por combinación distinta de UPSTREAM_PARAMS.
+    Retorna (columnas, trayectorias o None).
+    '''
+    p = {name: X[:, j] for j, name in enumerate(PARAMS)}
+    p['incompressible'] = p['incompressible'] != 0
+    up = X[:, [PARAMS.index(name) for name in UPSTREAM_PARAMS]]
+    _, first, inverse = np.unique(up, axis=0, return_index=True, return_inverse=True)
+    inverse = inverse.ravel()
+    p_up = {name: value[first] for name, value in p.items()}
+
+    with np.errstate(all='ignore'):
+        geo = cycle.geometry(p_up)
+        cak = cycle.cake(p_up)
+        form = cycle.formation(p_up, geo, cak, ts)
+        dew = cycle.dewatering_zones(p_up, geo, cak, form, ts)
+        geo, cak, form, dew = ({name: np.broadcast_to(value, first.shape)[inverse] for name, value in stage.items()}
+                               for stage in (geo, cak, form, dew))
+        wash = cycle.washing_zone(p, geo, form, dew)
+        res = cycle.collect(geo, cak, form, dew, wash, cycle.quality(p, geo, form, dew, wash))
+
+    columns = {'key': keys}
+    columns.update((name, np.array(p[name])) for name in PARAMS)
+    n = len(keys)
+    columns.update((name, np.broadcast_to(np.asarray(res[name], dtype=float), (n,)).copy()) for name in outputs)
+    traj = None
+    if trajectories:
+        rows = [{name: p[name][i].item() for name in PARAMS} for i in range(n)]
+        traj = [results_store.cycle_trajectories(ts if ts is not None else 0.1, **row) for row in rows]
+    return columns, traj
+
+
+def run(scenarios,out,ts=None,outputs=cycle.OUTPUTS,chunk_size=5000,workers=None,trajectories=False,
+        compress=False,progress=None):
+    '''
+    EVALÚA LOS ESCENARIOS Y LOS GUARDA EN EL DIRECTORIO out (ResultsStore)
+    scenarios: lista de diccionarios (ver load_scenarios) o ruta del archivo
+    ts: tiempo de muestreo [s] (None: tiempos exactos de cada etapa)
+    outputs: salidas de cycle.OUTPUTS guardadas
+    chunk_size: escenarios únicos por bloque (unidad de trabajo y de punto de control)
+    workers: procesos (None: os.cpu_count(); 1: en este proceso)
+    trajectories: guarda también las trayectorias de cada escenario (cálculo escalar, lento)
+    progress: función progress(hechos, total, segundos) llamada al terminar cada bloque
+    Si out ya contiene una corrida con la misma configuración solo se evalúan los escenarios que faltan.
+    Retorna un diccionario con el resumen: scenarios, unique, skipped (ya guardados), computed, failed, seconds.
+    '''
+    start = time.perf_counter()
+    if isinstance(scenarios, str):
+        scenarios = load_scenarios(scenarios)
+    unknown = set(outputs) - set(cycle.OUTPUTS)
+    if unknown:
+        raise ValueError("Salidas desconocidas: " + ", ".join(sorted(unknown)))
+    X, _ = normalize(scenarios)
+    keys = scenario_keys(X)
+    keys, first = np.unique(keys, return_index=True)
+    X = X[first]
+
+    #### PUNTO DE CONTROL: la configuración debe coincidir con la de la corrida guardada ####
+    os.makedirs(out, exist_ok=True)
+    config = {'ts': ts, 'outputs': list(outputs), 'trajectories': bool(trajectories)}
+    config_path = os.path.join(out, 'batch.json')
+    if os.path.exists(config_path):
+        with open(config_path) as fh:
+            saved = json.load(fh)
+        if saved != config:
+            raise ValueError("El directorio {} tiene una corrida con otra configuración: {}".format(out, saved))
+    else:
+        with open(config_path, 'w') as fh:
+            json.dump(config, fh, indent=1)
+
+    store = results_store.ResultsStore(out, compress=compress)
+    done = store.column('key') if len(store) else np.empty(0, dtype=np.int64)
+    pending = ~np.isin(keys, done)
+    X, keys = X[pending], keys[pending]
+
+    #### BLOQUES ORDENADOS POR LOS PARÁMETROS AGUAS ARRIBA ####
+    up = X[:, [PARAMS.index(name) for name in UPSTREAM_PARAMS]]
+    order = np.lexsort(up.T[::-1]) if len(X) else np.empty(0, dtype=np.intp)
+    X, keys = X[order], keys[order]
+    bounds = list(range(0, len(X), chunk_size)) + [len(X)]
+    chunks = [(X[a:b], keys[a:b], ts, tuple(outputs), trajectories) for a, b in zip(bounds[:-1], bounds[1:])]
+
+    summary = {'scenarios': len(scenarios), 'unique': len(first), 'skipped': int((~pending).sum()),
+               'computed': 0, 'failed': 0}
+
+    def incorporate(chunk, result):
+        columns, traj = result
+        store.append(columns, traj)
+        summary['computed'] += len(chunk[1])
+        if progress is not None:
+            progress(summary['computed'], len(X), time.perf_counter() - start)
+
+    workers = workers or os.cpu_count() or 1
+    try:
+        if workers == 1:
+            for chunk in chunks:
+                incorporate(chunk, _run_chunk(*chunk))
+        else:
+            # ventana acotada de bloques en vuelo; un bloque que falla se informa y se reintenta al reanudar
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                in_flight = {}
+                next_submit = 0
+                while next_submit < len(chunks) or in_flight:
+                    while next_submit < len(chunks) and len(in_flight) < 2*workers:
+                        in_flight[pool.submit(_run_chunk, *chunks[next_submit])] = chunks[next_submit]
+                        next_submit += 1
+                    finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for fut in finished:
+                        chunk = in_flight.pop(fut)
+                        try:
+                            result = fut.result()
+                        except Exception as exc:
+                            summary['failed'] += len(chunk[1])
+                            print("Bloque fallido ({} escenarios): {!r}".format(len(chunk[1]), exc), file=sys.stderr)
+                            continue
+                        incorporate(chunk, result)
+    finally:
+        store.close()       # los bloques en cola se escriben antes de salir, también al interrumpir
+
+    summary['seconds'] = time.perf_counter() - start
+    return summary
+
+
+def collect(scenarios,out,columns=None):
+    '''
+    RESULTADOS EN EL ORDEN DEL ARCHIVO DE ESCENARIOS (los repetidos comparten fila del almacén)
+    Retorna (etiquetas, columna -> arreglo); los escenarios sin resultado quedan en nan.
+    '''
+    if isinstance(scenarios, str):
+        scenarios = load_scenarios(scenarios)
+    X, labels = normalize(scenarios)
+    keys = scenario_keys(X)
+    store = results_store.ResultsStore(out, background=False)
+    columns = [name for name in (columns or store.columns) if name != 'key']
+    stored = store.column('key')
+    order = np.argsort(stored)
+    pos = np.clip(np.searchsorted(stored, keys, sorter=order), 0, max(len(stored) - 1, 0))
+    rows = order[pos] if len(stored) else np.zeros(len(keys), dtype=np.intp)
+    found = (stored[rows] == keys) if len(stored) else np.zeros(len(keys), dtype=bool)
+    res = {}
+    for name in columns:
+        value = store.column(name)[rows].astype(float)
+        value[~found] = np.nan
+        res[name] = value
+    return labels, res
+
+
+def write_csv(labels,res,path):
+    with open(path, 'w', newline='') as fh:
+        writer = csv.writer(fh)
+        writer.writerow(['scenario'] + list(res))
+        for i, label in enumerate(labels):
+            writer.writerow([label] + [repr(float(res[name][i])) for name in res])
+
+
+def _report_progress(done,total,elapsed):
+    rate = done/elapsed if elapsed > 0 else 0.0
+    eta = (total - done)/rate if rate > 0 else float('nan')
+    print("\r{}/{} escenarios  {:.0f}/s  restante {:.0f} s   ".format(done, total, rate, eta), end='',
+          file=sys.stderr, flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Corrida por lotes de escenarios del filtro rotatorio")
+    parser.add_argument('scenarios', help="archivo .json, .jsonl, .yaml o .csv")
+    parser.add_argument('--out', required=True, help="directorio de resultados y punto de control")
+    parser.add_argument('--workers', type=int, default=None, help="procesos (por defecto todos los núcleos)")
+    parser.add_argument('--chunk', type=int, default=5000, help="escenarios por bloque")
+    parser.add_argument('--ts', type=float, default=None, help="tiempo de muestreo [s] (por defecto tiempos exactos)")
+    parser.add_argument('--outputs', default=','.join(cycle.OUTPUTS), help="salidas separadas por comas")
+    parser.add_argument('--trajectories', action='store_true', help="guarda las trayectorias de cada escenario")
+    parser.add_argument('--compress', action='store_true', help="bloques comprimidos")
+    parser.add_argument('--csv', help="escribe los resultados en el orden del archivo de escenarios")
+    args = parser.parse_args(argv)
+
+    scenarios = load_scenarios(args.scenarios)
+    try:
+        summary = run(scenarios, args.out, ts=args.ts, outputs=tuple(args.outputs.split(',')), chunk_size=args.chunk,
+                      workers=args.workers, trajectories=args.trajectories, compress=args.compress,
+                      progress=_report_progress)
+    except KeyboardInterrupt:
+        print("\nInterrumpido: los bloques terminados quedan guardados en " + args.out, file=sys.stderr)
+        return 130
+    print("\nescenarios: {scenarios}  únicos: {unique}  ya guardados: {skipped}  calculados: {computed}  "
+          "fallidos: {failed}  ({seconds:.1f} s)".format(**summary), file=sys.stderr)
+    if args.csv:
+        write_csv(*collect(scenarios, args.out), args.csv)
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+import math
+import os
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import filtration
+
+""" ------ BENCHMARK: SOLUCIÓN ANALÍTICA DE RUTH vs odeint ------ """
+### Uso: python benchmarks/bench_filtration.py
+
+RTOL = 1e-4     # tolerancia relativa entre la forma cerrada y odeint (tolerancias por defecto)
+
+####### PARÁMETROS DEL CASO BASE (process_simulation.py) #########
+P_diff = 20000                                  # [Pa]
+A = 2*math.pi*1.5*4.3*(72.134/360)              # [m2]
+u = 400*10**-3                                  # [Pa*s]
+c = 50                                          # [kg/m3]
+k = 2*10**-13                                   # [m2]
+alpha = 1/(k*500*(1-0.5))                       # [m/kg]
+tf = 10.02                                      # [s]
+
+
+def best_time(fun, number, repeat=5):
+    return min(timeit.repeat(fun, number=number, repeat=repeat))/number
+
+
+def check(t, Rm):
+    v_ode = filtration.odeint_volume(t,P_diff,A,u,alpha,c,Rm)
+    v, q, l = filtration.analytic_volume(t,P_diff,A,u,alpha,c,Rm,k)
+    err = float(np.max(np.abs(v-v_ode)/v_ode))
+    assert err < RTOL, "error relativo %.3e supera la tolerancia %.0e" % (err, RTOL)
+    return err
+
+
+def main():
+    print("###### UN PUNTO DE OPERACIÓN ########")
+    print("{:>8} {:>8} {:>12} {:>12} {:>10} {:>10}".format("ts [s]", "Rm", "odeint [s]", "ruth [s]", "speedup", "err rel"))
+    for ts in (0.1, 0.01, 0.001):
+        t = np.arange(0, tf, ts)
+        for Rm in (0, 1e11):
+            err = check(t, Rm)
+            t_ode = best_time(lambda: filtration.odeint_volume(t,P_diff,A,u,alpha,c,Rm), 5)
+            t_ruth = best_time(lambda: filtration.analytic_volume(t,P_diff,A,u,alpha,c,Rm,k), 50)
+            print("{:>8} {:>8.0e} {:>12.3e} {:>12.3e} {:>9.1f}x {:>10.2e}".format(ts, Rm, t_ode, t_ruth, t_ode/t_ruth, err))
+
+    print("\n###### BARRIDO DE PRESIONES (ts = 0.1 s) ########")
+    t = np.arange(0, tf, 0.1)
+    for n in (10, 100, 1000):
+        P = np.linspace(5000, 80000, n)
+
+        def loop_odeint():
+            return [filtration.odeint_volume(t,p,A,u,alpha,c,0) for p in P]
+
+        def broadcast():
+            return filtration.analytic_volume(t[None,:],P[:,None],A,u,alpha,c,0,k)
+
+        t_ode = best_time(loop_odeint, 1, repeat=3)
+        t_ruth = best_time(broadcast, 10)
+        print("puntos: {:>6}   odeint: {:.3e} s   ruth: {:.3e} s   speedup: {:.0f}x".format(n, t_ode, t_ruth, t_ode/t_ruth))
+
+
+if __name__ == "__main__":
+    main()
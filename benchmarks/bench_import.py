@@ -0,0 +1,60 @@
+import json
+import os
+import subprocess
+import sys
+
+""" ------ BENCHMARK: TIEMPO DE IMPORTACIÓN DEL NÚCLEO DE CÁLCULO ------ """
+### Uso: python benchmarks/bench_import.py
+### Mide el tiempo de importación del núcleo en un proceso nuevo (sin caché de módulos). La ausencia de
+### matplotlib, sklearn y scipy se comprueba en tests/test_headless.py.
+### Presupuestos: TOTAL_BUDGET incluye NumPy, que es la mayor parte del costo real (~120 ms de ~145 ms medidos)
+### y no depende de este repositorio; CORE_BUDGET es lo que agregan los módulos propios.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CORE = ('RVDF', 'filtration', 'dewatering', 'washing', 'bx_calc', 'pol_calc', 'cycle', 'report')
+FORBIDDEN = ('matplotlib', 'sklearn', 'scipy')
+TOTAL_BUDGET = 0.25     # tiempo máximo de importación del núcleo con NumPy [s]
+CORE_BUDGET = 0.05      # tiempo máximo de los módulos propios, sin NumPy [s]
+
+PROBE = '''
+import json, sys, time
+t0 = time.perf_counter()
+import numpy
+t1 = time.perf_counter()
+for name in %r:
+    __import__(name)
+t2 = time.perf_counter()
+print(json.dumps({"numpy": t1-t0, "core": t2-t1,
+                  "loaded": sorted(m for m in %r if m in sys.modules)}))
+''' % (CORE, FORBIDDEN)
+
+
+def measure(repeat=5):
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, '-c', PROBE], cwd=ROOT, check=True,
+                             capture_output=True, text=True).stdout
+        runs.append(json.loads(out))
+    return runs
+
+
+def main():
+    runs = measure()
+    loaded = sorted(set(m for run in runs for m in run['loaded']))
+    numpy_t = min(run['numpy'] for run in runs)
+    core_t = min(run['core'] for run in runs)
+
+    print("###### IMPORTACIÓN DEL NÚCLEO ########")
+    print("NumPy [ms]: ", "{:.1f}".format(numpy_t*1000))
+    print("Núcleo sin NumPy [ms]: ", "{:.1f}".format(core_t*1000))
+    print("Total con NumPy [ms]: ", "{:.1f}".format((numpy_t+core_t)*1000), "(presupuesto {:.0f})".format(TOTAL_BUDGET*1000))
+    print("Módulos pesados cargados: ", loaded or "ninguno")
+
+    assert not loaded, "El núcleo importa " + ", ".join(loaded)
+    assert numpy_t + core_t < TOTAL_BUDGET, "Importar el núcleo con NumPy tarda %.1f ms" % ((numpy_t+core_t)*1000)
+    assert core_t < CORE_BUDGET, "Importar el núcleo sin NumPy tarda %.1f ms" % (core_t*1000)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import montecarlo
+
+""" ------ BENCHMARK: MUESTRAS POR SEGUNDO vs NÚMERO DE PROCESOS ------ """
+### Uso: python benchmarks/bench_montecarlo.py [n_muestras]
+
+SPECS = {
+    'k': ('lognormal', np.log(2*10**-13), 0.3),
+    'epsilon': ('uniform', 0.4, 0.6),
+    'u': ('normal', 0.4, 0.04),
+    'c': ('uniform', 40, 60),
+    'solid_dens': ('normal', 500, 30),
+    'surface_tension': ('uniform', 0.06, 0.08),
+}
+
+
+def main(n_samples=10**6, chunk_size=50000):
+    cpus = os.cpu_count() or 1
+    counts = sorted(set([1, 2, 4, 8, 16, 32, cpus]) & set(range(1, cpus+1)))
+
+    print("###### MONTE CARLO: {} muestras, bloques de {} ########".format(n_samples, chunk_size))
+    print("{:>9} {:>12} {:>14} {:>10}".format("procesos", "tiempo [s]", "muestras/s", "escala"))
+    base = None
+    for workers in counts:
+        t0 = time.perf_counter()
+        montecarlo.monte_carlo(SPECS, n_samples, workers=workers, chunk_size=chunk_size, seed=0)
+        elapsed = time.perf_counter() - t0
+        rate = n_samples/elapsed
+        base = base or rate
+        print("{:>9} {:>12.3f} {:>14.0f} {:>9.2f}x".format(workers, elapsed, rate, rate/base))
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:2]])
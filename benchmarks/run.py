@@ -0,0 +1,244 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import timeit
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from RVDF import RVDF
+import filtration
+import dewatering
+import washing
+import bx_calc
+import cycle
+import montecarlo
+import profiling
+import soft_sensor
+import surrogate
+from pol_calc import pol_calc
+
+""" ------ SUITE DE BENCHMARKS: ETAPAS, CICLO COMPLETO, LOTES Y PROCESOS ------ """
+### Uso:
+###   python benchmarks/run.py                          # suite completa -> bench_output.json
+###   python benchmarks/run.py --quick                  # malla reducida
+###   python benchmarks/run.py --save-baseline base.json
+###   python benchmarks/run.py --baseline base.json     # falla (código 1) si algún caso es más lento
+### Los casos con 'target' (objetivos absolutos, p. ej. la latencia p99 del sensor virtual) también fallan con
+### código 1 si lo superan.
+### Sin gráficas ni impresión desde las etapas: solo el resumen de esta suite.
+
+TS_VALUES = (1.0, 0.1, 0.01, 0.001)
+BATCH_SIZES = (1, 10, 100, 1000, 10**4, 10**5, 10**6)
+QUICK_TS = (0.1, 0.01)
+QUICK_BATCH = (1, 1000, 10**5)
+
+BENCH_SPECS = {
+    'k': ('lognormal', np.log(2*10**-13), 0.3),
+    'epsilon': ('uniform', 0.4, 0.6),
+    'u': ('normal', 0.4, 0.04),
+}
+
+
+def timed(fun, min_time=0.2, repeat=3):
+    '''
+    MEJOR TIEMPO POR LLAMADA [s] Y PICO DE MEMORIA [bytes] DE UNA LLAMADA
+    '''
+    number, elapsed = timeit.Timer(fun).autorange()
+    number = max(1, int(number*min_time/max(elapsed, 1e-9)))
+    best = min(timeit.repeat(fun, number=number, repeat=repeat))/number
+
+    tracemalloc.start()
+    fun()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return best, peak
+
+
+def stage_cases(ts):
+    '''
+    CASOS POR ETAPA PARA UN TIEMPO DE MUESTREO, CON LAS ENTRADAS DEL CASO BASE
+    '''
+    filtro, lodos = cycle.build()
+    p = cycle.DEFAULTS
+    rd, L, w = filtro.rd, filtro.L, filtro.w
+    form = filtration.volume(filtro, lodos, ts, filtro.tf)
+    thickness = float(form.l[-1])
+    dew_args = (thickness, RVDF.drum_filter_area(rd, L, filtro.dew_angle1), RVDF.angle_to_time(filtro.dew_angle1, w), 1, 0, ts)
+    S = dewatering.dewatering_process(filtro, lodos, *dew_args).S
+    wash = washing.water_wash(filtro, lodos, p['e'], p['wsh_Q'], thickness, S)
+
+    def full_cycle():
+        form = filtration.volume(filtro, lodos, ts, filtro.tf)
+        l = float(form.l[-1])
+        dew1 = dewatering.dewatering_process(filtro, lodos, l, RVDF.drum_filter_area(rd, L, filtro.dew_angle1),
+                                             RVDF.angle_to_time(filtro.dew_angle1, w), 1, 0, ts)
+        wash = washing.water_wash(filtro, lodos, p['e'], p['wsh_Q'], l, dew1.S)
+        dewatering.dewatering_process(filtro, lodos, l, RVDF.drum_filter_area(rd, L, filtro.dew_angle2),
+                                      RVDF.angle_to_time(filtro.dew_angle2, w), 2, wash.r, ts)
+        bx_calc.calc_Bx(p['Bx_0'], form.Vf, p['SS_agua'], wash.Vf_wsh, wash.r)
+        pol_calc(form.W_cake, filtro.Af, p['wsh_Q'])
+
+    return {
+        'filtration': lambda: filtration.volume(filtro, lodos, ts, filtro.tf),
+        'filtration_odeint': lambda: filtration.volume(filtro, lodos, ts, filtro.tf, method='odeint'),
+        'dewatering': lambda: dewatering.dewatering_process(filtro, lodos, *dew_args),
+        'dewatering_fv': lambda: dewatering.dewatering_process(filtro, lodos, *dew_args, model='fv'),
+        'washing': lambda: washing.water_wash(filtro, lodos, p['e'], p['wsh_Q'], thickness, S),
+        'bx': lambda: bx_calc.calc_Bx(p['Bx_0'], form.Vf, p['SS_agua'], wash.Vf_wsh, wash.r),
+        'pol': lambda: pol_calc(form.W_cake, filtro.Af, p['wsh_Q']),
+        'full_cycle': full_cycle,
+    }
+
+
+def batch_case(n):
+    rng = np.random.default_rng(0)
+    params = {'P_diff': rng.uniform(10000, 60000, n), 'w': rng.uniform(0.6, 2.0, n),
+              'nivel': rng.uniform(0.5, 1.0, n), 'wsh_Q': rng.uniform(0.0005, 0.003, n),
+              'k': rng.uniform(5e-14, 5e-13, n), 'epsilon': rng.uniform(0.4, 0.6, n)}
+    return lambda: cycle.run_cycles(**params)
+
+
+def instrument_cases():
+    '''
+    COSTO POR LLAMADA DE profiling.instrument SIN PERFILADOR ACTIVO, FRENTE A LA MISMA FUNCIÓN SIN DECORAR
+    '''
+    plain = lambda: None
+    return {'plain_call': plain, 'instrument_disabled': profiling.instrument()(plain)}
+
+
+def surrogate_cases(n,path):
+    '''
+    TABLA SUSTITUTA DEL MODELO FV FRENTE AL MODELO: n puntos aleatorios dentro de la malla (tabla en path)
+    '''
+    axes = {'P_diff': (10000, 60000, 4, 'lin'), 'k': (5e-14, 5e-13, 3, 'log')}
+    table = surrogate.build(path, axes=axes, model='fv', validate=0)
+    rng = np.random.default_rng(0)
+    params = {'P_diff': rng.uniform(10000, 60000, n), 'k': np.exp(rng.uniform(np.log(5e-14), np.log(5e-13), n))}
+    return {'surrogate_fv': lambda: table(**params), 'run_cycles_fv': lambda: cycle.run_cycles(model='fv', **params)}
+
+
+def soft_sensor_latency(n=3000):
+    '''
+    PERCENTIL 99 DE LA LATENCIA POR PREDICCIÓN DEL SENSOR VIRTUAL [s] SOBRE n REGISTROS CSV (vacío y nivel variables)
+    '''
+    rng = np.random.default_rng(0)
+    lines = ['t,vacuum,rpm,level,wash_flow'] + ['{},{},1.0,{},0.0015'.format(0.5*i, 25000 + 2000*rng.random(),
+                                                                             0.85 + 0.1*rng.random()) for i in range(n)]
+    sensor = soft_sensor.SoftSensor()
+    for _ in soft_sensor.iter_predictions(lines, sensor, per_revolution=False):
+        pass
+    return sensor.latency_quantile(0.99)
+
+
+def run_suite(ts_values,batch_sizes,worker_counts,mc_samples,log=print):
+    results = []
+
+    def measured(name, params, value, target):
+        results.append({'name': name, 'params': params, 'time': value, 'peak_bytes': 0, 'target': target})
+        log("{:<20} {:<28} {:>12.3e} s (objetivo {:.1e} s)".format(name, json.dumps(params), value, target))
+
+    def record(name, params, fun, **kwargs):
+        best, peak = timed(fun, **kwargs)
+        entry = {'name': name, 'params': params, 'time': best, 'peak_bytes': peak}
+        if 'n' in params:
+            entry['throughput'] = params['n']/best
+        results.append(entry)
+        log("{:<20} {:<28} {:>12.3e} s {:>10.1f} KiB".format(name, json.dumps(params), best, peak/1024))
+
+    for ts in ts_values:
+        for name, fun in stage_cases(ts).items():
+            record(name, {'ts': ts}, fun)
+
+    for n in batch_sizes:
+        record('run_cycles', {'n': n}, batch_case(n), min_time=0.05 if n >= 10**5 else 0.2)
+
+    for workers in worker_counts:
+        fun = lambda: montecarlo.monte_carlo(BENCH_SPECS, mc_samples, workers=workers, chunk_size=max(mc_samples//8, 1))
+        record('monte_carlo', {'n': mc_samples, 'workers': workers}, fun, min_time=0.0, repeat=1)
+
+    for name, fun in instrument_cases().items():
+        record(name, {}, fun)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, fun in surrogate_cases(50, os.path.join(tmp, 'fv')).items():
+            record(name, {'n': 50}, fun)
+
+    measured('soft_sensor_p99', {'n': 3000}, soft_sensor_latency(3000), soft_sensor.LATENCY_TARGET)
+
+    return results
+
+
+def case_id(entry):
+    return entry['name'] + json.dumps(entry['params'], sort_keys=True)
+
+
+def compare(results,baseline,tolerance,min_delta=1e-5):
+    '''
+    CASOS MÁS LENTOS QUE LA LÍNEA BASE: tiempo > tiempo_base*(1+tolerance) y más de min_delta [s]
+    (el margen absoluto evita falsas alarmas en casos de microsegundos)
+    '''
+    base = {case_id(entry): entry for entry in baseline['results']}
+    regressions = []
+    for entry in results:
+        ref = base.get(case_id(entry))
+        if ref is not None and entry['time'] > ref['time']*(1+tolerance) and entry['time'] - ref['time'] > min_delta:
+            regressions.append((case_id(entry), ref['time'], entry['time']))
+    return regressions
+
+
+def missed_targets(results):
+    '''
+    CASOS POR ENCIMA DE SU OBJETIVO ABSOLUTO: (caso, objetivo, tiempo)
+    '''
+    return [(case_id(entry), entry['target'], entry['time']) for entry in results
+            if 'target' in entry and entry['time'] > entry['target']]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks del modelo RVDF")
+    parser.add_argument('--quick', action='store_true', help="malla reducida de ts y tamaños de lote")
+    parser.add_argument('--output', default='bench_output.json', help="archivo JSON de resultados")
+    parser.add_argument('--baseline', help="JSON de referencia; regresiones -> código de salida 1")
+    parser.add_argument('--save-baseline', help="guarda los resultados también como línea base")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="holgura relativa frente a la línea base")
+    parser.add_argument('--min-delta', type=float, default=1e-5, help="diferencia absoluta mínima para una regresión [s]")
+    parser.add_argument('--workers', type=int, nargs='*', help="número de procesos para Monte Carlo")
+    parser.add_argument('--mc-samples', type=int, default=200000)
+    args = parser.parse_args(argv)
+
+    cpus = os.cpu_count() or 1
+    workers = args.workers or sorted(set([1, 2, 4, cpus]) & set(range(1, cpus+1)))
+    results = run_suite(QUICK_TS if args.quick else TS_VALUES, QUICK_BATCH if args.quick else BATCH_SIZES,
+                        workers, args.mc_samples)
+
+    output = {'meta': {'python': platform.python_version(), 'numpy': np.__version__, 'platform': platform.platform(),
+                       'cpu_count': cpus, 'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')},
+              'results': results}
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, 'w') as fh:
+            json.dump(output, fh, indent=1)
+
+    status = 0
+    for name, target, now in missed_targets(results):
+        print("FUERA DE OBJETIVO {}: {:.3e} s > {:.3e} s".format(name, now, target))
+        status = 1
+    if args.baseline:
+        with open(args.baseline) as fh:
+            regressions = compare(results, json.load(fh), args.tolerance, args.min_delta)
+        for name, ref, now in regressions:
+            print("REGRESIÓN {}: {:.3e} s -> {:.3e} s ({:+.0f}%)".format(name, ref, now, 100*(now/ref-1)))
+        if regressions:
+            status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
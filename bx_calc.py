@@ -1,9 +1,6 @@
-import matplotlib.pyplot as plt
-from sklearn import metrics
-from scipy.integrate import odeint
 import numpy as np
 
-from dewatering import dewatering_process
+import profiling
 
 """ ------ CÁLCULO DEL BRIX DEL JUGO FILTRADO TOTAL EN EL CICLO ------ """
 
@@ -11,6 +8,7 @@ def calc_dens(Bx):
     dens = 1000*(0.956-0.005*Bx)     # Peña (2009)
     return dens
 
+@profiling.instrument()
 def calc_Bx(Bx_0,Vf,SS_agua,V_agua,r_torta):
     '''
     Bx_0: Brix inicial del lodo
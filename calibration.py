@@ -0,0 +1,252 @@
+import csv
+import json
+import os
+
+import numpy as np
+
+import cycle
+
+""" ------ CALIBRACIÓN DE PARÁMETROS DE LA TORTA CON DATOS DE PLANTA ------ """
+### Lee los registros (comparacion.xlsx o CSV) una sola vez y los guarda como arreglo estructurado .npy que se
+### abre con memoria mapeada. El ajuste es por mínimos cuadrados no lineales (scipy.optimize.least_squares)
+### evaluando los residuos de todos los registros en una sola llamada a cycle.run_cycles.
+
+####### ETIQUETAS DEL REPORTE -> (COLUMNA, FACTOR) #########
+### Mismo texto que imprime report.py; comparacion.xlsx guarda una corrida por bloque de columnas.
+LABELS = (
+    ('Tiempo de filtración [s]', 'tf', 1),
+    ('Q media [m3/s]', 'Q_mean', 1),
+    ('Espesor torta [mm]', 'thickness', 1e-3),
+    ('V filtrado [m3]', 'Vf', 1),
+    ('Producción de sólidos [kg/s]', 'W_cake', 1),
+    ('Filtrado en dewatering 1 [m3]', 'Vf_dew1', 1),
+    ('Eficiencia del lavado', 'e', 1),
+    ('Retención de soluto en cachaza', 'r', 1),
+    ('Tiempo de lavado [s]', 'wsh_time', 1),
+    ('Cantidad de lavado empleado [m3]', 'wsh_volume', 1),
+    ('Wash ratio', 'wsh_ratio', 1),
+    ('Filtrado en dewatering 2 [m3]', 'Vf_dew2', 1),
+    ('Humedad en cachaza [%]', 'M', 1),
+    ('Saturación irreducible de la torta', 'irreduc_S', 1),
+    ('Saturación de final', 'S', 1),
+    ('Retención final de soluto en cachaza', 'retention', 1),
+    ('Duración del ciclo de rotación [s]', 'cycle_time', 1),
+    ('Nivel de lodos [%]', 'nivel', 1e-2),
+    ('Ángulo real de filtración [°]', 'filtration_angle', 1),
+    ('Volumen de filtrado en un ciclo [m3]', 'V_total', 1),
+    ('Tasa de filtración [m3/s]', 'rate', 1),
+    ('Brix de jugo filtrado en el ciclo [°]', 'Bx', 1),
+    ('Pol en cachaza [%]', 'pol', 1),
+)
+
+COLUMNS = tuple(dict.fromkeys(name for _, name, _ in LABELS))
+
+####### SALIDAS GEOMÉTRICAS: solo dependen del nivel, la velocidad y los ángulos, no de los parámetros ajustados #########
+### No se usan como objetivos por defecto: un valor registrado inconsistente con la geometría (p. ej. el ángulo real
+### de 72.13° de comparacion.xlsx frente a los 69.27° del modelo con nivel 0.95) deja un residuo constante que el
+### ajuste no puede reducir y que infla los intervalos de confianza.
+GEOMETRY = ('filtration_angle', 'dew_angle1', 'tf', 'Af', 'cycle_time')
+
+####### PARÁMETROS AJUSTABLES: (transformación, límites) #########
+PARAMS = {
+    'k': ('log', (1e-16, 1e-10)),               # Permeabilidad [m2]
+    'epsilon': ('lin', (0.05, 0.95)),           # Porosidad []
+    'Rm': ('lin', (0, 1e13)),                   # Resistencia del medio filtrante [1/m]
+    'alpha_prima': ('log', (1e6, 1e16)),        # Resistencia específica a 1 Pa [m/kg] (torta compresible)
+    's': ('lin', (0, 1)),                       # Índice de compresibilidad []
+    'e': ('lin', (0, 0.999)),                   # Eficiencia del lavado []
+}
+
+RM_SCALE = 1e10     # escala de Rm en el espacio del optimizador [1/m]
+
+
+def _parse_value(text):
+    try:
+        return float(text.split()[0])
+    except (ValueError, IndexError):
+        return np.nan
+
+
+def _read_xlsx(path):
+    from openpyxl import load_workbook      # importación diferida: solo si la caché no es válida
+
+    sheet = load_workbook(path, read_only=True, data_only=True).worksheets[0]
+    rows = [list(row) for row in sheet.iter_rows(values_only=True)]
+    width = max(len(row) for row in rows)
+    rows = [row + [None]*(width - len(row)) for row in rows]
+
+    records = []
+    for col in range(width):
+        if not (isinstance(rows[0][col], str) and 'SIMULACIÓN' in rows[0][col]):
+            continue
+        record = {}
+        for row in rows:
+            cell = row[col]
+            if not isinstance(cell, str) or ':' not in cell:
+                continue
+            label, _, value = cell.partition(':')
+            for prefix, name, factor in LABELS:
+                if label.strip().startswith(prefix) and name not in record:
+                    record[name] = _parse_value(value.strip())*factor
+                    break
+        records.append(record)
+    return records
+
+
+def _read_csv(path):
+    with open(path, newline='') as fh:
+        return [{name: float(value) for name, value in row.items() if value not in (None, '')}
+                for row in csv.DictReader(fh)]
+
+
+def load_records(path='comparacion.xlsx',cache_dir=None):
+    '''
+    REGISTROS DE PLANTA COMO ARREGLO ESTRUCTURADO (memoria mapeada)
+    path: archivo .xlsx (formato de comparacion.xlsx) o .csv con columnas de COLUMNS / cycle.DEFAULTS
+    cache_dir: directorio de la caché (por defecto .cache junto al archivo)
+    La caché se regenera solo si cambia el tamaño o la fecha de modificación del archivo de origen.
+    '''
+    path = os.path.abspath(path)
+    cache_dir = cache_dir or os.path.join(os.path.dirname(path), '.cache')
+    base = os.path.join(cache_dir, os.path.basename(path))
+    stat = os.stat(path)
+    source = {'size': stat.st_size, 'mtime': stat.st_mtime}
+
+    if os.path.exists(base + '.json') and os.path.exists(base + '.npy'):
+        with open(base + '.json') as fh:
+            if json.load(fh) == source:
+                return np.load(base + '.npy', mmap_mode='r')
+
+    records = _read_csv(path) if path.endswith('.csv') else _read_xlsx(path)
+    names = tuple(dict.fromkeys([name for name in COLUMNS] + [name for r in records for name in r]))
+    data = np.full(len(records), np.nan, dtype=[(name, 'f8') for name in names])
+    for i, record in enumerate(records):
+        for name, value in record.items():
+            data[name][i] = value
+
+    os.makedirs(cache_dir, exist_ok=True)
+    np.save(base + '.npy', data)
+    with open(base + '.json', 'w') as fh:
+        json.dump(source, fh)
+    return np.load(base + '.npy', mmap_mode='r')
+
+
+def record_inputs(records,fixed=None):
+    '''
+    ENTRADAS DEL CICLO POR REGISTRO: columnas de cycle.DEFAULTS presentes en los datos
+    (w se deduce de la duración del ciclo si no está) completadas con fixed.
+    Las columnas que también son salidas (p. ej. el ángulo real de filtración) se tratan como mediciones.
+    '''
+    inputs = dict(fixed or {})
+    names = records.dtype.names
+    for name in names:
+        if name in cycle.DEFAULTS and name not in cycle.OUTPUTS and np.all(np.isfinite(records[name])):
+            inputs[name] = np.array(records[name])
+    if 'w' not in names and 'cycle_time' in names and np.all(np.isfinite(records['cycle_time'])):
+        inputs['w'] = 60/np.array(records['cycle_time'])
+    return inputs
+
+
+def _to_physical(z,names):
+    return {name: (10**zi if PARAMS[name][0] == 'log' else zi*RM_SCALE if name == 'Rm' else zi)
+            for name, zi in zip(names, z)}
+
+
+def _to_internal(values,names):
+    return np.array([np.log10(values[name]) if PARAMS[name][0] == 'log' else
+                     values[name]/RM_SCALE if name == 'Rm' else values[name] for name in names], dtype=float)
+
+
+def calibrate(records,fit=('k','epsilon','e'),targets=None,initial=None,fixed=None,weights=None,
+              ts=0.1,confidence=0.95):
+    '''
+    AJUSTE DE PARÁMETROS DE LA TORTA A LOS REGISTROS DE PLANTA
+    records: arreglo estructurado de load_records
+    fit: parámetros ajustados (claves de PARAMS); alpha_prima y s implican torta compresible
+    targets: salidas comparadas (por defecto las columnas medidas que también son salidas de cycle.run_cycles,
+             sin las geométricas de GEOMETRY)
+    initial: valores iniciales (por defecto cycle.DEFAULTS; alpha_prima desde k y epsilon)
+    fixed: parámetros fijos del ciclo para todos los registros
+    weights: peso por salida (por defecto 1)
+    ts: tiempo de muestreo [s] con el que se generaron los registros
+    confidence: nivel de los intervalos de confianza
+    Retorna un diccionario con 'params', 'ci', 'stderr', 'residuals', 'cost', 'nfev', 'success'.
+    '''
+    from scipy.optimize import least_squares
+    from scipy.stats import t as student_t
+
+    fit = tuple(fit)
+    unknown = set(fit) - set(PARAMS)
+    if unknown:
+        raise ValueError("Parámetros no ajustables: " + ", ".join(sorted(unknown)))
+
+    inputs = record_inputs(records, fixed)
+    for name in fit:
+        inputs.pop(name, None)
+    if 'alpha_prima' in fit or 's' in fit:
+        inputs['incompressible'] = False
+
+    if targets is None:
+        targets = [name for name in records.dtype.names
+                   if name in cycle.OUTPUTS and name not in inputs and name not in GEOMETRY
+                   and np.any(np.isfinite(records[name]))]
+    measured = np.array([np.asarray(records[name], dtype=float) for name in targets])      # (salidas, registros)
+    valid = np.isfinite(measured)
+    scale = np.nanmean(np.abs(measured), axis=1)
+    scale = np.where(scale > 0, scale, 1.0)[:, None]
+    w = np.array([(weights or {}).get(name, 1.0) for name in targets])[:, None]
+
+    start = dict(cycle.DEFAULTS)
+    start.update(fixed or {})
+    if 'alpha_prima' not in (initial or {}):
+        start['alpha_prima'] = 1/(start['k']*start['solid_dens']*(1-start['epsilon']))
+    start.update(initial or {})
+    z0 = _to_internal(start, fit)
+    lower = _to_internal({name: PARAMS[name][1][0] for name in fit}, fit)
+    upper = _to_internal({name: PARAMS[name][1][1] for name in fit}, fit)
+    z0 = np.clip(z0, lower, upper)
+
+    def residuals(z):
+        params = dict(inputs)
+        params.update(_to_physical(z, fit))
+        with np.errstate(all='ignore'):
+            res = cycle.run_cycles(ts=ts, **params)
+        sim = np.array([np.broadcast_to(res[name], measured.shape[1:]) for name in targets])
+        r = w*(sim - measured)/scale
+        r = np.where(np.isfinite(r), r, 1e3)        # penaliza puntos sin solución física
+        return r[valid]
+
+    sol = least_squares(residuals, z0, bounds=(lower, upper), x_scale='jac')
+
+    #### INTERVALOS DE CONFIANZA (linealización en la solución) ####
+    m, n = sol.fun.size, len(fit)
+    dof = m - n
+    J = sol.jac
+    _, sv, Vt = np.linalg.svd(J, full_matrices=False)
+    tol = sv[0]*max(J.shape)*np.finfo(float).eps if sv.size else 0
+    s2 = 2*sol.cost/dof if dof > 0 else np.nan
+    with np.errstate(divide='ignore', invalid='ignore'):
+        inv_sv2 = np.where(sv > tol, 1/sv**2, np.inf)
+        var = np.array([np.sum(np.where(np.abs(Vt[:, i]) > 1e-8, Vt[:, i]**2*inv_sv2, 0)) for i in range(n)])*s2
+    stderr_z = np.sqrt(var)
+    tq = student_t.ppf(0.5 + confidence/2, dof) if dof > 0 else np.nan
+
+    params = _to_physical(sol.x, fit)
+    ci = {}
+    stderr = {}
+    for i, name in enumerate(fit):
+        if not np.isfinite(stderr_z[i]):
+            ci[name] = (-np.inf, np.inf) if PARAMS[name][0] == 'lin' else (0.0, np.inf)      # no identificable
+            stderr[name] = np.inf
+            continue
+        lo_z, hi_z = sol.x[i] - tq*stderr_z[i], sol.x[i] + tq*stderr_z[i]
+        if PARAMS[name][0] == 'log':
+            ci[name] = (10**lo_z, 10**hi_z)
+            stderr[name] = params[name]*np.log(10)*stderr_z[i]
+        else:
+            factor = RM_SCALE if name == 'Rm' else 1
+            ci[name] = (lo_z*factor, hi_z*factor)
+            stderr[name] = stderr_z[i]*factor
+
+    return {'params': params, 'ci': ci, 'stderr': stderr, 'confidence': confidence, 'targets': list(targets),
+            'residuals': sol.fun, 'cost': float(sol.cost), 'dof': dof, 'nfev': sol.nfev, 'success': bool(sol.success)}
@@ -0,0 +1,283 @@
+import numpy as np
+
+from RVDF import RVDF, slurry_cake
+import filtration
+import dewatering
+import washing
+import bx_calc
+from pol_calc import pol_calc
+import profiling
+
+""" ------ EVALUACIÓN VECTORIZADA DEL CICLO COMPLETO DEL TAMBOR ------ """
+### Misma cadena que process_simulation.py: filtración -> secado 1 -> lavado -> secado 2 -> Brix -> pol
+### evaluada para arreglos de puntos de operación sin ciclos de Python.
+
+####### VALORES POR DEFECTO (caso base de process_simulation.py) #########
+DEFAULTS = {
+    'P_diff': 20000,            # Caída de presión [Pa]
+    'rd': 1.5,                  # Radio del tambor [m]
+    'L': 4.3,                   # Largo del tambor [m]
+    'filtration_angle': 75,     # Ángulo de filtración nominal [°]
+    'wsh_angle': 15,            # Ángulo de lavado [°]
+    'dew_angle1': 15,           # Ángulo de secado 1 nominal [°]
+    'dew_angle2': 35,           # Ángulo de secado 2 [°]
+    'w': 1.2,                   # Velocidad de rotación [rpm]
+    'Rm': 0,                    # Resistencia del medio filtrante [1/m]
+    'nivel': 0.95,              # Nivel del tanque de lodos []
+    'u': 400*10**-3,            # Viscosidad de la suspensión [Pa*s]
+    'c': 50,                    # Sólidos secos por unidad de volumen filtrado [kg/m3]
+    'k': 2*10**-13,             # Permeabilidad [m2]
+    's': 0,                     # índice de compresibilidad []
+    'alpha_prima': 0,           # Resistencia específica a 1 Pa (torta compresible) [m/kg]
+    'incompressible': True,     # Torta incompresible
+    'Bx_0': 15,                 # Grados brix de lodo de entrada
+    'epsilon': 0.5,             # Porosidad []
+    'solid_dens': 500,          # Densidad de sólidos [kg/m3]
+    'filtrate_dens': None,      # Densidad del jugo filtrado [kg/m3] (None: bx_calc.calc_dens(Bx_0))
+    'surface_tension': 0.07,    # Tensión superficial del filtrado [N/m]
+    'wsh_Q': 0.0015,            # Tasa de lavado con agua [m3/s]
+    'e': 0.8,                   # Eficiencia del lavado []
+    'SS_agua': 0,               # Sólidos solubles en el agua de lavado [kg]
+    'v0': 0.0001,               # Volumen filtrado inicial [m3]
+}
+
+OUTPUTS = ('filtration_angle', 'dew_angle1', 'tf', 'Af', 'alpha', 'Vf', 'thickness', 'Q_mean', 'W_cake',
+           'S_dew1', 'M_dew1', 'Vf_dew1', 'Vf_wsh', 'r', 'wsh_ratio', 'S', 'M', 'irreduc_S', 'Vf_dew2',
+           'retention', 'V_total', 'cycle_time', 'rate', 'Bx', 'pol')
+
+
+def last_sample(t_end, ts):
+    '''
+    ÚLTIMO INSTANTE DE np.arange(0, t_end, ts)
+    Con ts = None se usa el tiempo final exacto de la etapa.
+    '''
+    if ts is None:
+        return t_end
+    return (np.ceil(t_end/ts)-1)*ts
+
+
+@profiling.instrument()
+def geometry(p):
+    '''
+    ÁNGULOS REALES, TIEMPOS Y ÁREAS DE CADA ZONA (solo dependen del nivel, la velocidad y la geometría)
+    '''
+    w = p['w']
+    rd = p['rd']
+    L = p['L']
+    filtration_angle, dew_angle1 = RVDF.real_filtration_angle(p['filtration_angle'], p['dew_angle1'], p['nivel'])
+
+    return {
+        'filtration_angle': filtration_angle,   # Ángulo real de filtración [°]
+        'dew_angle1': dew_angle1,               # Ángulo real de secado 1 [°]
+        'tf': RVDF.angle_to_time(filtration_angle, w),                # Tiempo de filtración [s]
+        'Af': RVDF.drum_filter_area(rd, L, filtration_angle),          # Área de filtración [m2]
+        'dew_t1': RVDF.angle_to_time(dew_angle1, w),
+        'dew_A1': RVDF.drum_filter_area(rd, L, dew_angle1),
+        'wsh_t': RVDF.angle_to_time(p['wsh_angle'], w),
+        'wsh_A': RVDF.drum_filter_area(rd, L, p['wsh_angle']),
+        'dew_t2': RVDF.angle_to_time(p['dew_angle2'], w),
+        'dew_A2': RVDF.drum_filter_area(rd, L, p['dew_angle2']),
+        'cycle_time': 60/w,                     # Duración del ciclo de rotación [s]
+    }
+
+
+@profiling.instrument()
+def cake(p):
+    '''
+    RESISTENCIA ESPECÍFICA DE LA TORTA Y DENSIDAD DEL FILTRADO
+    '''
+    filtrate_dens = p['filtrate_dens']
+    if filtrate_dens is None:
+        filtrate_dens = bx_calc.calc_dens(p['Bx_0'])
+    alpha = np.where(p['incompressible'], 1/(p['k']*p['solid_dens']*(1-p['epsilon'])),
+                     p['alpha_prima']*(p['P_diff']**p['s']))    # [m/kg]
+
+    return {'alpha': alpha, 'filtrate_dens': filtrate_dens}
+
+
+@profiling.instrument()
+def formation(p, geo, cake, ts=None):
+    '''
+    ETAPA DE FILTRACIÓN Y FORMACIÓN DE LA TORTA
+    '''
+    alpha = cake['alpha']
+    Vf, q, thickness = filtration.analytic_volume(last_sample(geo['tf'], ts), p['P_diff'], geo['Af'], p['u'], alpha,
+                                                  p['c'], p['Rm'], p['k'], p['v0'])
+    Q_mean = filtration.calc_Q(p['rd'], p['L'], geo['filtration_angle'], p['w'], p['P_diff'], p['u'], alpha, p['c'], p['s'])
+
+    return {
+        'Vf': Vf,                               # Volumen filtrado en formación [m3]
+        'thickness': thickness,                 # Espesor de la torta [m]
+        'Q_mean': Q_mean,                       # Velocidad de filtración media [m3/s]
+        'W_cake': p['c']*Q_mean,                # Producción de sólidos [kg/s]
+    }
+
+
+@profiling.instrument()
+def dewatering_zones(p, geo, cake, form, ts=None, model='correlation'):
+    '''
+    ETAPAS DE SECADO 1 Y 2 (el secado 2 no depende del lavado)
+    model: 'correlation' o 'fv' (ver dewatering.dewatering_state)
+    '''
+    args = (p['P_diff'], p['epsilon'], cake['alpha'], p['solid_dens'], cake['filtrate_dens'], p['surface_tension'],
+            p['u'], p['k'], form['thickness'])
+    with profiling.span('dewatering1'):
+        S1, M1, irreduc_S, Vf_dew1 = dewatering.dewatering_state(*args, geo['dew_A1'], last_sample(geo['dew_t1'], ts),
+                                                                 model=model)
+    with profiling.span('dewatering2'):
+        S2, M2, irreduc_S, Vf_dew2 = dewatering.dewatering_state(*args, geo['dew_A2'], last_sample(geo['dew_t2'], ts),
+                                                                 model=model)
+
+    return {
+        'S_dew1': S1,                           # Saturación al final del secado 1 []
+        'M_dew1': M1,                           # Humedad al final del secado 1 [%]
+        'Vf_dew1': Vf_dew1,                     # Filtrado en secado 1 [m3]
+        'S': S2,                                # Saturación final []
+        'M': M2,                                # Humedad en cachaza [%]
+        'irreduc_S': irreduc_S,                 # Saturación irreducible []
+        'Vf_dew2': Vf_dew2,                     # Filtrado en secado 2 [m3]
+    }
+
+
+@profiling.instrument()
+def washing_zone(p, geo, form, dew):
+    '''
+    ETAPA DE LAVADO (parte de la saturación al final del secado 1)
+    '''
+    Vf_wsh, r, wsh_ratio = washing.wash_state(geo['wsh_t'], geo['wsh_A'], p['epsilon'], p['e'], p['wsh_Q'],
+                                              form['thickness'], dew['S_dew1'])
+
+    return {
+        'Vf_wsh': Vf_wsh,                       # Filtrado en lavado [m3]
+        'r': r,                                 # Retención de soluto después del lavado []
+        'wsh_ratio': wsh_ratio,                 # Tasa de lavado []
+    }
+
+
+@profiling.instrument()
+def quality(p, geo, form, dew, wash):
+    '''
+    BRIX DEL FILTRADO, POL EN CACHAZA Y BALANCE DEL CICLO
+    '''
+    V_total = form['Vf'] + dew['Vf_dew1'] + wash['Vf_wsh'] + dew['Vf_dew2']
+
+    return {
+        'Bx': bx_calc.calc_Bx(p['Bx_0'], form['Vf'], p['SS_agua'], wash['Vf_wsh'], wash['r']),  # Brix del filtrado [°]
+        'pol': pol_calc(form['W_cake'], geo['Af'], p['wsh_Q']),                                 # Pol en cachaza [%]
+        'retention': dew['S']*wash['r'],        # Retención final de soluto en cachaza []
+        'V_total': V_total,                     # Volumen de filtrado en un ciclo [m3]
+        'rate': V_total/geo['cycle_time'],      # Tasa de filtración [m3/s]
+    }
+
+
+####### ETAPAS DEL CICLO: (nombre, función, parámetros que lee, etapas previas que usa) #########
+### La función recibe (p, *etapas previas[, ts]); soft_sensor.py usa esta tabla para recalcular solo las etapas
+### cuyas entradas cambiaron.
+STAGES = (
+    ('geometry', geometry, ('filtration_angle', 'dew_angle1', 'nivel', 'w', 'rd', 'L', 'wsh_angle', 'dew_angle2'), ()),
+    ('cake', cake, ('filtrate_dens', 'Bx_0', 'incompressible', 'k', 'solid_dens', 'epsilon', 'alpha_prima', 'P_diff',
+                    's'), ()),
+    ('formation', formation, ('P_diff', 'u', 'c', 'Rm', 'k', 'v0', 'rd', 'L', 'w', 's'), ('geometry', 'cake')),
+    ('dewatering', dewatering_zones, ('P_diff', 'epsilon', 'solid_dens', 'surface_tension', 'u', 'k'),
+     ('geometry', 'cake', 'formation')),
+    ('washing', washing_zone, ('epsilon', 'e', 'wsh_Q'), ('geometry', 'formation', 'dewatering')),
+    ('quality', quality, ('Bx_0', 'SS_agua', 'wsh_Q'), ('geometry', 'formation', 'dewatering', 'washing')),
+)
+
+TIMED_STAGES = ('formation', 'dewatering')     # etapas que reciben ts
+
+
+def evaluate(p, ts=None, model='correlation'):
+    '''
+    CADENA DEL CICLO PARA UN DICCIONARIO DE PARÁMETROS YA COMPLETO
+    Solo usa operaciones aritméticas y ufuncs, de modo que cualquier combinación de
+    escalares y arreglos compatibles se evalúa con broadcasting.
+    p: parámetros (claves de DEFAULTS)
+    ts: tiempo de muestreo [s] para reproducir el último punto de process_simulation.py, o None
+    model: modelo de secado, 'correlation' o 'fv' (ver dewatering.dewatering_state)
+    Retorna un diccionario con las salidas de OUTPUTS.
+    '''
+    geo = geometry(p)
+    cak = cake(p)
+    form = formation(p, geo, cak, ts)
+    dew = dewatering_zones(p, geo, cak, form, ts, model)
+    wash = washing_zone(p, geo, form, dew)
+
+    return collect(geo, cak, form, dew, wash, quality(p, geo, form, dew, wash))
+
+
+def collect(*stages):
+    '''
+    SALIDAS DEL CICLO (OUTPUTS) A PARTIR DE LOS RESULTADOS DE CADA ETAPA
+    '''
+    res = {}
+    for stage in stages:
+        res.update(stage)
+    return {name: res[name] for name in OUTPUTS}
+
+
+def complete_params(params):
+    '''
+    COMPLETA LOS PARÁMETROS CON DEFAULTS Y LOS CONVIERTE EN ARREGLOS CON BROADCASTING
+    Retorna el diccionario de parámetros y la forma común del lote.
+    '''
+    unknown = set(params) - set(DEFAULTS)
+    if unknown:
+        raise TypeError("Parámetros desconocidos: " + ", ".join(sorted(unknown)))
+
+    p = dict(DEFAULTS)
+    p.update(params)
+    names = [name for name in p if p[name] is not None]
+    arrays = np.broadcast_arrays(*[np.asarray(p[name], dtype=bool if name == 'incompressible' else float) for name in names])
+    p.update(zip(names, arrays))
+    shape = arrays[0].shape
+
+    return p, shape
+
+
+@profiling.instrument()
+def run_cycles(ts=None, model='correlation', **params):
+    '''
+    CICLO COMPLETO PARA ARREGLOS DE PUNTOS DE OPERACIÓN
+    params: cualquier clave de DEFAULTS, como escalar o arreglo (se aplica broadcasting)
+    ts: tiempo de muestreo [s] (None: tiempos finales exactos de cada etapa)
+    model: modelo de secado, 'correlation' o 'fv'; con 'fv' todas las tortas del lote se resuelven juntas
+    Retorna un diccionario con un arreglo por cada salida de OUTPUTS.
+
+    Ejemplo:
+        res = run_cycles(P_diff=np.linspace(10000, 60000, 1000), w=1.2)
+        res['pol'], res['M'], res['rate']
+    '''
+    p, shape = complete_params(params)
+    res = evaluate(p, ts, model)
+
+    return {name: np.broadcast_to(res[name], shape) for name in OUTPUTS}
+
+
+def build(**params):
+    '''
+    CREA EL FILTRO Y LOS LODOS (objetos RVDF y slurry_cake) COMO EN process_simulation.py
+    params: claves de cycle.DEFAULTS, escalares
+    Retorna (filtro, lodos) con el ángulo real de filtración, el área y el tiempo de filtración.
+    '''
+    unknown = set(params) - set(DEFAULTS)
+    if unknown:
+        raise TypeError("Parámetros desconocidos: " + ", ".join(sorted(unknown)))
+    p = dict(DEFAULTS)
+    p.update(params)
+
+    filtration_angle, dew_angle1 = RVDF.real_filtration_angle(p['filtration_angle'], p['dew_angle1'], p['nivel'])
+    tf = RVDF.angle_to_time(filtration_angle, p['w'])
+    Af = RVDF.drum_filter_area(p['rd'], p['L'], filtration_angle)
+    filtrate_dens = p['filtrate_dens']
+    if filtrate_dens is None:
+        filtrate_dens = bx_calc.calc_dens(p['Bx_0'])
+    alpha = slurry_cake.calc_alpha(p['incompressible'], p['k'], p['solid_dens'], p['epsilon'], p['alpha_prima'],
+                                   p['P_diff'], p['s'])
+
+    filtro = RVDF(p['P_diff'], p['rd'], p['L'], Af, tf, filtration_angle, p['wsh_angle'], dew_angle1,
+                  p['dew_angle2'], p['w'], p['Rm'], p['nivel'])
+    lodos = slurry_cake(alpha, p['u'], p['c'], p['k'], p['epsilon'], p['solid_dens'], filtrate_dens,
+                        p['surface_tension'], p['incompressible'], p['s'])
+
+    return filtro, lodos
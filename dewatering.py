@@ -1,63 +1,127 @@
-import matplotlib.pyplot as plt
-import math
-from sklearn import metrics
-from scipy.integrate import odeint
+from collections import namedtuple
+
 import numpy as np
 
+import adaptive
+import dewatering_fv
+import profiling
+
 """ ------ CÁLCULO DE LA ETAPA DE SECADO O DESHIDRATACIÓN DE LA TORTA ------ """
 ######### CAP 5: Solids/Liquids separations Principles of Industrial Filtration (2005) Wakeman, Tarleton ########
 
-def dewatering_process(filtro,slurry,thickness,dew_A,dew_t,zone,r,ts):
-    
-    P_diff = filtro.P_diff                      # Presión diferencial del filtro
-    epsilon = slurry.epsilon                    # Porosidad 
-    alpha = slurry.alpha                        # Resistencia dinámica de la torta
-    solid_dens = slurry.solid_dens              # Densidad de los sólidos
-    filtrate_dens = slurry.filtrate_dens        # Densidad del filtrado
-    surface_tension = slurry.surface_tension    # Tensión superficial
-    viscosity = slurry.u                        # Viscosidad de lodos
-    k = slurry.k                                # Permeabilidad de la torta
-    
+DewateringResult = namedtuple('DewateringResult', 'S M irreduc_sat V_filtrate_dew V_filtrate_dew_arr dew_time S_arr M_arr')
 
+def cake_scales(P_diff,epsilon,alpha,solid_dens,filtrate_dens,surface_tension,viscosity,k,thickness):
+    '''
+    ESCALAS DEL SECADO: saturación irreducible, presión umbral pb [N/m2] y tiempo adimensional por segundo [1/s]
+    '''
     x = 13.4*((1-epsilon)/(alpha*solid_dens*epsilon**3))**0.5        # Tamaño de partículas promedio [m]                   
     Ncap = ((epsilon**3)*x*x*(filtrate_dens*9.81*thickness+P_diff))/(((1-epsilon)**2)*thickness*surface_tension)     # Número capilar []
     irreduc_sat = 0.155*(1+0.031*Ncap**-0.49)   # Saturación irreducible []
     pb = (4.6*(1-epsilon)*surface_tension)/(epsilon*x)    # Presión normalizada 
+    theta_scale = (k*pb)/(viscosity*epsilon*(1-irreduc_sat)*thickness**2)      # Tiempo adimensional por segundo [1/s]
+    return irreduc_sat, pb, theta_scale
+
+@profiling.instrument()
+def dewatering_state(P_diff,epsilon,alpha,solid_dens,filtrate_dens,surface_tension,viscosity,k,thickness,dew_A,dew_time,dew_t_end=None,model='correlation'):
+    '''
+    ESTADO DE LA TORTA DURANTE EL SECADO (versión con broadcasting de NumPy)
+    Todas las entradas pueden ser escalares o arreglos compatibles.
+    dew_time: Tiempo(s) de secado donde se evalúa la saturación [s]
+    dew_t_end: Tiempo final de secado [s]; define la rama de la correlación (por defecto dew_time)
+    model: 'correlation' (Wakeman-Tarleton) o 'fv' (perfil en el espesor, ver dewatering_fv.py)
+    Retorna S, M, irreduc_sat, V_filtrate_dew con la forma de broadcasting de las entradas.
+    '''
+    if dew_t_end is None:
+        dew_t_end = dew_time
+
+    irreduc_sat, pb, theta_scale = cake_scales(P_diff,epsilon,alpha,solid_dens,filtrate_dens,surface_tension,viscosity,k,thickness)
     p_dimesionless = P_diff/pb                  # Presión adimensional [N/m2]
-    dew_time = np.arange(0, dew_t, ts)        # Tiempo de secado [s]
-    dew_t_theta = (k*pb*dew_time)/(viscosity*epsilon*(1-irreduc_sat)*thickness**2)      # Tiempo adimensional []
-    
-    if dew_t_theta[-1]*p_dimesionless <= 1.915:
-        SR = 1/(1+1.08*(dew_t_theta*p_dimesionless)**0.88)    # Reducción de saturación []
+    dew_t_theta = theta_scale*dew_time          # Tiempo adimensional []
+
+    if model == 'correlation':
+        SR = np.where(theta_scale*dew_t_end*p_dimesionless <= 1.915,
+                      1/(1+1.08*(dew_t_theta*p_dimesionless)**0.88),
+                      1/(1+1.46*(dew_t_theta*p_dimesionless)**0.48))    # Reducción de saturación []
+    elif model == 'fv':
+        SR = dewatering_fv.reduced_saturation(dew_t_theta*p_dimesionless, p_dimesionless)
     else:
-        SR = 1/(1+1.46*(dew_t_theta*p_dimesionless)**0.48)    # Reducción de saturación []
+        raise ValueError("model debe ser 'correlation' o 'fv'")
     S = SR*(1-irreduc_sat)+irreduc_sat     # Saturación []
     M = (S*epsilon*filtrate_dens*100)/((1-epsilon)*solid_dens)
     M = (M/(100+M))*100     # Humedad [%]
 
+    V_filtrate_dew = (1-S)*epsilon*dew_A*thickness    # Cantidad de filtrado en etapa de secado [m3]
+
+    return S, M, irreduc_sat, V_filtrate_dew
+
+@profiling.instrument()
+def dewatering_series(filtro,slurry,thickness,dew_A,dew_t,tol,model='correlation'):
+    '''
+    SECADO EN MALLA ADAPTATIVA
+    tol: tolerancia relativa sobre S(t) y el filtrado acumulado (ver adaptive.refine)
+    La rama de la correlación se fija con el tiempo final exacto dew_t.
+    Retorna adaptive.AdaptiveSeries con 'S', 'M' y 'V_filtrate_dew'; .exact(t) evalúa el modelo de secado.
+    '''
+    args = (filtro.P_diff, slurry.epsilon, slurry.alpha, slurry.solid_dens, slurry.filtrate_dens,
+            slurry.surface_tension, slurry.u, slurry.k)
+
+    def evaluate(t):
+        S, M, _, V = dewatering_state(*args,thickness,dew_A,t,dew_t_end=dew_t,model=model)
+        return dict(zip(('S', 'M', 'V_filtrate_dew'), np.broadcast_arrays(S, M, V)))
+
+    # la saturación cae como (theta*p)^0.88 cerca de t = 0: la bisección concentra ahí los puntos
+    t, y = adaptive.refine(lambda t: np.array(list(evaluate(t).values())), 0, dew_t, tol)
+    return adaptive.AdaptiveSeries(t, dict(zip(('S', 'M', 'V_filtrate_dew'), y)), evaluate)
+
+@profiling.instrument()
+def dewatering_process(filtro,slurry,thickness,dew_A,dew_t,zone,r,ts,tol=None,model='correlation'):
+    '''
+    ETAPA DE SECADO (zona 1 o 2)
+    thickness: Espesor de la torta [m]
+    dew_A: Área de secado [m2]
+    dew_t: Tiempo de secado [s]
+    zone: Zona de secado (1 o 2), solo informativa
+    r: Retención de soluto después del lavado [], solo informativa
+    ts: Tiempo de muestreo [s]
+    tol: None (malla np.arange(0, dew_t, ts)) o tolerancia relativa de la malla adaptativa (ts se ignora)
+    model: 'correlation' o 'fv' (ver dewatering_state)
+    Retorna DewateringResult(S, M, irreduc_sat, V_filtrate_dew, V_filtrate_dew_arr, dew_time, S_arr, M_arr) sin imprimir ni graficar.
+    '''
+
+    P_diff = filtro.P_diff                      # Presión diferencial del filtro
+    epsilon = slurry.epsilon                    # Porosidad 
+    alpha = slurry.alpha                        # Resistencia dinámica de la torta
+    solid_dens = slurry.solid_dens              # Densidad de los sólidos
+    filtrate_dens = slurry.filtrate_dens        # Densidad del filtrado
+    surface_tension = slurry.surface_tension    # Tensión superficial
+    viscosity = slurry.u                        # Viscosidad de lodos
+    k = slurry.k                                # Permeabilidad de la torta
+    
+    if tol is None:
+        dew_time = np.arange(0, dew_t, ts)        # Tiempo de secado [s]
+        S, M, irreduc_sat, V_filtate_dew_arr = dewatering_state(P_diff,epsilon,alpha,solid_dens,filtrate_dens,surface_tension,viscosity,
+                                                                k,thickness,dew_A,dew_time,dew_t_end=dew_time[-1],model=model)
+    else:
+        series = dewatering_series(filtro,slurry,thickness,dew_A,dew_t,tol,model)
+        dew_time, S, M, V_filtate_dew_arr = series.t, series['S'], series['M'], series['V_filtrate_dew']
+        irreduc_sat = cake_scales(P_diff,epsilon,alpha,solid_dens,filtrate_dens,surface_tension,viscosity,k,thickness)[0]
+    irreduc_sat = float(irreduc_sat)
+
     V_filtrate_dew = (1-float(S[-1]))*epsilon*dew_A*thickness    # Cantidad de filtrado en etapa de secado [m3]
-    V_filtate_dew_arr = (1-S)*epsilon*dew_A*thickness
-
-    plt.suptitle('Dewatering process '+str(zone))
-    plt.plot(dew_time,S*100, label="Saturation")
-    # plt.plot(dew_time,V_filtate_dew_time, label="Saturation")
-    plt.plot(dew_time,M, label="Moisture")
-    plt.ylabel('Percentage [%]')
-    plt.xlabel('Time [s]')
-    plt.grid()
-    plt.legend()
-    plt.show()
-
-    if zone == 1:
-        print("###### DEWATERING 1 ########")
-        print("Filtrado en dewatering 1 [m3]: ","{:.6f}".format(V_filtrate_dew)+"\n")
-        
-    if zone == 2:
-        print("###### DEWATERING 2 ########")
-        print("Filtrado en dewatering 2 [m3]: ","{:.6f}".format(V_filtrate_dew))
-        print("Humedad en cachaza [%]: ","{:.4f}".format(float(M[-1])))
-        print("Saturación irreducible de la torta []: ","{:.4f}".format(irreduc_sat))
-        print("Saturación de final []: ","{:.4f}".format(float(S[-1])))
-        print("Retención final de soluto en cachaza []: ","{:.4f}".format(float(S[-1])*r)+"\n")
-
-    return float(S[-1]), float(M[-1]), irreduc_sat,  V_filtrate_dew, V_filtate_dew_arr # retornar valores finales de saturación y humedad
\ No newline at end of file
+
+    return DewateringResult(float(S[-1]), float(M[-1]), irreduc_sat, V_filtrate_dew, V_filtate_dew_arr, dew_time, S, M) # retornar valores finales de saturación y humedad
+
+def saturation_profile(filtro,slurry,thickness,dew_t,n_cells=200,n_steps=200):
+    '''
+    PERFIL DE SATURACIÓN EN EL ESPESOR AL FINAL DEL SECADO (modelo 'fv')
+    thickness: Espesor de la torta [m]
+    dew_t: Tiempo de secado [s]
+    Retorna (z, S): profundidad del centro de cada celda desde la superficie [m] y saturación [].
+    '''
+    irreduc_sat, pb, theta_scale = cake_scales(filtro.P_diff,slurry.epsilon,slurry.alpha,slurry.solid_dens,slurry.filtrate_dens,
+                                               slurry.surface_tension,slurry.u,slurry.k,thickness)
+    p_dimesionless = filtro.P_diff/pb
+    Se = dewatering_fv.solve_profiles(theta_scale*dew_t*p_dimesionless, p_dimesionless, n_cells, n_steps)[2][0]
+    z = (np.arange(n_cells) + 0.5)/n_cells*thickness
+    return z, Se*(1-irreduc_sat)+irreduc_sat
@@ -0,0 +1,98 @@
+import numpy as np
+
+import profiling
+
+""" ------ SECADO DE LA TORTA RESUELTO EN EL ESPESOR (VOLÚMENES FINITOS 1-D) ------ """
+### Alternativa a la correlación de Wakeman-Tarleton de dewatering.py: ecuación de desaturación de la fase líquida
+### en la coordenada adimensional del espesor z = profundidad/espesor (0: superficie, 1: medio filtrante),
+###
+###     dSe/dX = -d(krl)/dz + (1/p*) d(D dSe/dz)/dz,     X = theta*p*
+###
+### con Se la saturación reducida, krl = Se^((2+3*lam)/lam) y pc/pb = Se^(-1/lam) (Brooks-Corey), de modo que
+### D = -krl*d(pc/pb)/dSe = Se^((1+2*lam)/lam)/lam. Flujo nulo en la superficie y salida libre en el medio.
+### Esquema implícito linealizado (Euler hacia atrás) en pasos geométricos de X; cada paso de todas las tortas del
+### lote es un único sistema tridiagonal por bloques (scipy.linalg.solve_banded).
+
+LAMBDA = 5.0        # Índice de distribución de tamaño de poro (ajustado a la correlación para 0.3 <= p* <= 10)
+
+
+@profiling.instrument()
+def solve_profiles(X_end,p_dimensionless,n_cells=200,n_steps=200,lam=LAMBDA,first_step=1e-5):
+    '''
+    PERFILES DE SATURACIÓN REDUCIDA DE UN LOTE DE TORTAS
+    X_end: theta*p* final de cada torta (arreglo 1-D)
+    p_dimensionless: Presión adimensional p* = P_diff/pb de cada torta
+    n_cells: Celdas en el espesor
+    n_steps: Pasos de tiempo (geométricos, el primero de first_step*X_end)
+    lam: Índice de Brooks-Corey
+    Retorna (g, SR, Se): X de cada paso es X_end*g; SR (tortas, n_steps+1) es la saturación reducida media y
+    Se (tortas, n_cells) el perfil final.
+    '''
+    from scipy.linalg import solve_banded      # importación diferida: scipy solo si se usa este modelo
+
+    X_end = np.atleast_1d(np.asarray(X_end, dtype=float))
+    p = np.broadcast_to(np.asarray(p_dimensionless, dtype=float), X_end.shape)[:, None]
+    M, N = X_end.size, n_cells
+    dz = 1.0/N
+    n_kr = (2 + 3*lam)/lam          # exponente de la permeabilidad relativa
+    n_D = (1 + 2*lam)/lam           # exponente de la difusividad capilar
+
+    g = np.concatenate(([0.0], np.geomspace(first_step, 1.0, n_steps)))
+    SR = np.empty((M, g.size))
+    SR[:, 0] = 1.0
+    Se = np.ones((M, N))            # torta saturada al inicio del secado
+
+    Df = np.zeros((M, N+1))         # difusividad en las caras; nula en la superficie y en el medio filtrante
+    grad = np.zeros((M, N+1))
+    kr_up = np.zeros((M, N+1))      # flujo advectivo aguas arriba en cada cara (cara 0: superficie, sin flujo)
+    dkr_up = np.zeros((M, N+1))
+    ab = np.zeros((3, M*N))
+
+    for j in range(1, g.size):
+        r = (X_end*(g[j] - g[j-1]))[:, None]/dz
+        kr_up[:, 1:] = Se**n_kr
+        dkr_up[:, 1:] = n_kr*kr_up[:, 1:]/np.maximum(Se, 1e-300)
+        D = Se**n_D/(lam*p)
+        Df[:, 1:-1] = 0.5*(D[:, 1:] + D[:, :-1])
+        grad[:, 1:-1] = np.diff(Se, axis=1)
+
+        # incógnita: cambio de Se en el paso; krl linealizado alrededor del paso anterior, D retrasado
+        rhs = -r*(kr_up[:, 1:] - kr_up[:, :-1]) + r/dz*(Df[:, 1:]*grad[:, 1:] - Df[:, :-1]*grad[:, :-1])
+        ab[1] = (1 + r*dkr_up[:, 1:] + r/dz*(Df[:, 1:] + Df[:, :-1])).ravel()
+        ab[0, 1:] = (-r/dz*Df[:, 1:]).ravel()[:-1]                         # superdiagonal
+        ab[2, :-1] = (-r*dkr_up[:, :-1] - r/dz*Df[:, :-1]).ravel()[1:]     # subdiagonal
+        # entre tortas los acoplamientos son nulos: Df y dkr_up valen 0 en la cara 0 y en la cara N
+        Se += solve_banded((1, 1), ab, rhs.ravel(), check_finite=False).reshape(M, N)
+        np.clip(Se, 0.0, 1.0, out=Se)
+        SR[:, j] = Se.mean(axis=1)
+
+    return g, SR, Se
+
+
+def reduced_saturation(X,p_dimensionless,n_cells=200,n_steps=200,lam=LAMBDA,batch=1000):
+    '''
+    SATURACIÓN REDUCIDA MEDIA CON EL MODELO EN EL ESPESOR (en lugar de la correlación de Wakeman-Tarleton)
+    X: theta*p* (escalar o arreglo)
+    p_dimensionless: p* compatible con X por broadcasting
+    Las tortas se agrupan por p* (X es un reescalado del tiempo): cada valor distinto se resuelve una sola vez hasta
+    su X máximo y los demás tiempos se interpolan; los grupos se resuelven en lotes de hasta batch tortas.
+    '''
+    X, p = np.broadcast_arrays(np.asarray(X, dtype=float), np.asarray(p_dimensionless, dtype=float))
+    p_unique, inv = np.unique(p.ravel(), return_inverse=True)
+    X_flat = X.ravel()
+    X_end = np.zeros(p_unique.size)
+    np.maximum.at(X_end, inv, X_flat)
+
+    g = None
+    SR_hist = np.empty((p_unique.size, n_steps+1))
+    for start in range(0, p_unique.size, batch):
+        part = slice(start, start+batch)
+        g, SR_hist[part], _ = solve_profiles(X_end[part], p_unique[part], n_cells, n_steps, lam)
+
+    #### INTERPOLACIÓN EN LA MALLA GEOMÉTRICA COMÚN ####
+    u = np.divide(X_flat, X_end[inv], out=np.zeros_like(X_flat), where=X_end[inv] > 0)
+    idx = np.clip(np.searchsorted(g, u, side='right') - 1, 0, g.size-2)
+    w = (u - g[idx])/(g[idx+1] - g[idx])
+    SR = SR_hist[inv, idx]*(1 - w) + SR_hist[inv, idx+1]*w
+
+    return SR.reshape(X.shape)
@@ -0,0 +1,155 @@
+import csv
+import itertools
+
+import numpy as np
+
+import cycle
+
+""" ------ SIMULACIÓN DINÁMICA DE PLANTA: REVOLUCIONES CONSECUTIVAS CON TANQUE DE LODOS ------ """
+### Cada revolución del tambor extrae del tanque el filtrado de formación, los sólidos de la torta y el
+### líquido retenido en ella; la alimentación de lodos repone volumen y sólidos. El nivel y la concentración
+### resultantes son las entradas de la siguiente revolución.
+
+RECORD_FIELDS = ('revolution', 't', 'nivel', 'c', 'feed', 'Vf', 'V_total', 'solids', 'thickness',
+                 'M', 'Bx', 'pol', 'overflow')
+
+
+class MudTank:
+
+    """ TANQUE DE LODOS CON BALANCE DE LÍQUIDO Y SÓLIDOS """
+
+    def __init__(self,capacity,nivel,c,solid_dens):
+        '''
+        capacity: Volumen del tanque al nivel 1 [m3]
+        nivel: Nivel inicial []
+        c: Sólidos secos por unidad de volumen de líquido [kg/m3]
+        solid_dens: Densidad de sólidos [kg/m3]
+        '''
+        self.capacity = capacity
+        self.solid_dens = solid_dens
+        # nivel*capacity = V_liq + m_solids/solid_dens, con m_solids = c*V_liq
+        self.V_liq = nivel*capacity/(1 + c/solid_dens)    # Volumen de líquido [m3]
+        self.m_solids = c*self.V_liq                      # Masa de sólidos [kg]
+
+    @property
+    def nivel(self):
+        return (self.V_liq + self.m_solids/self.solid_dens)/self.capacity
+
+    @property
+    def c(self):
+        return self.m_solids/self.V_liq if self.V_liq > 0 else 0.0
+
+    def step(self,V_feed,c_feed,V_out,m_out):
+        '''
+        BALANCE DE UNA REVOLUCIÓN
+        V_feed: Líquido alimentado [m3]
+        c_feed: Sólidos en la alimentación [kg/m3 de líquido]
+        V_out: Líquido extraído (filtrado + líquido retenido en la torta) [m3]
+        m_out: Sólidos extraídos en la torta [kg]
+        Retorna el volumen de lodos derramado por rebose [m3].
+        '''
+        self.V_liq = max(self.V_liq + V_feed - V_out, 0.0)
+        self.m_solids = max(self.m_solids + c_feed*V_feed - m_out, 0.0)
+
+        overflow = (self.nivel - 1)*self.capacity
+        if overflow > 0:
+            # el rebose sale con la composición del tanque
+            keep = 1 - overflow/(self.nivel*self.capacity)
+            self.V_liq *= keep
+            self.m_solids *= keep
+            return overflow
+        return 0.0
+
+
+def _feed_series(feed):
+    '''
+    feed: escalar [m3/s], iterable con un valor por revolución o función feed(t)
+    '''
+    if callable(feed):
+        return None, feed
+    if np.ndim(feed) == 0:
+        return itertools.repeat(float(feed)), None
+    return iter(feed), None
+
+
+def simulate(feed,capacity,n_revolutions=None,c_feed=None,nivel=None,ts=None,**params):
+    '''
+    GENERADOR DE REGISTROS POR REVOLUCIÓN
+    feed: Caudal de líquido alimentado al tanque [m3/s]; escalar, serie por revolución o función feed(t)
+    capacity: Volumen del tanque al nivel 1 [m3]
+    n_revolutions: Número de revoluciones (None: hasta agotar la serie de alimentación)
+    c_feed: Sólidos en la alimentación [kg/m3] (por defecto el c inicial)
+    nivel: Nivel inicial del tanque [] (por defecto cycle.DEFAULTS['nivel'])
+    ts: Tiempo de muestreo [s] de las etapas (None: tiempos exactos)
+    params: Parámetros fijos del ciclo (claves de cycle.DEFAULTS)
+    Genera un diccionario por revolución con las claves de RECORD_FIELDS.
+
+    Ejemplo (turno de 8 h a 1.2 rpm):
+        records = simulate(feed=2.5e-4, capacity=3, n_revolutions=576, w=1.2)
+        write_records(records, 'turno.csv')
+    '''
+    unknown = set(params) - set(cycle.DEFAULTS)
+    if unknown:
+        raise TypeError("Parámetros desconocidos: " + ", ".join(sorted(unknown)))
+    if callable(feed) and n_revolutions is None:
+        raise ValueError("n_revolutions es obligatorio cuando feed es una función")
+
+    p = dict(cycle.DEFAULTS)
+    p.update(params)
+    if nivel is not None:
+        p['nivel'] = nivel
+    if c_feed is None:
+        c_feed = p['c']
+
+    tank = MudTank(capacity, p['nivel'], p['c'], p['solid_dens'])
+    series, feed_fun = _feed_series(feed)
+    revolutions = itertools.count() if n_revolutions is None else range(n_revolutions)
+    t = 0.0
+
+    for n in revolutions:
+        if feed_fun is not None:
+            Q_feed = float(feed_fun(t))
+        else:
+            Q_feed = next(series, None)
+            if Q_feed is None:
+                return
+        cycle_time = 60/p['w']
+
+        p['nivel'] = min(tank.nivel, 1.0)
+        p['c'] = tank.c
+        with np.errstate(all='ignore'):
+            res = cycle.evaluate(p, ts)
+        Vf = float(res['Vf'])
+
+        if np.isfinite(Vf) and Vf > 0:
+            solids = p['c']*Vf                                                      # sólidos en la torta [kg]
+            retained = p['epsilon']*float(res['Af'])*float(res['thickness'])        # líquido retenido en la torta [m3]
+            record = {'Vf': Vf, 'V_total': float(res['V_total']), 'thickness': float(res['thickness']),
+                      'M': float(res['M']), 'Bx': float(res['Bx']), 'pol': float(res['pol'])}
+        else:
+            # nivel demasiado bajo: el tambor no se sumerge y no forma torta
+            solids = retained = Vf = 0.0
+            record = {'Vf': 0.0, 'V_total': 0.0, 'thickness': 0.0, 'M': np.nan, 'Bx': np.nan, 'pol': np.nan}
+
+        record.update({'revolution': n, 't': t, 'nivel': p['nivel'], 'c': p['c'], 'feed': Q_feed,
+                       'solids': solids})
+        record['overflow'] = tank.step(Q_feed*cycle_time, c_feed, Vf + retained, solids)
+        t += cycle_time
+
+        yield record
+
+
+def write_records(records,path,fields=RECORD_FIELDS):
+    '''
+    ESCRIBE LOS REGISTROS A CSV A MEDIDA QUE SE GENERAN (memoria constante)
+    fields: Columnas escritas; las demás claves de los registros se omiten (p. ej. station.STATION_FIELDS)
+    Retorna el número de registros escritos.
+    '''
+    n = 0
+    with open(path, 'w', newline='') as fh:
+        writer = csv.DictWriter(fh, fieldnames=fields, extrasaction='ignore')
+        writer.writeheader()
+        for record in records:
+            writer.writerow(record)
+            n += 1
+    return n
@@ -1,15 +1,25 @@
-import matplotlib.pyplot as plt
 import math
-from sklearn import metrics
-from scipy.integrate import odeint
+from collections import namedtuple
 
 import numpy as np
 
+import adaptive
+import profiling
+
 """ ------ CÁLCULO DE LA ETAPA DE FILTRACIÓN Y FORMACIÓN DE LA TORTA ------ """
 ### Bioseparaciones (2011), Tejeda, et. al
 ### Operaciones unitarias en ingeniería química (2007), McCabe, et al
 ### Solid/Liquid separations Principles of Industrial Filtration (2005) Wakeman, Tarleton
 
+FiltrationResult = namedtuple('FiltrationResult', 'v Vf q l Q_mean W_cake t')
+
+def auc(t,q):
+    '''
+    ÁREA BAJO LA CURVA q(t) POR LA REGLA DEL TRAPECIO (volumen filtrado [m3])
+    '''
+    trapezoid = getattr(np, 'trapezoid', None) or np.trapz     # np.trapz en NumPy < 2.0
+    return float(trapezoid(q, t))
+
 def f(V,t,P_diff,A,u,alpha,c,Rm):
     """this is the rhs of the ODE to integrate, i.e. dV/dt=f(V,t)"""
     '''
@@ -20,11 +30,77 @@ def f(V,t,P_diff,A,u,alpha,c,Rm):
     u: Viscosidad [Pa*s]
     alpha: Resistencia específica de la torta [m/kg]
     c: Sólidos secos por unidad de volumen filtrado [kg/m3]
-    Rm: Resistencia del medio filtrante [1/m]
+    Rm: Resistencia del medio filtrante [1/m], constante o función Rm(t)
     '''
+    if callable(Rm):
+        Rm = Rm(t)
+
+    return (P_diff*A)/(u*((alpha*c*(V/A))+Rm))
 
+def ruth_volume(t,P_diff,A,u,alpha,c,Rm,v0=0.0001):
+    '''
+    SOLUCIÓN ANALÍTICA DE LA ECUACIÓN DE RUTH A PRESIÓN CONSTANTE
+    Integra u*(alpha*c*V/A + Rm) dV = P_diff*A dt desde V(0) = v0:
+        (alpha*c/(2A))*V^2 + Rm*V = (alpha*c/(2A))*v0^2 + Rm*v0 + P_diff*A*t/u
+    Acepta escalares o arreglos de NumPy (se aplica broadcasting).
+    t: Tiempo [s]
+    v0: Volumen filtrado inicial [m3]
+    '''
+    a = alpha*c/A                                    # pendiente de la resistencia de la torta [1/m4]
+    K = 0.5*a*v0*v0 + Rm*v0 + P_diff*A*t/u           # término independiente [m2*m3/m3]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # forma racionalizada de (-Rm + sqrt(Rm^2 + 2aK))/a, estable cuando a*K << Rm^2
+        V = 2*K/(Rm + np.sqrt(Rm*Rm + 2*a*K))
+    return V
+
+def ruth_rate(V,P_diff,A,u,alpha,c,Rm):
+    '''
+    VELOCIDAD INSTANTÁNEA DE FILTRACIÓN dV/dt [m3/s]
+    V: Volumen filtrado [m3]
+    Es el lado derecho de la EDO (f). La versión original usaba q = A^2*P_diff/(u*alpha*c*V), que omite Rm:
+    ambas coinciden con Rm = 0 (caso base); con Rm > 0 q ahora incluye la resistencia del medio.
+    '''
     return (P_diff*A)/(u*((alpha*c*(V/A))+Rm))
 
+def cake_thickness(V,A,alpha,c,k):
+    '''
+    ESPESOR DE LA TORTA [m]
+    l = alpha*c*k*V/A: la fórmula original l = k*A*P_diff/(u*q) con el q original (sin Rm) escrita en función
+    de V, de modo que el espesor no cambia con Rm (solo depende del volumen filtrado)
+    '''
+    return (alpha*c*V*k)/A
+
+@profiling.instrument()
+def analytic_volume(t,P_diff,A,u,alpha,c,Rm,k,v0=0.0001):
+    '''
+    MOTOR ANALÍTICO DE FILTRACIÓN: V(t), q(t) y l(t) en forma cerrada
+    Retorna arreglos con la forma de broadcasting de las entradas.
+    '''
+    v = ruth_volume(t,P_diff,A,u,alpha,c,Rm,v0)
+    q = ruth_rate(v,P_diff,A,u,alpha,c,Rm)
+    l = cake_thickness(v,A,alpha,c,k)
+
+    return v, q, l
+
+@profiling.instrument()
+def odeint_volume(t,P_diff,A,u,alpha,c,Rm,v0=0.0001):
+    '''
+    INTEGRACIÓN NUMÉRICA CON odeint (respaldo del motor analítico)
+    Se usa cuando Rm cambia con el tiempo (Rm callable) o cuando se pide explícitamente.
+    '''
+    from scipy.integrate import odeint      # importación diferida: scipy solo se carga en el respaldo
+
+    if profiling.active() is None:
+        v = odeint(f, v0, t, args = (P_diff,A,u,alpha,c,Rm))  # actual computation of v(t)
+    else:
+        # con el perfilador activo se guardan las estadísticas del integrador (acumuladas al último tiempo)
+        v, info = odeint(f, v0, t, args = (P_diff,A,u,alpha,c,Rm), full_output = True)
+        profiling.count(nfe = int(info['nfe'][-1]), nst = int(info['nst'][-1]), nje = int(info['nje'][-1]),
+                        failed = int(info['message'] != 'Integration successful.'))
+
+    return v[:,0]
+
+@profiling.instrument()
 def calc_Q(rd,L,phi,omega,P_diff,u,alpha,c,s):
     '''
     Q: Flujo volumétrico [m3/t]
@@ -44,11 +120,67 @@ def calc_Q(rd,L,phi,omega,P_diff,u,alpha,c,s):
 
     return Q
 
-def volume(filtro,slurry,ts,tf):
-
+def _volume_solver(filtro,slurry,method,v0=0.0001):
+    '''
+    FUNCIÓN t -> (v, q, l) SEGÚN EL MÉTODO ('auto', 'analytic' u 'odeint')
+    '''
     P_diff = filtro.P_diff
     A = filtro.Af
     Rm = filtro.Rm
+    u = slurry.u
+    alpha = slurry.alpha
+    c = slurry.c
+    k = slurry.k
+
+    if method not in ('auto', 'analytic', 'odeint'):
+        raise ValueError("method debe ser 'auto', 'analytic' u 'odeint'")
+    if method == 'analytic' and callable(Rm):
+        raise ValueError("La solución analítica requiere Rm constante")
+
+    def solve(t):
+        v = None
+        if method != 'odeint' and not callable(Rm):
+            v = ruth_volume(t,P_diff,A,u,alpha,c,Rm,v0)
+            if method == 'auto' and not np.all(np.isfinite(v)):
+                v = None        # la forma cerrada no es válida (p. ej. alpha*c = Rm = 0): usar odeint
+                profiling.count(odeint_fallback = 1)
+        if v is None:
+            # odeint integra desde t = 0, que se agrega si la malla no lo incluye
+            start = 0 if t[0] == 0 else 1
+            v = odeint_volume(np.r_[0.0, t][1-start:],P_diff,A,u,alpha,c,Rm,v0)[start:]
+
+        Rm_t = Rm(t) if callable(Rm) else Rm
+        q = ruth_rate(v,P_diff,A,u,alpha,c,Rm_t)     # q instantánea [m3/s]
+        l = cake_thickness(v,A,alpha,c,k)      # cálculo de el espesor de la torta
+        return v, q, l
+
+    return solve
+
+@profiling.instrument()
+def volume_series(filtro,slurry,tf,tol,method='auto'):
+    '''
+    FILTRACIÓN EN MALLA ADAPTATIVA
+    tol: tolerancia relativa sobre V(t), q(t) y el volumen integrado de q (ver adaptive.refine)
+    Retorna adaptive.AdaptiveSeries con 'v', 'q' y 'l'; .exact(t) evalúa el modelo en tiempos arbitrarios.
+    '''
+    solve = _volume_solver(filtro,slurry,method)
+    t, (v, q, l) = adaptive.refine(lambda t: np.array(solve(t)), 0, tf, tol, integral=(1,))
+    model = lambda t: dict(zip(('v', 'q', 'l'), solve(np.atleast_1d(t))))
+
+    return adaptive.AdaptiveSeries(t, {'v': v, 'q': q, 'l': l}, model)
+
+@profiling.instrument()
+def volume(filtro,slurry,ts,tf,method='auto',tol=None):
+    '''
+    ETAPA DE FILTRACIÓN Y FORMACIÓN DE LA TORTA
+    ts: Tiempo de muestreo [s]
+    tf: Tiempo de filtración [s]
+    method: 'auto' (analítico, con odeint como respaldo), 'analytic' u 'odeint'
+    tol: None (malla np.arange(0, tf, ts)) o tolerancia relativa de la malla adaptativa (ts se ignora)
+    Retorna FiltrationResult(v, Vf, q, l, Q_mean, W_cake, t) sin imprimir ni graficar.
+    '''
+
+    P_diff = filtro.P_diff
     rd = filtro.rd
     L = filtro.L
     w = filtro.w
@@ -57,56 +189,20 @@ def volume(filtro,slurry,ts,tf):
     alpha = slurry.alpha
     c = slurry.c
     s = slurry.s
-    k = slurry.k
-    
-    v0 = 0.0001
-    t = np.arange(0, tf, ts)  # values of t for
-                          # which we require
-                          # the solution y(t)
 
-    v = odeint(f, v0, t, args = (P_diff,A,u,alpha,c,Rm))  # actual computation of v(t)
+    if tol is None:
+        t = np.arange(0, tf, ts)  # values of t for
+                              # which we require
+                              # the solution y(t)
+        v, q, l = _volume_solver(filtro,slurry,method)(t)
+    else:
+        series = volume_series(filtro,slurry,tf,tol,method)
+        t, v, q, l = series.t, series['v'], series['q'], series['l']
     
     Vf = float(v[-1])   # Volumen filtrado [m3] (valor final de v)
 
-    q = (A*A*P_diff)/(u*alpha*c*v)     # q instantánea [m3/s]
-
-    # l = (alpha*c*v*k)/A
-
-    l = (k*A*P_diff)/(u*q)      # cálculo de el espesor de la torta
-
     Q_mean = calc_Q(rd,L,filtration_angle,w,P_diff,u,alpha,c,s)    # velocidad de filtración media [m3/s]
 
     W_cake = c*calc_Q(rd,L,filtration_angle,w,P_diff,u,alpha,c,s)   # velocidad de formación de la torta [kg/s]
 
-    #### PLOTTING #### 
-
-    print("\n------ SIMULACIÓN DINÁMICA: FILTRACIÓN EN UN TAMBOR ROTATORIO DE VACÍO ------\n")
-    print("###### FILTRATION ########")
-    print("Tiempo de filtración [s]: ","{:.2f}".format(tf))
-    print("Q media [m3/s]: ","{:.6f}".format(Q_mean))
-    print("Espesor torta [mm] es: ","{:.6f}".format(float(l[-1]*1000)))
-    print("V filtrado [m3]: ","{:.6f}".format(metrics.auc(t,q)))
-    print("Producción de sólidos [kg/s]: ","{:.6f}".format(W_cake)+"\n")
-
-    fig, axarr = plt.subplots(3, 1)
-    fig.canvas.set_window_title('RVF') 
-    fig.suptitle('Filtración en tambor rotatorio al vacío')
-
-    axarr[0].plot(t, v, 'b', label='V [m3]')
-    axarr[0].legend(loc='best')
-    axarr[0].grid()
-    axarr[0].set(ylabel = 'V [m3]')
-    axarr[1].set_title('AUC Q: ' +str("{:.5f}".format(metrics.auc(t,q))+ " [m3]"))
-    axarr[1].plot(t, q, 'r', label='Q [m3/s]')
-    axarr[1].legend(loc='best')
-    axarr[1].grid()
-    axarr[1].set(ylabel = 'Q [m3/s]')
-    axarr[2].plot(t, l, 'g', label='L [m]')
-    axarr[2].legend(loc='best')
-    axarr[2].grid()
-    axarr[2].set(xlabel = 'Time [s]', ylabel = 'L [m]')
-
-    plt.show()
-
-    return v, Vf, q, l, Q_mean, W_cake
-
+    return FiltrationResult(v, Vf, q, l, Q_mean, W_cake, t)
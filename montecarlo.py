@@ -0,0 +1,260 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import numpy as np
+
+import cycle
+
+""" ------ PROPAGACIÓN DE INCERTIDUMBRE POR MONTE CARLO ------ """
+### Muestrea las propiedades inciertas de la torta y los lodos (k, epsilon, u, c, solid_dens, surface_tension...)
+### y evalúa el ciclo completo por bloques en un ProcessPoolExecutor. Los percentiles se actualizan con un
+### resumen acotado (QuantileSketch), de modo que la memoria no crece con el número de muestras.
+
+DISTRIBUTIONS = ('uniform', 'normal', 'lognormal')
+
+OUTPUTS = ('pol', 'M', 'Bx', 'rate', 'retention')
+
+
+def sample(specs,n,rng,method='random'):
+    '''
+    MUESTREO DE LOS PARÁMETROS INCIERTOS
+    specs: diccionario nombre -> (distribución, a, b)
+        ('uniform', low, high)
+        ('normal', media, desviación)
+        ('lognormal', mu, sigma) del logaritmo natural
+    n: número de muestras
+    rng: np.random.Generator
+    method: 'random' (Monte Carlo simple) o 'lhs' (hipercubo latino)
+    '''
+    if method not in ('random', 'lhs'):
+        raise ValueError("method debe ser 'random' o 'lhs'")
+
+    samples = {}
+    for name, spec in specs.items():
+        dist, a, b = spec
+        if dist not in DISTRIBUTIONS:
+            raise ValueError("Distribución desconocida para %s: %s" % (name, dist))
+
+        if method == 'random':
+            if dist == 'uniform':
+                samples[name] = rng.uniform(a, b, n)
+            elif dist == 'normal':
+                samples[name] = rng.normal(a, b, n)
+            else:
+                samples[name] = rng.lognormal(a, b, n)
+        else:
+            # un estrato por muestra, permutado de forma independiente en cada dimensión
+            p = (rng.permutation(n) + rng.uniform(0, 1, n))/n
+            if dist == 'uniform':
+                samples[name] = a + (b-a)*p
+            else:
+                from scipy.special import ndtri     # importación diferida: solo para LHS normal/lognormal
+                z = a + b*ndtri(p)
+                samples[name] = z if dist == 'normal' else np.exp(z)
+
+    return samples
+
+
+class RunningStats:
+
+    """ MEDIA, VARIANZA, MÍNIMO Y MÁXIMO ACUMULADOS (combinables entre bloques) """
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.M2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self,x):
+        other = RunningStats()
+        if x.size:
+            other.n = x.size
+            other.mean = float(np.mean(x))
+            other.M2 = float(np.sum((x-other.mean)**2))
+            other.min = float(np.min(x))
+            other.max = float(np.max(x))
+        self.merge(other)
+
+    def merge(self,other):
+        # Chan, Golub, LeVeque (1979)
+        n = self.n + other.n
+        if n == 0:
+            return
+        delta = other.mean - self.mean
+        self.mean = self.mean + delta*other.n/n
+        self.M2 = self.M2 + other.M2 + delta*delta*self.n*other.n/n
+        self.n = n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def std(self):
+        return (self.M2/(self.n-1))**0.5 if self.n > 1 else 0.0
+
+
+class QuantileSketch:
+
+    """ RESUMEN ACOTADO PARA PERCENTILES: centroides con peso, combinables entre bloques """
+
+    def __init__(self,size=2000):
+        self.size = size        # número máximo de centroides
+        self.values = np.empty(0)
+        self.weights = np.empty(0)
+
+    def update(self,x):
+        self.values = np.concatenate((self.values, x))
+        self.weights = np.concatenate((self.weights, np.ones(x.size)))
+        self._compress()
+
+    def merge(self,other):
+        self.values = np.concatenate((self.values, other.values))
+        self.weights = np.concatenate((self.weights, other.weights))
+        self._compress()
+
+    def _compress(self):
+        order = np.argsort(self.values, kind='stable')
+        values = self.values[order]
+        weights = self.weights[order]
+        if values.size <= self.size:
+            self.values, self.weights = values, weights
+            return
+        # agrupa en 'size' intervalos de igual peso acumulado
+        cum = np.cumsum(weights)
+        bins = np.minimum((self.size*(cum - weights/2)/cum[-1]).astype(int), self.size-1)
+        w = np.bincount(bins, weights=weights, minlength=self.size)
+        v = np.bincount(bins, weights=weights*values, minlength=self.size)
+        keep = w > 0
+        self.values = v[keep]/w[keep]
+        self.weights = w[keep]
+
+    def quantile(self,q):
+        '''
+        q: cuantil(es) en [0, 1]
+        '''
+        if self.values.size == 0:
+            return np.full(np.shape(q), np.nan)
+        position = np.cumsum(self.weights) - self.weights/2
+        return np.interp(np.asarray(q)*self.weights.sum(), position, self.values)
+
+
+def _run_chunk(specs,fixed,n,seed,method,outputs,sketch_size,ts):
+    '''
+    EVALÚA UN BLOQUE DE MUESTRAS (se ejecuta en un proceso del pool)
+    Retorna estadísticas y resúmenes por salida, no las muestras.
+    '''
+    rng = np.random.default_rng(seed)
+    params = dict(fixed)
+    params.update(sample(specs, n, rng, method))
+    with np.errstate(all='ignore'):
+        res = cycle.run_cycles(ts=ts, **params)
+
+    valid = np.ones(n, dtype=bool)
+    for name in outputs:
+        valid &= np.isfinite(res[name])
+
+    summary = {}
+    for name in outputs:
+        x = np.asarray(res[name], dtype=float)[valid]
+        stats = RunningStats()
+        stats.update(x)
+        sketch = QuantileSketch(sketch_size)
+        sketch.update(x)
+        summary[name] = (stats, sketch)
+
+    return n - int(valid.sum()), summary
+
+
+def iter_monte_carlo(specs,n_samples,fixed=None,method='random',chunk_size=20000,workers=None,seed=0,
+                     outputs=OUTPUTS,percentiles=(5,50,95),sketch_size=2000,ts=None):
+    '''
+    MONTE CARLO POR BLOQUES CON RESULTADOS PARCIALES
+    specs: distribuciones de los parámetros inciertos (ver sample)
+    n_samples: número total de muestras
+    fixed: parámetros fijos del ciclo (claves de cycle.DEFAULTS)
+    chunk_size: muestras por bloque
+    workers: procesos del pool (None: os.cpu_count(); 1: sin pool, en el proceso actual)
+    seed: semilla base; cada bloque usa una semilla derivada con np.random.SeedSequence.spawn,
+          por lo que el resultado no depende del número de procesos ni del orden de llegada
+    Genera un resumen (ver summarize) cada vez que se incorpora un bloque.
+    '''
+    fixed = dict(fixed or {})
+    overlap = set(specs) & set(fixed)
+    if overlap:
+        raise ValueError("Parámetros a la vez fijos e inciertos: " + ", ".join(sorted(overlap)))
+    unknown = (set(specs) | set(fixed)) - set(cycle.DEFAULTS)
+    if unknown:
+        raise TypeError("Parámetros desconocidos: " + ", ".join(sorted(unknown)))
+
+    sizes = [chunk_size]*(n_samples//chunk_size)
+    if n_samples % chunk_size:
+        sizes.append(n_samples % chunk_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    args = [(specs, fixed, n, s, method, outputs, sketch_size, ts) for n, s in zip(sizes, seeds)]
+
+    state = {'invalid': 0, 'chunks': 0,
+             'stats': {name: RunningStats() for name in outputs},
+             'sketch': {name: QuantileSketch(sketch_size) for name in outputs}}
+
+    def incorporate(result):
+        invalid, summary = result
+        state['invalid'] += invalid
+        state['chunks'] += 1
+        for name, (stats, sketch) in summary.items():
+            state['stats'][name].merge(stats)
+            state['sketch'][name].merge(sketch)
+        return summarize(state, percentiles)
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for a in args:
+            yield incorporate(_run_chunk(*a))
+        return
+
+    # ventana acotada de bloques en vuelo; los resultados se incorporan en orden de bloque
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = {}
+        done_results = {}
+        next_submit = 0
+        next_merge = 0
+        while next_merge < len(args):
+            while next_submit < len(args) and len(pending) + len(done_results) < 2*workers:
+                pending[pool.submit(_run_chunk, *args[next_submit])] = next_submit
+                next_submit += 1
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                done_results[pending.pop(fut)] = fut.result()
+            while next_merge in done_results:
+                yield incorporate(done_results.pop(next_merge))
+                next_merge += 1
+
+
+def summarize(state,percentiles=(5,50,95)):
+    '''
+    RESUMEN ACTUAL: {'n', 'invalid', 'chunks', salida: {'mean', 'std', 'min', 'max', 'p5', ...}}
+    '''
+    summary = {'invalid': state['invalid'], 'chunks': state['chunks']}
+    n = 0
+    for name, stats in state['stats'].items():
+        q = state['sketch'][name].quantile(np.asarray(percentiles)/100)
+        out = {'mean': stats.mean, 'std': stats.std, 'min': stats.min, 'max': stats.max}
+        out.update(('p%g' % p, float(v)) for p, v in zip(percentiles, q))
+        summary[name] = out
+        n = stats.n
+    summary['n'] = n + state['invalid']
+    return summary
+
+
+def monte_carlo(specs,n_samples,**kwargs):
+    '''
+    MONTE CARLO COMPLETO: retorna el resumen final de iter_monte_carlo
+
+    Ejemplo:
+        specs = {'k': ('lognormal', np.log(2e-13), 0.3), 'epsilon': ('uniform', 0.4, 0.6)}
+        res = monte_carlo(specs, 10**6, fixed={'P_diff': 20000})
+        res['pol']['p95']
+    '''
+    summary = None
+    for summary in iter_monte_carlo(specs, n_samples, **kwargs):
+        pass
+    return summary
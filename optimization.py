@@ -0,0 +1,193 @@
+import itertools
+
+import numpy as np
+from scipy.optimize import minimize
+
+import cycle
+
+""" ------ OPTIMIZACIÓN DEL PUNTO DE OPERACIÓN DEL TAMBOR ------ """
+### Maximiza la tasa de filtrado con límites de pol en cachaza y humedad y la restricción geométrica del tambor
+### (suma de ángulos de zona <= 360°). Barrido grueso vectorizado + refinamiento con gradiente (SLSQP).
+
+####### VARIABLES DE DECISIÓN Y LÍMITES POR DEFECTO #########
+BOUNDS = {
+    'w': (0.5, 3.0),                    # Velocidad de rotación [rpm]
+    'P_diff': (10000, 60000),           # Caída de presión [Pa]
+    'wsh_Q': (0.0005, 0.004),           # Tasa de lavado con agua [m3/s]
+    'filtration_angle': (60, 140),      # Ángulo de filtración [°]
+    'wsh_angle': (10, 60),              # Ángulo de lavado [°]
+    'dew_angle1': (10, 60),             # Ángulo de secado 1 [°]
+    'dew_angle2': (15, 90),             # Ángulo de secado 2 [°]
+}
+
+ANGLES = ('filtration_angle', 'wsh_angle', 'dew_angle1', 'dew_angle2')
+
+
+class CycleEvaluator:
+
+    """ EVALUACIÓN MEMOIZADA DEL CICLO: cada punto se calcula una sola vez """
+
+    def __init__(self,variables,fixed=None,ts=None):
+        '''
+        variables: nombres de las variables de decisión (claves de cycle.DEFAULTS)
+        fixed: parámetros fijos del ciclo
+        ts: tiempo de muestreo [s] (None: tiempos exactos, función suave para el gradiente)
+        '''
+        self.variables = tuple(variables)
+        self.fixed = dict(fixed or {})
+        self.ts = ts
+        self.cache = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __call__(self,X):
+        '''
+        X: arreglo (n, len(variables)) de puntos
+        Retorna un diccionario con arreglos (n,) de las salidas de cycle.OUTPUTS.
+        '''
+        X = np.atleast_2d(np.asarray(X, dtype=float))
+        keys = [tuple(row) for row in X.tolist()]
+        missing = list(dict.fromkeys(key for key in keys if key not in self.cache))
+        self.hits += len(keys) - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            M = np.array(missing)
+            params = dict(self.fixed)
+            params.update(zip(self.variables, M.T))
+            with np.errstate(all='ignore'):
+                res = cycle.run_cycles(ts=self.ts, **params)
+            for i, key in enumerate(missing):
+                self.cache[key] = {name: float(res[name][i]) for name in cycle.OUTPUTS}
+
+        return {name: np.array([self.cache[key][name] for key in keys]) for name in cycle.OUTPUTS}
+
+    def points(self):
+        '''
+        TODOS LOS PUNTOS EVALUADOS: (X, salidas)
+        '''
+        keys = list(self.cache)
+        X = np.array(keys).reshape(len(keys), len(self.variables))
+        return X, {name: np.array([self.cache[key][name] for key in keys]) for name in cycle.OUTPUTS}
+
+
+def feasible(X,res,variables,pol_max,M_max,max_angle=360,fixed=None,rtol=0.0):
+    '''
+    MÁSCARA DE PUNTOS FACTIBLES: pol, humedad, suma de ángulos y resultados finitos
+    rtol: tolerancia relativa sobre los límites (violaciones numéricas del optimizador)
+    '''
+    ok = np.isfinite(res['rate']) & np.isfinite(res['pol']) & np.isfinite(res['M'])
+    ok &= res['filtration_angle'] > 0
+    if pol_max is not None:
+        ok &= res['pol'] <= pol_max*(1+rtol)
+    if M_max is not None:
+        ok &= res['M'] <= M_max*(1+rtol)
+    ok &= angle_sum(X, variables, fixed) <= max_angle*(1+rtol)
+    return ok
+
+
+def angle_sum(X,variables,fixed=None):
+    '''
+    SUMA DE LOS ÁNGULOS DE ZONA [°] (los no incluidos en variables se toman de fixed o DEFAULTS)
+    '''
+    X = np.atleast_2d(X)
+    total = np.zeros(X.shape[0])
+    for name in ANGLES:
+        if name in variables:
+            total += X[:, variables.index(name)]
+        else:
+            total += (fixed or {}).get(name, cycle.DEFAULTS[name])
+    return total
+
+
+def pareto_front(rate,pol):
+    '''
+    ÍNDICES DEL FRENTE DE PARETO (máxima tasa, mínima pol), ordenados por pol creciente
+    '''
+    order = np.lexsort((-rate, pol))
+    best = np.maximum.accumulate(rate[order])
+    keep = np.r_[True, best[1:] > best[:-1]]
+    return order[keep]
+
+
+def grid_screen(evaluator,bounds,n_grid=4):
+    '''
+    BARRIDO GRUESO: malla regular de n_grid valores por variable, evaluada en una sola llamada
+    '''
+    axes = [np.linspace(*bounds[name], n_grid) for name in evaluator.variables]
+    X = np.array(list(itertools.product(*axes)))
+    return X, evaluator(X)
+
+
+def optimize(pol_max=None,M_max=None,bounds=None,fixed=None,n_grid=4,n_starts=3,max_angle=360,ts=None,
+             fd_step=1e-6):
+    '''
+    PUNTO DE OPERACIÓN DE MÁXIMA TASA DE FILTRADO
+    pol_max: Pol en cachaza máxima [%] (None: sin límite)
+    M_max: Humedad máxima de la cachaza [%] (None: sin límite)
+    bounds: límites de las variables de decisión (por defecto BOUNDS); solo se optimizan sus claves
+    fixed: parámetros fijos del ciclo
+    n_grid: valores por variable en el barrido grueso
+    n_starts: mejores puntos del barrido que se refinan con SLSQP
+    max_angle: suma máxima de los ángulos de zona [°]
+    fd_step: paso de las diferencias finitas en variables escaladas a [0, 1] (perturbaciones evaluadas en un lote)
+    Retorna un diccionario con 'params', 'outputs', 'pareto', 'success', 'evaluations' y 'cache_hits'.
+    '''
+    bounds = dict(BOUNDS if bounds is None else bounds)
+    variables = tuple(bounds)
+    evaluator = CycleEvaluator(variables, fixed, ts)
+    lo = np.array([bounds[name][0] for name in variables], dtype=float)
+    hi = np.array([bounds[name][1] for name in variables], dtype=float)
+    span = hi - lo
+
+    #### BARRIDO GRUESO ####
+    X, res = grid_screen(evaluator, bounds, n_grid)
+    ok = feasible(X, res, variables, pol_max, M_max, max_angle, fixed)
+    starts = X[ok][np.argsort(-res['rate'][ok])[:n_starts]]
+
+    #### REFINAMIENTO CON GRADIENTE (variables escaladas a [0, 1]) ####
+    def outputs(z):
+        return evaluator(lo + span*z)
+
+    def jacobian(z, name):
+        # columna i: punto perturbado en la variable i; todas las perturbaciones en un solo lote
+        Z = z + fd_step*np.eye(z.size)
+        Z = np.where(Z > 1, z - fd_step*np.eye(z.size), Z)
+        res = evaluator(lo + span*np.vstack((z, Z)))
+        return (res[name][1:] - res[name][0])/np.diag(Z - z)
+
+    constraints = [{'type': 'ineq', 'fun': lambda z: max_angle - angle_sum(lo + span*z, variables, fixed)[0],
+                    'jac': lambda z: -np.array([span[i] if name in ANGLES else 0.0 for i, name in enumerate(variables)])}]
+    if pol_max is not None:
+        constraints.append({'type': 'ineq', 'fun': lambda z: pol_max - outputs(z)['pol'][0],
+                            'jac': lambda z: -jacobian(z, 'pol')})
+    if M_max is not None:
+        constraints.append({'type': 'ineq', 'fun': lambda z: M_max - outputs(z)['M'][0],
+                            'jac': lambda z: -jacobian(z, 'M')})
+
+    scale = np.nanmax(np.abs(res['rate'])) or 1.0
+    best = None
+    if len(starts):
+        best = (starts[0], evaluator(starts[0]))      # mejor punto del barrido, si el refinamiento no lo mejora
+    for x0 in starts:
+        sol = minimize(lambda z: -outputs(z)['rate'][0]/scale, (x0 - lo)/span,
+                       jac=lambda z: -jacobian(z, 'rate')/scale, method='SLSQP',
+                       bounds=[(0, 1)]*len(variables), constraints=constraints)
+        x = lo + span*np.clip(sol.x, 0, 1)
+        r = evaluator(x)
+        if feasible(x, r, variables, pol_max, M_max, max_angle, fixed, rtol=1e-6)[0] and r['rate'][0] > best[1]['rate'][0]:
+            best = (x, r)
+
+    #### FRENTE DE PARETO TASA vs POL (todos los puntos evaluados) ####
+    X_all, res_all = evaluator.points()
+    ok = feasible(X_all, res_all, variables, None, M_max, max_angle, fixed, rtol=1e-6)
+    idx = np.flatnonzero(ok)[pareto_front(res_all['rate'][ok], res_all['pol'][ok])]
+    pareto = {name: X_all[idx, i] for i, name in enumerate(variables)}
+    pareto.update({'rate': res_all['rate'][idx], 'pol': res_all['pol'][idx], 'M': res_all['M'][idx]})
+
+    result = {'success': best is not None, 'pareto': pareto,
+              'evaluations': evaluator.misses, 'cache_hits': evaluator.hits}
+    if best is not None:
+        result['params'] = dict(zip(variables, best[0].tolist()))
+        result['outputs'] = {name: float(v[0]) for name, v in best[1].items()}
+    return result
@@ -0,0 +1,86 @@
+from filtration import auc
+
+""" ------ GRÁFICAS DE LAS ETAPAS DEL CICLO ------ """
+### Capa opcional: matplotlib solo se importa cuando se llama alguna de estas funciones.
+
+def _pyplot():
+    import matplotlib.pyplot as plt
+    return plt
+
+def _window_title(fig,title):
+    manager = getattr(fig.canvas, 'manager', None)
+    if manager is not None:
+        manager.set_window_title(title)
+
+def plot_filtration(res,show=True):
+    '''
+    res: FiltrationResult de filtration.volume
+    '''
+    plt = _pyplot()
+    t = res.t
+
+    fig, axarr = plt.subplots(3, 1)
+    _window_title(fig, 'RVF')
+    fig.suptitle('Filtración en tambor rotatorio al vacío')
+
+    axarr[0].plot(t, res.v, 'b', label='V [m3]')
+    axarr[0].legend(loc='best')
+    axarr[0].grid()
+    axarr[0].set(ylabel = 'V [m3]')
+    axarr[1].set_title('AUC Q: ' +str("{:.5f}".format(auc(t,res.q))+ " [m3]"))
+    axarr[1].plot(t, res.q, 'r', label='Q [m3/s]')
+    axarr[1].legend(loc='best')
+    axarr[1].grid()
+    axarr[1].set(ylabel = 'Q [m3/s]')
+    axarr[2].plot(t, res.l, 'g', label='L [m]')
+    axarr[2].legend(loc='best')
+    axarr[2].grid()
+    axarr[2].set(xlabel = 'Time [s]', ylabel = 'L [m]')
+
+    if show:
+        plt.show()
+    return fig
+
+def plot_dewatering(res,zone,show=True):
+    '''
+    res: DewateringResult de dewatering.dewatering_process
+    zone: Zona de secado (1 o 2)
+    '''
+    plt = _pyplot()
+
+    fig = plt.figure()
+    fig.suptitle('Dewatering process '+str(zone))
+    plt.plot(res.dew_time,res.S_arr*100, label="Saturation")
+    plt.plot(res.dew_time,res.M_arr, label="Moisture")
+    plt.ylabel('Percentage [%]')
+    plt.xlabel('Time [s]')
+    plt.grid()
+    plt.legend()
+
+    if show:
+        plt.show()
+    return fig
+
+def plot_cycle(traj,show=True):
+    '''
+    traj: arreglo estructurado de trajectory.cycle_trajectory (campos t, V, rate, zone)
+    '''
+    plt = _pyplot()
+
+    fig, axarr = plt.subplots(2, 1)
+    _window_title(fig, 'RVF')
+    fig.suptitle('Drum total cicle filtration')
+
+    axarr[0].plot(traj['t'],traj['V'], 'b',label="Cane juice filtration [m3]")
+    axarr[0].legend(loc='best')
+    axarr[0].grid()
+    axarr[0].set(ylabel = 'V [m3]')
+    axarr[1].plot(traj['t'],traj['rate'], 'g',label="Cane juice rate filtration [m3/s]")
+    axarr[1].legend(loc='best')
+    axarr[1].grid()
+    axarr[1].set(ylabel = 'Q [m3/s]')
+    axarr[1].set(xlabel = 'Time [s]')
+
+    if show:
+        plt.show()
+    return fig
@@ -1,12 +1,12 @@
-import matplotlib.pyplot as plt
-from sklearn import metrics
-from scipy.integrate import odeint
 import numpy as np
 
+import profiling
+
 """ ------ CÁLCULO DE LA POL EN CACHAZA ------ """
 #### The balance between capacity and performance
 #### of rotary mud filters (1997), Wright, Steggles, Steindl
 
+@profiling.instrument()
 def pol_calc(msr,filter_area,wwr):
     """
     msr: mud solid rate - tasa de sólidos de los lodos (kg/s, ton/h)
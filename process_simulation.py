@@ -1,8 +1,3 @@
-import matplotlib.pyplot as plt
-from numpy.core.defchararray import array
-from numpy.lib.function_base import append
-from sklearn import metrics
-from scipy.integrate import odeint
 import numpy as np
 from RVDF import RVDF, slurry_cake
 import filtration
@@ -10,6 +5,9 @@ from pol_calc import pol_calc
 import washing 
 import dewatering
 import bx_calc
+import report
+import plotting
+import trajectory
 
 """ ------ SCRIPT DE ARRANQUE DE SIMULACIÓN ------ """
 
@@ -48,83 +46,53 @@ wsh_Q = 0.0015                                 # tasa de lavado con agua [m3/s]
 RVDF1 = RVDF(P_diff,rd,L,Af,tf,filtration_angle,wsh_angle,dew_angle1,dew_angle2,w,Rm,nivel_lodos)
 LODOS_TORTA = slurry_cake(alpha,u,c,k,epsilon,solid_dens,filtrate_dens,surface_tension,incompresible,s)
 
-""" --------- SIMULACIÓN ---------- """
-ts = 0.1                  # tiempo de muestreo
-t = np.arange(0, tf, ts)  # arreglo temporal
+def main():
+    """ --------- SIMULACIÓN ---------- """
+    ts = 0.1                  # tiempo de muestreo
+    t = np.arange(0, tf, ts)  # arreglo temporal
 
-""" --------- ETAPA DE FILTRACIÓN Y FORMACIÓN DE LA TORTA ----------- """
-v, Vf, q, l, Q_mean, W_cake = filtration.volume(RVDF1,LODOS_TORTA,ts,tf)                        
+    """ --------- ETAPA DE FILTRACIÓN Y FORMACIÓN DE LA TORTA ----------- """
+    filtracion = filtration.volume(RVDF1,LODOS_TORTA,ts,tf)
+    v, Vf, q, l, Q_mean, W_cake = filtracion[:6]
+    report.print_filtration(filtracion,tf)
+    plotting.plot_filtration(filtracion)
 
-""" --------- ETAPA DE SECADO 1 ----------- """
-S, M, irreduc_S, Vf_dew1, Vf_dew1_arr = dewatering.dewatering_process(RVDF1, LODOS_TORTA, thickness = float(l[-1]), 
-                            dew_A = RVDF.drum_filter_area(rd,L,dew_angle1), 
-                            dew_t = RVDF.angle_to_time(dew_angle1,w), zone = 1, r = 0, ts = ts)
+    """ --------- ETAPA DE SECADO 1 ----------- """
+    secado1 = dewatering.dewatering_process(RVDF1, LODOS_TORTA, thickness = float(l[-1]), 
+                                dew_A = RVDF.drum_filter_area(rd,L,dew_angle1), 
+                                dew_t = RVDF.angle_to_time(dew_angle1,w), zone = 1, r = 0, ts = ts)
+    S, M, irreduc_S, Vf_dew1, Vf_dew1_arr = secado1[:5]
+    plotting.plot_dewatering(secado1,zone = 1)
+    report.print_dewatering(secado1,zone = 1,r = 0)
 
-""" --------- ETAPA DE LAVADO ----------- """
-Vf_wsh, r = washing.water_wash(RVDF1, LODOS_TORTA, e = 0.8, wsh_Q = wsh_Q, thickness = float(l[-1]), Saturation=S)
+    """ --------- ETAPA DE LAVADO ----------- """
+    lavado = washing.water_wash(RVDF1, LODOS_TORTA, e = 0.8, wsh_Q = wsh_Q, thickness = float(l[-1]), Saturation=S)
+    Vf_wsh, r = lavado.Vf_wsh, lavado.r
+    report.print_washing(lavado,e = 0.8,wsh_Q = wsh_Q)
 
-""" --------- ETAPA DE SECADO 2 ----------- """
-S, M, irreduc_S, Vf_dew2, Vf_dew2_arr = dewatering.dewatering_process(RVDF1, LODOS_TORTA, thickness = float(l[-1]), 
-                            dew_A = RVDF.drum_filter_area(rd,L,dew_angle2), 
-                            dew_t = RVDF.angle_to_time(dew_angle2,w), zone = 2, r = r, ts = ts)
+    """ --------- ETAPA DE SECADO 2 ----------- """
+    secado2 = dewatering.dewatering_process(RVDF1, LODOS_TORTA, thickness = float(l[-1]), 
+                                dew_A = RVDF.drum_filter_area(rd,L,dew_angle2), 
+                                dew_t = RVDF.angle_to_time(dew_angle2,w), zone = 2, r = r, ts = ts)
+    S, M, irreduc_S, Vf_dew2, Vf_dew2_arr = secado2[:5]
+    plotting.plot_dewatering(secado2,zone = 2)
+    report.print_dewatering(secado2,zone = 2,r = r)
 
-""" --------- CÁLCULO DE BRIX DE SALIDA ----------- """                            
-Bx_jugo_total = bx_calc.calc_Bx(Bx_0 = Bx_0, Vf = Vf, SS_agua = 0, V_agua = Vf_wsh, r_torta = r)
+    """ --------- CÁLCULO DE BRIX DE SALIDA ----------- """                            
+    Bx_jugo_total = bx_calc.calc_Bx(Bx_0 = Bx_0, Vf = Vf, SS_agua = 0, V_agua = Vf_wsh, r_torta = r)
 
-""" --------- CÁLCULO POL EN CACHAZA ------------- """
-Pol_cachaza = pol_calc(msr = W_cake, filter_area = Af, wwr = wsh_Q)
+    """ --------- CÁLCULO POL EN CACHAZA ------------- """
+    Pol_cachaza = pol_calc(msr = W_cake, filter_area = Af, wwr = wsh_Q)
 
+    report.print_summary(w,nivel_lodos,filtration_angle,(Vf + Vf_dew1 + Vf_wsh + Vf_dew2),Bx_jugo_total,Pol_cachaza)
 
-print("####### RESUMEN ########")
-print("Duración del ciclo de rotación [s]: ", 60/w)
-print("Nivel de lodos [%]: ", nivel_lodos*100)
-print("Ángulo real de filtración [°]: ", "{:.4f}".format(filtration_angle))
-print("Volumen de filtrado en un ciclo [m3]: " "{:.4f}".format((Vf + Vf_dew1 + Vf_wsh + Vf_dew2)))
-print("Tasa de filtración [m3/s]: " "{:.6f}".format((Vf + Vf_dew1 + Vf_wsh + Vf_dew2)/(60/w)))
-print("Tasa de filtración [m3/h]: " "{:.6f}".format(3600*(Vf + Vf_dew1 + Vf_wsh + Vf_dew2)/(60/w)))
-print("Brix de jugo filtrado en el ciclo [°]: ""{:.4f}".format(Bx_jugo_total))
-print("Pol en cachaza [%]: ""{:.4f}".format(Pol_cachaza)+"\n")
 
+    """ ----- PLOT TOTAL PROCESS ---- """
 
-""" ----- PLOT TOTAL PROCESS ---- """
+    ciclo = trajectory.cycle_trajectory(RVDF1, LODOS_TORTA, wsh_Q = wsh_Q, ts = ts)     # t, V, rate y zona del ciclo completo
 
-### volumen arrays ###
+    plotting.plot_cycle(ciclo)
 
-Vf_dew1_arr = Vf_dew1_arr + v[-1]  # suma el último valor de formación con la filtración realizada en dewatering 1
 
-arrays = append(v,Vf_dew1_arr)   # concatena vector de formación de torta con dewatering 1
-
-watering_wash_vector = wsh_Q*(np.arange(0, RVDF.angle_to_time(wsh_angle,w), ts))+Vf_dew1_arr[-1]  # suma el último valor de dewatering 1 a la filtración en lavado
-
-arrays = append(arrays,watering_wash_vector)    # concatena vectores hasta lavado
-
-Vf_dew2_arr = Vf_dew2_arr + arrays[-1]     # suma último valor de lavado a la filtración de dewatering 2
-
-arrays = append(arrays,Vf_dew2_arr)   # concatena vectores hasta dewatering 2
-
-times_array = np.arange(0, ((arrays.shape[0]-ts)*ts), ts)   # crea arreglo temporal con el tiempo total de filtración
-
-#### plot ###
-
-derivative = [] # calculate total filtration rate
-for i in range (0,len(arrays)-1):
-    derivative = append(derivative,arrays[i+1]-arrays[i])
-
-derivative = derivative/ts
-
-fig, axarr = plt.subplots(2, 1)
-fig.canvas.set_window_title('RVF') 
-fig.suptitle('Drum total cicle filtration')
-
-axarr[0].plot(times_array,arrays, 'b',label="Cane juice filtration [m3]")
-axarr[0].legend(loc='best')
-axarr[0].grid()
-axarr[0].set(ylabel = 'V [m3]')
-axarr[1].plot(times_array[0:195],derivative, 'g',label="Cane juice rate filtration [m3/s]")
-axarr[1].legend(loc='best')
-axarr[1].grid()
-axarr[1].set(ylabel = 'Q [m3/s]')
-axarr[1].set(xlabel = 'Time [s]')
-
-
-plt.show()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
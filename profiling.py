@@ -0,0 +1,336 @@
+import argparse
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+""" ------ PERFILADO POR ETAPA: TIEMPO, LLAMADAS, TAMAÑO DE ARREGLOS Y ESTADÍSTICAS DEL SOLVER ------ """
+### Las funciones de cada etapa (filtración, secado 1 y 2, lavado, Brix, pol y las etapas de cycle.py) llevan el
+### decorador instrument; mientras no haya un perfilador activo el envoltorio solo comprueba una variable global y
+### llama a la función. Con profile() activo se registran tiempos (total y propio), llamadas, tamaño de las
+### entradas y bytes de los arreglos retornados, y los contadores de odeint (full_output: nfe, nst, nje).
+###
+### Uso:
+###   with profiling.profile() as prof:
+###       cycle.run_cycles(P_diff=np.linspace(10000, 60000, 10**5))
+###   print(prof.report())
+###   prof.to_chrome_trace('traza.json')       # abrir en chrome://tracing o https://ui.perfetto.dev
+###
+###   python profiling.py --n 100000 --trace traza.json
+
+_active = None      # Profiler activo (None: instrumentación desactivada)
+
+STAT_FIELDS = ('calls', 'total', 'self', 'max', 'in_elements', 'out_bytes')
+
+
+class Profiler:
+
+    """ ACUMULADOR DE TIEMPOS POR ETAPA Y EVENTOS PARA LA TRAZA """
+
+    def __init__(self,trace=True,max_events=10**6):
+        '''
+        trace: guarda un evento por llamada para la traza de Chrome (si no, solo los acumulados por etapa)
+        max_events: límite de eventos guardados; los siguientes solo se acumulan en las estadísticas
+        '''
+        self.trace = trace
+        self.max_events = max_events
+        self.stats = {}             # etapa -> {calls, total, self, max, in_elements, out_bytes, solver}
+        self.events = []            # (etapa, inicio [s], duración [s], hilo, args)
+        self.dropped = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.start = time.perf_counter()
+        self.elapsed = None
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def enter(self,name):
+        '''
+        ABRE UNA ETAPA; retorna el marco que recibe exit
+        '''
+        frame = [name, time.perf_counter(), 0.0, {}]   # etapa, inicio, tiempo de las etapas hijas, contadores
+        self._stack().append(frame)
+        return frame
+
+    def exit(self,frame,args=(),result=None):
+        '''
+        CIERRA LA ETAPA: acumula el tiempo total y el propio (sin las etapas anidadas) y los tamaños
+        '''
+        end = time.perf_counter()
+        stack = self._stack()
+        stack.pop()
+        name, start, children, counters = frame
+        duration = end - start
+        if stack:
+            stack[-1][2] += duration
+
+        in_elements = max((_elements(a) for a in args), default=0)
+        out_bytes = _nbytes(result)
+        with self._lock:
+            stat = self.stats.get(name)
+            if stat is None:
+                stat = self.stats[name] = dict.fromkeys(STAT_FIELDS, 0)
+                stat['total'] = stat['self'] = stat['max'] = 0.0
+                stat['solver'] = {}
+            stat['calls'] += 1
+            stat['total'] += duration
+            stat['self'] += duration - children
+            stat['max'] = max(stat['max'], duration)
+            stat['in_elements'] = max(stat['in_elements'], in_elements)
+            stat['out_bytes'] += out_bytes
+            for key, value in counters.items():
+                stat['solver'][key] = stat['solver'].get(key, 0) + value
+            if self.trace:
+                if len(self.events) < self.max_events:
+                    args = {'in_elements': in_elements, 'out_bytes': out_bytes}
+                    args.update(counters)
+                    self.events.append((name, start - self.start, duration, threading.get_ident(), args))
+                else:
+                    self.dropped += 1
+
+    def count(self,**counters):
+        '''
+        SUMA CONTADORES (p. ej. estadísticas del solver) A LA ETAPA ABIERTA MÁS INTERNA
+        '''
+        stack = self._stack()
+        if not stack:
+            return
+        top = stack[-1][3]
+        for key, value in counters.items():
+            top[key] = top.get(key, 0) + value
+
+    def stop(self):
+        if self.elapsed is None:
+            self.elapsed = time.perf_counter() - self.start
+
+    def summary(self):
+        '''
+        DICCIONARIO SERIALIZABLE: tiempo total del perfilado [s] y estadísticas por etapa
+        '''
+        elapsed = self.elapsed if self.elapsed is not None else time.perf_counter() - self.start
+        return {'elapsed': elapsed, 'dropped_events': self.dropped,
+                'stages': {name: dict(stat, solver=dict(stat['solver'])) for name, stat in self.stats.items()}}
+
+    def report(self,sort='self'):
+        '''
+        TABLA DE TEXTO ORDENADA POR TIEMPO PROPIO ('self') O TOTAL ('total')
+        '''
+        summary = self.summary()
+        elapsed = summary['elapsed']
+        lines = ["{:<34} {:>8} {:>10} {:>10} {:>7} {:>11} {:>11}".format(
+            'etapa', 'llamadas', 'total [s]', 'propio [s]', '% prop', 'elem. máx', 'MB salida')]
+        for name, stat in sorted(summary['stages'].items(), key=lambda item: -item[1][sort]):
+            lines.append("{:<34} {:>8d} {:>10.4f} {:>10.4f} {:>6.1f}% {:>11d} {:>11.2f}".format(
+                name, stat['calls'], stat['total'], stat['self'], 100*stat['self']/max(elapsed, 1e-12),
+                stat['in_elements'], stat['out_bytes']/2**20))
+            if stat['solver']:
+                lines.append("{:<34} {}".format('', '  '.join('{}={}'.format(k, v) for k, v in sorted(stat['solver'].items()))))
+        lines.append("tiempo total perfilado: {:.4f} s".format(elapsed))
+        return '\n'.join(lines)
+
+    def to_json(self,path):
+        with open(path, 'w') as fh:
+            json.dump(self.summary(), fh, indent=1)
+
+    def to_chrome_trace(self,path):
+        '''
+        TRAZA EN FORMATO Trace Event (eventos completos 'X', tiempos en microsegundos)
+        '''
+        pid = os.getpid()
+        events = [{'name': name, 'cat': name.split('.')[0], 'ph': 'X', 'ts': 1e6*start, 'dur': 1e6*duration,
+                   'pid': pid, 'tid': tid, 'args': args}
+                  for name, start, duration, tid, args in self.events]
+        with open(path, 'w') as fh:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, fh)
+
+
+def _elements(obj):
+    '''
+    ELEMENTOS DEL MAYOR ARREGLO DE UNA ENTRADA (los diccionarios de parámetros de cycle.py se recorren)
+    '''
+    if isinstance(obj, np.ndarray):
+        return obj.size
+    if isinstance(obj, dict):
+        return max((_elements(item) for item in obj.values()), default=0)
+    return 1
+
+
+def _nbytes(obj):
+    '''
+    BYTES DE LOS ARREGLOS DE UN RESULTADO (arreglo, tupla/namedtuple, lista o diccionario)
+    '''
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, (tuple, list)):
+        return sum(_nbytes(item) for item in obj)
+    if isinstance(obj, dict):
+        return sum(_nbytes(item) for item in obj.values())
+    return 0
+
+
+def active():
+    '''
+    PERFILADOR ACTIVO O None
+    '''
+    return _active
+
+
+def instrument(name=None):
+    '''
+    DECORADOR DE ETAPA
+    name: nombre en el perfil (por defecto módulo.función)
+    Desactivado, el costo por llamada es una consulta a una variable global.
+    '''
+    def decorator(fun):
+        label = name or fun.__module__ + '.' + fun.__qualname__
+
+        @functools.wraps(fun)
+        def wrapper(*args, **kwargs):
+            prof = _active
+            if prof is None:
+                return fun(*args, **kwargs)
+            frame = prof.enter(label)
+            result = None
+            try:
+                result = fun(*args, **kwargs)
+                return result
+            finally:
+                prof.exit(frame, args + tuple(kwargs.values()), result)
+        return wrapper
+    return decorator
+
+
+class _Span:
+
+    __slots__ = ('prof', 'name', 'frame')
+
+    def __init__(self,prof,name):
+        self.prof = prof
+        self.name = name
+
+    def __enter__(self):
+        self.frame = self.prof.enter(self.name)
+        return self
+
+    def __exit__(self,*exc):
+        self.prof.exit(self.frame)
+        return False
+
+
+class _NullSpan:
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,*exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name):
+    '''
+    BLOQUE CON NOMBRE DENTRO DE UNA ETAPA (p. ej. cada zona de secado): with profiling.span('dewatering1'): ...
+    '''
+    prof = _active
+    return _NULL_SPAN if prof is None else _Span(prof, name)
+
+
+def count(**counters):
+    '''
+    CONTADORES PARA LA ETAPA ABIERTA (sin efecto si no hay perfilador activo)
+    '''
+    prof = _active
+    if prof is not None:
+        prof.count(**counters)
+
+
+@contextmanager
+def profile(trace=True,json_path=None,trace_path=None,max_events=10**6):
+    '''
+    PERFILA TODO LO EJECUTADO EN EL BLOQUE (p. ej. un barrido completo)
+    trace: guarda eventos para la traza de Chrome
+    json_path, trace_path: archivos escritos al salir del bloque (opcionales)
+    Las llamadas en otros procesos (workers de montecarlo o station) no se registran.
+    '''
+    global _active
+    previous = _active
+    prof = Profiler(trace, max_events)
+    _active = prof
+    try:
+        yield prof
+    finally:
+        _active = previous
+        prof.stop()
+        if json_path:
+            prof.to_json(json_path)
+        if trace_path:
+            prof.to_chrome_trace(trace_path)
+
+
+def _process_chain(filtro,lodos,ts,method,wsh_Q=0.0015,e=0.8):
+    '''
+    CADENA ESCALAR DE process_simulation.py (sin impresión ni gráficas), con un bloque por zona
+    '''
+    import filtration
+    import dewatering
+    import washing
+    import bx_calc
+    from RVDF import RVDF
+    from pol_calc import pol_calc
+
+    rd, L, w = filtro.rd, filtro.L, filtro.w
+    with span('filtration'):
+        form = filtration.volume(filtro, lodos, ts, filtro.tf, method)
+    thickness = float(form.l[-1])
+    with span('dewatering1'):
+        dew1 = dewatering.dewatering_process(filtro, lodos, thickness, RVDF.drum_filter_area(rd, L, filtro.dew_angle1),
+                                             RVDF.angle_to_time(filtro.dew_angle1, w), 1, 0, ts)
+    with span('washing'):
+        wash = washing.water_wash(filtro, lodos, e, wsh_Q, thickness, dew1.S)
+    with span('dewatering2'):
+        dewatering.dewatering_process(filtro, lodos, thickness, RVDF.drum_filter_area(rd, L, filtro.dew_angle2),
+                                      RVDF.angle_to_time(filtro.dew_angle2, w), 2, wash.r, ts)
+    with span('brix'):
+        bx_calc.calc_Bx(15, form.Vf, 0, wash.Vf_wsh, wash.r)
+    with span('pol'):
+        pol_calc(form.W_cake, filtro.Af, wsh_Q)
+
+
+def main(argv=None):
+    import cycle
+
+    parser = argparse.ArgumentParser(description="Perfil por etapa de un barrido del ciclo")
+    parser.add_argument('--n', type=int, default=10**5, help="puntos del barrido vectorizado de vacío")
+    parser.add_argument('--ts', type=float, default=0.1, help="tiempo de muestreo [s] del ciclo escalar")
+    parser.add_argument('--method', default='auto', choices=('auto', 'analytic', 'odeint'),
+                        help="motor de la filtración en el ciclo escalar")
+    parser.add_argument('--json', help="archivo JSON con las estadísticas")
+    parser.add_argument('--trace', help="archivo de traza de Chrome")
+    args = parser.parse_args(argv)
+
+    with profile(json_path=args.json, trace_path=args.trace) as prof:
+        with span('sweep'):
+            cycle.run_cycles(P_diff=np.linspace(10000, 60000, args.n))
+        with span('scalar_cycle'):
+            filtro, lodos = cycle.build()
+            _process_chain(filtro, lodos, args.ts, args.method)
+    print(prof.report())
+    return 0
+
+
+if __name__ == "__main__":
+    import profiling        # el estado activo debe ser el del módulo que importan las etapas, no el de __main__
+    sys.exit(profiling.main())
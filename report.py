@@ -0,0 +1,67 @@
+from filtration import auc
+
+""" ------ REPORTE EN CONSOLA DE LAS ETAPAS DEL CICLO ------ """
+### Capa opcional: las funciones de cálculo no imprimen, este módulo da formato a sus resultados.
+
+def print_filtration(res,tf):
+    '''
+    res: FiltrationResult de filtration.volume
+    tf: Tiempo de filtración [s]
+    '''
+    print("\n------ SIMULACIÓN DINÁMICA: FILTRACIÓN EN UN TAMBOR ROTATORIO DE VACÍO ------\n")
+    print("###### FILTRATION ########")
+    print("Tiempo de filtración [s]: ","{:.2f}".format(tf))
+    print("Q media [m3/s]: ","{:.6f}".format(res.Q_mean))
+    print("Espesor torta [mm] es: ","{:.6f}".format(float(res.l[-1]*1000)))
+    print("V filtrado [m3]: ","{:.6f}".format(auc(res.t,res.q)))
+    print("Producción de sólidos [kg/s]: ","{:.6f}".format(res.W_cake)+"\n")
+
+def print_dewatering(res,zone,r):
+    '''
+    res: DewateringResult de dewatering.dewatering_process
+    zone: Zona de secado (1 o 2)
+    r: Retención de soluto después del lavado []
+    '''
+    if zone == 1:
+        print("###### DEWATERING 1 ########")
+        print("Filtrado en dewatering 1 [m3]: ","{:.6f}".format(res.V_filtrate_dew)+"\n")
+
+    if zone == 2:
+        print("###### DEWATERING 2 ########")
+        print("Filtrado en dewatering 2 [m3]: ","{:.6f}".format(res.V_filtrate_dew))
+        print("Humedad en cachaza [%]: ","{:.4f}".format(res.M))
+        print("Saturación irreducible de la torta []: ","{:.4f}".format(res.irreduc_sat))
+        print("Saturación de final []: ","{:.4f}".format(res.S))
+        print("Retención final de soluto en cachaza []: ","{:.4f}".format(res.S*r)+"\n")
+
+def print_washing(res,e,wsh_Q):
+    '''
+    res: WashResult de washing.water_wash
+    e: Eficiencia del lavado []
+    wsh_Q: Tasa de lavado con agua [m3/s]
+    '''
+    print("###### WASHING #######")
+    print("Eficiencia del lavado: ","{:.4f}".format(e))
+    print("Retención de soluto en cachaza: ","{:.4f}".format(res.r))
+    print("Tiempo de lavado [s]: ","{:.4f}".format(res.wsh_time))
+    print("Cantidad de lavado empleado [m3]: ","{:.6f}".format(wsh_Q*res.wsh_time))
+    print("Wash ratio: ","{:.4f}".format(res.wsh_ratio)+"\n")
+
+def print_summary(w,nivel,filtration_angle,V_total,Bx,pol):
+    '''
+    w: Velocidad de rotación [rpm]
+    nivel: Nivel del tanque de lodos []
+    filtration_angle: Ángulo real de filtración [°]
+    V_total: Volumen de filtrado en un ciclo [m3]
+    Bx: Brix de jugo filtrado en el ciclo [°]
+    pol: Pol en cachaza [%]
+    '''
+    print("####### RESUMEN ########")
+    print("Duración del ciclo de rotación [s]: ", 60/w)
+    print("Nivel de lodos [%]: ", nivel*100)
+    print("Ángulo real de filtración [°]: ", "{:.4f}".format(filtration_angle))
+    print("Volumen de filtrado en un ciclo [m3]: " "{:.4f}".format(V_total))
+    print("Tasa de filtración [m3/s]: " "{:.6f}".format(V_total/(60/w)))
+    print("Tasa de filtración [m3/h]: " "{:.6f}".format(3600*V_total/(60/w)))
+    print("Brix de jugo filtrado en el ciclo [°]: ""{:.4f}".format(Bx))
+    print("Pol en cachaza [%]: ""{:.4f}".format(pol)+"\n")
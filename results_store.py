@@ -0,0 +1,453 @@
+import ast
+import json
+import os
+import queue
+import threading
+
+import numpy as np
+
+import cycle
+
+""" ------ ALMACÉN COLUMNAR DE RESULTADOS DE BARRIDOS ------ """
+### Cada lote agregado se guarda como un bloque (directorio chunk_NNNNNN) con un .npy por columna, que se abre con
+### memoria mapeada sin copiar, o un .npz comprimido por columna. store.json guarda el esquema y, por bloque, el
+### número de filas y el mínimo y máximo de cada columna: una consulta como "pol < 2 and M < 75" descarta los
+### bloques que no pueden cumplirla sin abrirlos y solo lee las columnas que usa. Las escrituras van a un hilo;
+### append solo espera si hay más de max_pending lotes por escribir.
+###
+### Ejemplo:
+###   with ResultsStore('barrido') as store:
+###       for P in np.array_split(np.linspace(10000, 60000, 10**6), 50):
+###           store.append_cycles(P_diff=P, w=1.2)
+###   res = ResultsStore('barrido').query("pol < 2 and moisture < 75", columns=('P_diff', 'rate'))
+
+####### COLUMNAS DE RESULTADOS GUARDADAS POR append_cycles #########
+RESULT_COLUMNS = ('Vf', 'Vf_dew1', 'Vf_wsh', 'Vf_dew2', 'S', 'M', 'r', 'Bx', 'pol', 'rate', 'V_total')
+
+ALIASES = {
+    'moisture': 'M',        # Humedad en cachaza [%]
+    'brix': 'Bx',           # Brix del filtrado [°]
+    'throughput': 'rate',   # Tasa de filtración [m3/s]
+    'saturation': 'S',      # Saturación final []
+}
+
+CHUNK_ROWS = 2**18          # filas máximas por bloque
+
+
+class ResultsStore:
+
+    """ ALMACÉN DE RESULTADOS EN UN DIRECTORIO (se crea o se abre para seguir agregando) """
+
+    def __init__(self,path,compress=None,background=True,max_pending=8,chunk_rows=CHUNK_ROWS):
+        '''
+        path: directorio del almacén
+        compress: guarda los bloques nuevos comprimidos (.npz); no se pueden mapear y se descomprimen al leer.
+                  None: el valor guardado en el almacén (False en uno nuevo)
+        background: escribe en un hilo (append retorna sin esperar al disco)
+        max_pending: lotes en cola; con la cola llena append espera (acota la memoria)
+        chunk_rows: filas máximas por bloque
+        '''
+        self.path = path
+        self.chunk_rows = chunk_rows
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+        meta_path = os.path.join(path, 'store.json')
+        if os.path.exists(meta_path):
+            with open(meta_path) as fh:
+                self.meta = json.load(fh)
+        else:
+            self.meta = {'columns': {}, 'trajectories': [], 'chunks': [], 'compress': bool(compress)}
+        if compress is not None:
+            self.meta['compress'] = bool(compress)
+
+        self._error = None
+        self._queue = None
+        self._thread = None
+        if background:
+            self._queue = queue.Queue(max_pending)
+            self._thread = threading.Thread(target=self._writer, name='results-store-writer', daemon=True)
+            self._thread.start()
+
+    #### ESCRITURA ####
+
+    def append(self,columns,trajectories=None):
+        '''
+        AGREGA UN LOTE DE FILAS
+        columns: diccionario columna -> arreglo 1-D (misma longitud); el primer lote fija el esquema
+        trajectories: opcional, lista con un diccionario por fila nombre -> arreglo 1-D de longitud variable
+                      (p. ej. las de cycle_trajectories)
+        '''
+        self._check()
+        columns = {name: np.ascontiguousarray(value) for name, value in columns.items()}
+        sizes = {value.shape for value in columns.values()}
+        if len(sizes) != 1 or len(next(iter(sizes))) != 1:
+            raise ValueError("Las columnas deben ser arreglos 1-D de la misma longitud")
+        n = next(iter(sizes))[0]
+        if trajectories is not None and len(trajectories) != n:
+            raise ValueError("Se necesita una trayectoria por fila")
+
+        for start in range(0, n, self.chunk_rows):
+            part = slice(start, start + self.chunk_rows)
+            item = ({name: value[part] for name, value in columns.items()},
+                    trajectories[part] if trajectories is not None else None)
+            if self._queue is None:
+                self._write_chunk(*item)
+            else:
+                self._queue.put(item)
+
+    def append_cycles(self,ts=None,trajectories=False,**params):
+        '''
+        EVALÚA cycle.run_cycles Y AGREGA LAS ENTRADAS VARIABLES Y RESULT_COLUMNS
+        params: claves de cycle.DEFAULTS (las que se dan como arreglo o escalar se guardan como columnas)
+        trajectories: guarda también las trayectorias de cada fila (cycle_trajectories; cálculo escalar, lento)
+        '''
+        res = cycle.run_cycles(ts=ts, **params)
+        shape = np.shape(res['M'])
+        columns = {name: np.ravel(np.broadcast_to(np.asarray(value, dtype=bool if name == 'incompressible' else float), shape))
+                   for name, value in params.items() if value is not None}
+        for name in RESULT_COLUMNS:
+            columns[name] = np.ravel(res[name])
+        traj = None
+        if trajectories:
+            rows = [{name: columns[name][i].item() for name in params if name in columns} for i in range(columns['M'].size)]
+            traj = [cycle_trajectories(ts if ts is not None else 0.1, **row) for row in rows]
+        self.append(columns, traj)
+
+    def _writer(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                if self._error is None:
+                    self._write_chunk(*item)
+            except Exception as exc:        # se informa en el siguiente append, flush o close
+                self._error = exc
+            finally:
+                self._queue.task_done()
+
+    def _write_chunk(self,columns,trajectories):
+        with self._lock:
+            schema = self.meta['columns']
+            if schema and set(columns) != set(schema):
+                raise ValueError("Las columnas del lote no coinciden con el esquema: " + ", ".join(sorted(schema)))
+            chunk_id = len(self.meta['chunks'])
+        name = 'chunk_{:06d}'.format(chunk_id)
+        directory = os.path.join(self.path, name)
+        os.makedirs(directory, exist_ok=True)
+        compress = self.meta['compress']
+
+        zones = {}
+        for column, value in columns.items():
+            _save(os.path.join(directory, column), value, compress)
+            zones[column] = _zone(value)
+        traj_names = []
+        if trajectories is not None:
+            traj_names = sorted(set().union(*trajectories))
+            for traj in traj_names:
+                parts = [np.asarray(row.get(traj, ()), dtype=float) for row in trajectories]
+                offsets = np.cumsum([0] + [part.size for part in parts])
+                _save(os.path.join(directory, traj + '.traj'), np.concatenate(parts), compress)
+                _save(os.path.join(directory, traj + '.offsets'), offsets, compress)
+
+        n = len(next(iter(columns.values())))
+        with self._lock:
+            if not schema:
+                self.meta['columns'] = {column: value.dtype.str for column, value in columns.items()}
+            self.meta['trajectories'] = sorted(set(self.meta['trajectories']) | set(traj_names))
+            self.meta['chunks'].append({'name': name, 'rows': n, 'compressed': compress, 'zones': zones,
+                                        'trajectories': traj_names})
+            _write_json(os.path.join(self.path, 'store.json'), self.meta)
+
+    def _check(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise RuntimeError("Falló la escritura de un bloque") from error
+
+    def flush(self):
+        '''
+        ESPERA A QUE SE ESCRIBAN LOS LOTES EN COLA
+        '''
+        if self._queue is not None:
+            self._queue.join()
+        self._check()
+
+    def close(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+            self._queue = None
+        self._check()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,*exc):
+        self.close()
+        return False
+
+    #### LECTURA ####
+
+    def __len__(self):
+        return sum(chunk['rows'] for chunk in self._chunks())
+
+    @property
+    def columns(self):
+        return tuple(self.meta['columns'])
+
+    def _chunks(self):
+        with self._lock:
+            return list(self.meta['chunks'])
+
+    def _load(self,chunk,column,suffix=''):
+        return _load(os.path.join(self.path, chunk['name'], column + suffix), chunk['compressed'])
+
+    def column(self,name):
+        '''
+        COLUMNA COMPLETA (concatena los bloques; cada bloque sin comprimir se lee de su archivo mapeado)
+        '''
+        name = ALIASES.get(name, name)
+        chunks = self._chunks()
+        if not chunks:
+            return np.empty(0, dtype=self.meta['columns'].get(name, 'f8'))
+        return np.concatenate([self._load(chunk, name) for chunk in chunks])
+
+    def scan(self,columns=None):
+        '''
+        GENERADOR DE BLOQUES: diccionario columna -> arreglo (memoria mapeada si el bloque no está comprimido)
+        '''
+        columns = [ALIASES.get(name, name) for name in (columns or self.columns)]
+        for chunk in self._chunks():
+            yield {name: self._load(chunk, name) for name in columns}
+
+    def query(self,expr,columns=None):
+        '''
+        FILAS QUE CUMPLEN UNA EXPRESIÓN
+        expr: comparaciones entre columnas (o ALIASES) y números, con and, or, not y paréntesis,
+              p. ej. "pol < 2 and moisture < 75", "10000 <= P_diff < 30000 or not M > 80"
+        columns: columnas retornadas (por defecto todas)
+        Solo se abren los bloques cuyo rango (mínimo, máximo) puede cumplir la expresión, y de ellos solo las
+        columnas usadas en la expresión y las pedidas. Retorna columna -> arreglo y '_row' (fila global).
+        '''
+        tree = _parse(expr, self.meta['columns'])
+        used = sorted(_names(tree))
+        columns = [ALIASES.get(name, name) for name in (self.columns if columns is None else columns)]
+        unknown = set(columns) - set(self.meta['columns'])
+        if unknown:
+            raise KeyError("Columnas desconocidas: " + ", ".join(sorted(unknown)))
+
+        out = {name: [] for name in columns}
+        out['_row'] = []
+        start = 0
+        for chunk in self._chunks():
+            first, start = start, start + chunk['rows']
+            if not _may_match(tree, chunk['zones']):
+                continue
+            data = {name: self._load(chunk, name) for name in used}
+            mask = _evaluate(tree, data)
+            rows = np.flatnonzero(mask)
+            if rows.size == 0:
+                continue
+            for name in columns:
+                value = data[name] if name in data else self._load(chunk, name)
+                out[name].append(np.asarray(value[rows]))
+            out['_row'].append(first + rows)
+
+        return {name: (np.concatenate(parts) if parts else
+                       np.empty(0, dtype=self.meta['columns'].get(name, 'i8') if name != '_row' else np.intp))
+                for name, parts in out.items()}
+
+    def count(self,expr):
+        '''
+        NÚMERO DE FILAS QUE CUMPLEN LA EXPRESIÓN
+        '''
+        return self.query(expr, columns=())['_row'].size
+
+    def trajectory(self,name,row):
+        '''
+        TRAYECTORIA name DE LA FILA GLOBAL row (arreglo 1-D)
+        '''
+        start = 0
+        for chunk in self._chunks():
+            if row < start + chunk['rows']:
+                if name not in chunk['trajectories']:
+                    raise KeyError("El bloque de la fila {} no tiene la trayectoria {}".format(row, name))
+                offsets = self._load(chunk, name, '.offsets')
+                i = row - start
+                return np.asarray(self._load(chunk, name, '.traj')[offsets[i]:offsets[i+1]])
+            start += chunk['rows']
+        raise IndexError(row)
+
+
+def cycle_trajectories(ts=0.1,**params):
+    '''
+    TRAYECTORIAS DE UN PUNTO DE OPERACIÓN: filtration.volume y dewatering.dewatering_process de las zonas 1 y 2
+    params: claves de cycle.DEFAULTS, escalares
+    Retorna nombre -> arreglo: form_t, form_v, form_q, form_l, dew1_t, dew1_S, dew1_V, dew2_t, dew2_S, dew2_V.
+    '''
+    import filtration
+    import dewatering
+    import washing
+    from RVDF import RVDF
+
+    p = dict(cycle.DEFAULTS, **params)
+    filtro, lodos = cycle.build(**params)
+    rd, L, w = filtro.rd, filtro.L, filtro.w
+    form = filtration.volume(filtro, lodos, ts, filtro.tf)
+    thickness = float(form.l[-1])
+    dew1 = dewatering.dewatering_process(filtro, lodos, thickness, RVDF.drum_filter_area(rd, L, filtro.dew_angle1),
+                                         RVDF.angle_to_time(filtro.dew_angle1, w), 1, 0, ts)
+    wash = washing.water_wash(filtro, lodos, p['e'], p['wsh_Q'], thickness, dew1.S)
+    dew2 = dewatering.dewatering_process(filtro, lodos, thickness, RVDF.drum_filter_area(rd, L, filtro.dew_angle2),
+                                         RVDF.angle_to_time(filtro.dew_angle2, w), 2, wash.r, ts)
+
+    return {'form_t': form.t, 'form_v': form.v, 'form_q': form.q, 'form_l': form.l,
+            'dew1_t': dew1.dew_time, 'dew1_S': dew1.S_arr, 'dew1_V': dew1.V_filtrate_dew_arr,
+            'dew2_t': dew2.dew_time, 'dew2_S': dew2.S_arr, 'dew2_V': dew2.V_filtrate_dew_arr}
+
+
+#### ARCHIVOS DE LOS BLOQUES ####
+
+def _save(base,value,compress):
+    if compress:
+        np.savez_compressed(base + '.npz', values=value)
+    else:
+        np.save(base + '.npy', value)
+
+
+def _load(base,compressed):
+    if compressed:
+        with np.load(base + '.npz') as data:
+            return data['values']
+    return np.load(base + '.npy', mmap_mode='r')
+
+
+def _zone(value):
+    '''
+    MÍNIMO Y MÁXIMO DE LOS VALORES DEL BLOQUE SIN CONTAR nan, con ±inf incluidos (None si no hay ninguno)
+    '''
+    if value.dtype == bool:
+        return [bool(value.min()), bool(value.max())] if value.size else None
+    valid = value[~np.isnan(value)]
+    return [float(valid.min()), float(valid.max())] if valid.size else None
+
+
+def _write_json(path,data):
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as fh:
+        json.dump(data, fh, indent=1)
+    os.replace(tmp, path)       # los lectores ven el archivo anterior o el nuevo, nunca uno a medias
+
+
+#### EXPRESIONES DE FILTRO ####
+
+_COMPARE = {ast.Lt: np.less, ast.LtE: np.less_equal, ast.Gt: np.greater, ast.GtE: np.greater_equal,
+            ast.Eq: np.equal, ast.NotEq: np.not_equal}
+
+
+def _parse(expr,schema):
+    '''
+    EXPRESIÓN -> ÁRBOL ('and'|'or', [hijos]) / ('not', hijo) / ('cmp', columna, operador, valor)
+    Las comparaciones encadenadas (a < x < b) se separan en and; número op columna se invierte.
+    '''
+    try:
+        node = ast.parse(expr, mode='eval').body
+    except SyntaxError as exc:
+        raise ValueError("Expresión no válida: " + expr) from exc
+    return _convert(node, schema, expr)
+
+
+_FLIP = {ast.Lt: ast.Gt, ast.LtE: ast.GtE, ast.Gt: ast.Lt, ast.GtE: ast.LtE, ast.Eq: ast.Eq, ast.NotEq: ast.NotEq}
+
+
+def _convert(node,schema,expr):
+    if isinstance(node, ast.BoolOp):
+        return ('and' if isinstance(node.op, ast.And) else 'or', [_convert(v, schema, expr) for v in node.values])
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+        return ('not', _convert(node.operand, schema, expr))
+    if isinstance(node, ast.Compare):
+        terms = [node.left] + node.comparators
+        parts = []
+        for left, op, right in zip(terms[:-1], node.ops, terms[1:]):
+            if type(op) not in _COMPARE:
+                raise ValueError("Operador no permitido en: " + expr)
+            if isinstance(left, ast.Name):
+                parts.append(('cmp', _column(left, schema), type(op), _number(right, expr)))
+            elif isinstance(right, ast.Name):
+                parts.append(('cmp', _column(right, schema), _FLIP[type(op)], _number(left, expr)))
+            else:
+                raise ValueError("Cada comparación debe tener una columna y un número: " + expr)
+        return parts[0] if len(parts) == 1 else ('and', parts)
+    raise ValueError("Solo se admiten comparaciones con and, or y not: " + expr)
+
+
+def _column(node,schema):
+    name = ALIASES.get(node.id, node.id)
+    if name not in schema:
+        raise KeyError("Columna desconocida: " + node.id)
+    return name
+
+
+def _number(node,expr):
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+        return -_number(node.operand, expr)
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float, bool)):
+        return node.value
+    raise ValueError("Se esperaba un número en: " + expr)
+
+
+def _names(tree):
+    kind = tree[0]
+    if kind == 'cmp':
+        return {tree[1]}
+    if kind == 'not':
+        return _names(tree[1])
+    return set().union(*(_names(child) for child in tree[1]))
+
+
+def _may_match(tree,zones):
+    '''
+    ¿PUEDE ALGUNA FILA DEL BLOQUE CUMPLIR LA EXPRESIÓN? (según el mínimo y máximo de cada columna)
+    '''
+    kind = tree[0]
+    if kind == 'and':
+        return all(_may_match(child, zones) for child in tree[1])
+    if kind == 'or':
+        return any(_may_match(child, zones) for child in tree[1])
+    if kind == 'not':
+        return True         # los rangos no permiten descartar la negación
+    _, name, op, value = tree
+    if op is ast.NotEq:
+        return True         # nan != valor se cumple y los rangos no cuentan los nan
+    zone = zones.get(name)
+    if zone is None:
+        return False        # con solo nan ninguna otra comparación se cumple
+    low, high = zone
+    if op is ast.Lt:
+        return low < value
+    if op is ast.LtE:
+        return low <= value
+    if op is ast.Gt:
+        return high > value
+    if op is ast.GtE:
+        return high >= value
+    return low <= value <= high     # ast.Eq
+
+
+def _evaluate(tree,data):
+    kind = tree[0]
+    if kind == 'and':
+        mask = _evaluate(tree[1][0], data)
+        for child in tree[1][1:]:
+            mask &= _evaluate(child, data)
+        return mask
+    if kind == 'or':
+        mask = _evaluate(tree[1][0], data)
+        for child in tree[1][1:]:
+            mask |= _evaluate(child, data)
+        return mask
+    if kind == 'not':
+        return ~_evaluate(tree[1], data)
+    _, name, op, value = tree
+    return _COMPARE[op](data[name], value)
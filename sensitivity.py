@@ -0,0 +1,262 @@
+import warnings
+from collections import namedtuple
+
+import numpy as np
+
+import cycle
+
+""" ------ SENSIBILIDADES ANALÍTICAS DEL CICLO (DIFERENCIACIÓN AUTOMÁTICA HACIA ADELANTE) ------ """
+### cycle.evaluate solo usa aritmética, ufuncs y np.where, de modo que se evalúa tal cual con números duales: cada
+### valor lleva, además del arreglo del lote, sus derivadas en un eje inicial, solo respecto de las entradas de las
+### que depende (la geometría no depende de la torta, alpha no depende de los ángulos...). Una sola pasada da las
+### salidas y la jacobiana completa de cada punto de operación, sin diferencias finitas (ni el ruido del
+### muestreo con ts).
+###
+### Ejemplo:
+###   res = jacobian(P_diff=np.linspace(10000, 60000, 50), w=1.2)
+###   res.jacobian[:, res.outputs.index('pol'), res.inputs.index('wsh_Q')]      # d pol / d wsh_Q
+###   rank(res, 'M')                                                           # entradas por |elasticidad| media
+
+SensitivityResult = namedtuple('SensitivityResult', 'values jacobian elasticity outputs inputs')
+
+OUTPUTS = ('rate', 'V_total', 'M', 'S', 'Bx', 'pol', 'W_cake', 'thickness')
+
+INPUTS = tuple(name for name, value in cycle.DEFAULTS.items()
+               if name != 'incompressible' and value is not None)      # parámetros de RVDF y slurry_cake
+
+
+class Dual:
+
+    """ NÚMERO DUAL POR LOTES: value (forma del lote), grad ((len(idx),) + forma del lote) e idx (entradas) """
+
+    __array_priority__ = 1000
+
+    def __init__(self,value,grad,idx):
+        self.value = value
+        self.grad = grad
+        self.idx = idx          # tupla ordenada de los índices de las entradas de las que depende
+
+    @property
+    def shape(self):
+        return np.shape(self.value)
+
+    @property
+    def ndim(self):
+        return np.ndim(self.value)
+
+    def __array_ufunc__(self,ufunc,method,*inputs,**kwargs):
+        if method != '__call__' or kwargs.get('out') is not None:
+            return NotImplemented
+        rule = _UFUNC_RULES.get(ufunc)
+        values = [x.value if isinstance(x, Dual) else np.asarray(x) for x in inputs]
+        if rule is None:
+            if ufunc in _CONSTANT_UFUNCS:
+                return ufunc(*values)       # comparaciones, redondeos...: sin derivada
+            return NotImplemented
+        grads = [x if isinstance(x, Dual) else None for x in inputs]
+        value = ufunc(*values)
+        return Dual(value, *rule(value, values, grads))
+
+    def __array_function__(self,func,types,args,kwargs):
+        handler = _FUNCTION_RULES.get(func)
+        if handler is None:
+            return NotImplemented
+        return handler(*args, **kwargs)
+
+    #### OPERADORES DE PYTHON -> UFUNCS ####
+    def __add__(self,other): return np.add(self, other)
+    def __radd__(self,other): return np.add(other, self)
+    def __sub__(self,other): return np.subtract(self, other)
+    def __rsub__(self,other): return np.subtract(other, self)
+    def __mul__(self,other): return np.multiply(self, other)
+    def __rmul__(self,other): return np.multiply(other, self)
+    def __truediv__(self,other): return np.true_divide(self, other)
+    def __rtruediv__(self,other): return np.true_divide(other, self)
+    def __pow__(self,other): return np.power(self, other)
+    def __rpow__(self,other): return np.power(other, self)
+    def __neg__(self): return np.negative(self)
+    def __pos__(self): return self
+    def __abs__(self): return np.absolute(self)
+    def __lt__(self,other): return np.less(self, other)
+    def __le__(self,other): return np.less_equal(self, other)
+    def __gt__(self,other): return np.greater(self, other)
+    def __ge__(self,other): return np.greater_equal(self, other)
+
+
+def _chain(values,duals,*partials):
+    '''
+    SUMA DE grad_i * d(salida)/d(operando_i) CON BROADCASTING (los operandos sin derivada se omiten)
+    Retorna (grad, idx) sobre la unión de las entradas de las que dependen los operandos.
+    '''
+    terms = [(x.grad if partial is _ONE else x.grad*partial, x.idx)
+             for x, partial in zip(duals, partials) if x is not None]
+    if len(terms) == 1:
+        return terms[0]
+    (a, a_idx), (b, b_idx) = terms
+    if a_idx == b_idx:
+        return a + b, a_idx
+    idx = tuple(sorted(set(a_idx) | set(b_idx)))
+    position = {j: i for i, j in enumerate(idx)}
+    shape = np.broadcast_shapes(a.shape[1:], b.shape[1:])
+    grad = np.zeros((len(idx),) + shape)
+    grad[[position[j] for j in a_idx]] += a         # filas contiguas del lote: copias por bloques
+    grad[[position[j] for j in b_idx]] += b
+    return grad, idx
+
+
+_ONE = 1.0      # derivada parcial unitaria: el gradiente del operando se usa sin multiplicar
+
+
+def _power(value,values,grads):
+    a, b = values
+    with np.errstate(divide='ignore', invalid='ignore'):
+        da = b*np.power(a, b - 1) if grads[0] is not None else None
+        # d(a^b)/db = a^b*ln(a); para a <= 0 con exponente constante no se usa
+        db = np.where(a > 0, value*np.log(np.where(a > 0, a, 1.0)), 0.0) if grads[1] is not None else None
+    return _chain(values, grads, da, db)
+
+
+def _negative(value,values,grads):
+    return -grads[0].grad, grads[0].idx
+
+
+_UFUNC_RULES = {
+    np.add: lambda v, x, g: _chain(x, g, _ONE, _ONE),
+    np.subtract: lambda v, x, g: _chain(x, g, _ONE, -1.0),
+    np.multiply: lambda v, x, g: _chain(x, g, x[1], x[0]),
+    np.true_divide: lambda v, x, g: _chain(x, g, 1/x[1], -v/x[1]),
+    np.power: _power,
+    np.negative: _negative,
+    np.positive: lambda v, x, g: (g[0].grad, g[0].idx),
+    np.absolute: lambda v, x, g: _chain(x, g, np.sign(x[0])),
+    np.sqrt: lambda v, x, g: _chain(x, g, 0.5/v),
+    np.square: lambda v, x, g: _chain(x, g, 2*x[0]),
+    np.reciprocal: lambda v, x, g: _chain(x, g, -v*v),
+    np.exp: lambda v, x, g: _chain(x, g, v),
+    np.log: lambda v, x, g: _chain(x, g, 1/x[0]),
+    np.sin: lambda v, x, g: _chain(x, g, np.cos(x[0])),
+    np.cos: lambda v, x, g: _chain(x, g, -np.sin(x[0])),
+    np.arcsin: lambda v, x, g: _chain(x, g, 1/np.sqrt(1 - x[0]**2)),
+    np.arccos: lambda v, x, g: _chain(x, g, -1/np.sqrt(1 - x[0]**2)),
+    np.deg2rad: lambda v, x, g: _chain(x, g, np.pi/180),
+    np.rad2deg: lambda v, x, g: _chain(x, g, 180/np.pi),
+    np.maximum: lambda v, x, g: _chain(x, g, x[0] >= x[1], x[0] < x[1]),
+    np.minimum: lambda v, x, g: _chain(x, g, x[0] <= x[1], x[0] > x[1]),
+}
+
+_CONSTANT_UFUNCS = {np.less, np.less_equal, np.greater, np.greater_equal, np.equal, np.not_equal, np.isfinite,
+                    np.isnan, np.isinf, np.sign, np.floor, np.ceil, np.rint, np.trunc, np.logical_and,
+                    np.logical_or, np.logical_not}
+
+
+def _where(condition,a,b):
+    values = [x.value if isinstance(x, Dual) else np.asarray(x) for x in (a, b)]
+    condition = np.asarray(condition)
+    value = np.where(condition, *values)
+    # cada rama aporta su gradiente donde se elige: derivadas parciales 0/1 según la condición
+    duals = [x if isinstance(x, Dual) else None for x in (a, b)]
+    grad, idx = _chain(values, duals, condition, ~condition)
+    return Dual(value, grad, idx)
+
+
+def _broadcast_to(x,shape,subok=False):
+    return Dual(np.broadcast_to(x.value, shape), np.broadcast_to(x.grad, x.grad.shape[:1] + tuple(shape)), x.idx)
+
+
+_FUNCTION_RULES = {
+    np.where: _where,
+    np.broadcast_to: _broadcast_to,
+    np.shape: lambda x: x.shape,
+    np.ndim: lambda x: x.ndim,
+    np.size: lambda x, axis=None: np.size(x.value, axis),
+}
+
+
+def jacobian(outputs=OUTPUTS,inputs=INPUTS,ts=None,chunk=10000,**params):
+    '''
+    SALIDAS DEL CICLO Y SUS DERIVADAS RESPECTO DE CADA ENTRADA PARA UN LOTE DE PUNTOS DE OPERACIÓN
+    outputs: salidas de cycle.OUTPUTS
+    inputs: parámetros respecto de los que se deriva (claves numéricas de cycle.DEFAULTS; por defecto todos)
+    ts: tiempo de muestreo [s]; con None (por defecto) los tiempos de cada etapa son exactos y la jacobiana es la
+        del modelo continuo. Con ts las derivadas respecto de los tiempos de zona no incluyen el salto del muestreo.
+    chunk: puntos por pasada (la memoria crece como puntos*entradas)
+    params: claves de cycle.DEFAULTS, escalares o arreglos (broadcasting, como cycle.run_cycles)
+    Retorna SensitivityResult(values, jacobian, elasticity, outputs, inputs):
+        values: salida -> arreglo con la forma del lote
+        jacobian: arreglo (lote..., salidas, entradas) de d salida / d entrada
+        elasticity: (d salida / d entrada)*(entrada/salida), cambio porcentual de la salida por 1 % de la entrada;
+                    0 para entradas nulas (Rm, s, SS_agua...) y nan donde la salida es 0
+    '''
+    outputs, inputs = tuple(outputs), tuple(inputs)
+    unknown = (set(outputs) - set(cycle.OUTPUTS)) | (set(inputs) - set(INPUTS))
+    if unknown:
+        raise ValueError("Salidas o entradas no válidas: " + ", ".join(sorted(unknown)))
+    if 'filtrate_dens' in inputs and params.get('filtrate_dens') is None:
+        raise ValueError("filtrate_dens solo es entrada si se fija (por defecto se calcula con Bx_0)")
+
+    p, shape = cycle.complete_params(params)
+    n_points = int(np.prod(shape))
+    n_in = len(inputs)
+    values = {name: np.empty(n_points) for name in outputs}
+    J = np.empty((n_points, len(outputs), n_in))
+
+    flat = {name: (np.reshape(v, -1) if isinstance(v, np.ndarray) else v) for name, v in p.items()}
+    for start in range(0, n_points, chunk):
+        part = slice(start, min(start+chunk, n_points))
+        size = part.stop - part.start
+        q = {name: (v[part] if isinstance(v, np.ndarray) else v) for name, v in flat.items()}
+        for j, name in enumerate(inputs):
+            q[name] = Dual(q[name], np.broadcast_to(1.0, (1, size)), (j,))
+        with np.errstate(all='ignore'):
+            res = cycle.evaluate(q, ts)
+        for i, name in enumerate(outputs):
+            y = res[name]
+            J[part, i] = 0.0
+            if isinstance(y, Dual):
+                values[name][part] = np.broadcast_to(y.value, (size,))
+                J[part, i, list(y.idx)] = np.broadcast_to(y.grad, (len(y.idx), size)).T
+            else:
+                values[name][part] = y
+
+    x = np.stack([np.reshape(np.broadcast_to(p[name], shape), -1) for name in inputs], axis=-1)
+    y = np.stack([values[name] for name in outputs], axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        E = np.where(x[:, None, :] == 0, 0.0, J*x[:, None, :]/y[:, :, None])
+
+    values = {name: v.reshape(shape) for name, v in values.items()}
+    tail = (len(outputs), n_in)
+    return SensitivityResult(values, J.reshape(shape + tail), E.reshape(shape + tail), outputs, inputs)
+
+
+def rank(result,output,n=None):
+    '''
+    ENTRADAS ORDENADAS POR LA MEDIA DE |ELASTICIDAD| DE UNA SALIDA EN EL LOTE
+    Una entrada que sube la salida en unos puntos y la baja en otros no se cancela: el orden usa la media de los
+    valores absolutos y la media con signo se reporta aparte.
+    Retorna una lista de (entrada, |elasticidad| media, elasticidad media) de mayor a menor influencia (las n
+    primeras si se indica).
+    '''
+    E = result.elasticity[..., result.outputs.index(output), :]
+    E = E.reshape(-1, len(result.inputs))
+    with np.errstate(invalid='ignore'), warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)     # entradas con elasticidad nan en todo el lote
+        magnitude = np.nanmean(np.abs(E), axis=0)
+        mean = np.nanmean(E, axis=0)
+    order = np.argsort(-np.nan_to_num(magnitude), kind='stable')
+    ranking = [(result.inputs[j], float(magnitude[j]), float(mean[j])) for j in order]
+    return ranking[:n] if n else ranking
+
+
+def finite_differences(output,inputs=INPUTS,ts=None,rel_step=1e-6,**params):
+    '''
+    JACOBIANA POR DIFERENCIAS CENTRADAS (referencia para comprobar jacobian; 2*entradas evaluaciones del ciclo)
+    Retorna un arreglo (lote..., entradas) de d salida / d entrada.
+    '''
+    p, shape = cycle.complete_params(params)
+    columns = []
+    for name in inputs:
+        x = np.broadcast_to(p[name], shape)
+        h = rel_step*np.where(x != 0, np.abs(x), 1.0)
+        res = [cycle.run_cycles(ts=ts, **dict(params, **{name: x + sign*h}))[output] for sign in (1, -1)]
+        columns.append((res[0] - res[1])/(2*h))
+    return np.stack(columns, axis=-1)
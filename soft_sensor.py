@@ -0,0 +1,321 @@
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+import numpy as np
+
+import cycle
+from montecarlo import QuantileSketch
+
+""" ------ SENSOR VIRTUAL EN LÍNEA: HUMEDAD Y POL EN CACHAZA A PARTIR DE MEDICIONES DE PROCESO ------ """
+### Lee registros de vacío, velocidad, nivel del tanque y caudal de lavado (CSV con encabezado o JSON por línea)
+### desde un archivo, una tubería o un socket local y emite una predicción por revolución. Cada etapa del ciclo
+### (cycle.STAGES) se recalcula solo si cambió alguno de los parámetros que lee o una etapa previa: si solo cambia
+### el vacío se reutilizan la geometría, los tiempos y las áreas.
+###
+### Uso:
+###   python soft_sensor.py historian.csv > predicciones.jsonl
+###   cat registros.jsonl | python soft_sensor.py -
+###   python soft_sensor.py tcp://127.0.0.1:5020 --param k=3e-13 --param epsilon=0.45
+
+####### NOMBRES DE LAS MEDICIONES -> PARÁMETROS DEL CICLO #########
+ALIASES = {
+    'vacuum': 'P_diff',         # Vacío del tambor [Pa]
+    'rpm': 'w',                 # Velocidad de rotación [rpm]
+    'level': 'nivel',           # Nivel del tanque de lodos []
+    'wash_flow': 'wsh_Q',       # Caudal de agua de lavado [m3/s]
+}
+
+PREDICTIONS = ('M', 'pol', 'S', 'Bx', 'rate', 'thickness', 'filtration_angle')
+
+PASSTHROUGH = ('t', 'revolution', 'timestamp')      # campos del registro copiados a la predicción
+NUMERIC_PASSTHROUGH = ('t', 'revolution')           # se copian como número (CSV y JSON dan la misma salida)
+
+LATENCY_TARGET = 1e-3       # objetivo de latencia por predicción [s], se compara con el percentil 99
+LATENCY_BLOCK = 1024        # latencias acumuladas antes de incorporarlas al resumen de percentiles
+
+
+class SoftSensor:
+
+    """ ESTADO INCREMENTAL DEL CICLO: CADA ETAPA GUARDA SU ÚLTIMO RESULTADO Y LAS ENTRADAS QUE LO PRODUJERON """
+
+    def __init__(self,ts=None,outputs=PREDICTIONS,**params):
+        '''
+        ts: Tiempo de muestreo [s] de las etapas (None: tiempos exactos)
+        outputs: Salidas de cycle.OUTPUTS incluidas en cada predicción
+        params: Parámetros fijos del ciclo (claves de cycle.DEFAULTS), p. ej. los de la torta calibrados
+        '''
+        unknown = (set(params) - set(cycle.DEFAULTS)) | (set(outputs) - set(cycle.OUTPUTS))
+        if unknown:
+            raise TypeError("Parámetros o salidas desconocidos: " + ", ".join(sorted(unknown)))
+        self.p = dict(cycle.DEFAULTS)
+        self.p.update(params)
+        self.ts = ts
+        self.outputs = tuple(outputs)
+        self.results = {}           # etapa -> último resultado
+        self.keys = {}              # etapa -> entradas del último resultado
+        self.versions = {name: 0 for name, _, _, _ in cycle.STAGES}
+        self.computed = {name: 0 for name, _, _, _ in cycle.STAGES}
+        self.n_records = 0          # registros procesados (con o sin predicción)
+        self.n_predictions = 0
+        self.max_latency = 0.0
+        self.latencies = QuantileSketch()
+        self._pending = []          # latencias aún no incorporadas a self.latencies [s]
+        self.next_t = None          # tiempo de la próxima predicción por revolución [s]
+        self.predict()              # estado inicial: el primer registro ya solo recalcula lo que cambia
+
+    def measure(self,record):
+        '''
+        APLICA LAS MEDICIONES DE UN REGISTRO AL ESTADO (nombres de ALIASES o claves de cycle.DEFAULTS)
+        Los valores vacíos o no numéricos se ignoran: se mantiene la última medición válida.
+        '''
+        for key, value in record.items():
+            name = ALIASES.get(key, key)
+            if name not in cycle.DEFAULTS or name in ('incompressible', 'filtrate_dens'):
+                continue
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                continue
+            if np.isfinite(value):
+                self.p[name] = value
+
+    def predict(self):
+        '''
+        RECALCULA LAS ETAPAS AFECTADAS Y RETORNA LAS SALIDAS DE self.outputs
+        '''
+        p = self.p
+        for name, fun, params, upstream in cycle.STAGES:
+            key = tuple(p[param] for param in params) + tuple(self.versions[stage] for stage in upstream)
+            if self.keys.get(name) == key:
+                continue
+            args = [self.results[stage] for stage in upstream]
+            if name in cycle.TIMED_STAGES:
+                args.append(self.ts)
+            with np.errstate(all='ignore'):
+                self.results[name] = fun(p, *args)
+            self.keys[name] = key
+            self.versions[name] += 1
+            self.computed[name] += 1
+
+        res = {}
+        for result in self.results.values():
+            res.update(result)
+        return {name: float(res[name]) for name in self.outputs}
+
+    def update(self,record):
+        '''
+        REGISTRO -> PREDICCIÓN (con los campos de PASSTHROUGH del registro y la latencia en ms)
+        '''
+        start = time.perf_counter()
+        self.measure(record)
+        prediction = {key: _passthrough(key, record[key]) for key in PASSTHROUGH if key in record}
+        prediction.update(self.predict())
+        latency = time.perf_counter() - start
+        self.n_records += 1
+        self.n_predictions += 1
+        self.max_latency = max(self.max_latency, latency)
+        self._pending.append(latency)
+        if len(self._pending) >= LATENCY_BLOCK:
+            self._flush_latencies()
+        prediction['latency_ms'] = 1e3*latency
+        return prediction
+
+    def _flush_latencies(self):
+        if self._pending:
+            self.latencies.update(np.array(self._pending))
+            self._pending = []
+
+    def latency_quantile(self,q):
+        '''
+        PERCENTIL DE LA LATENCIA POR PREDICCIÓN [s] (q en [0, 1]; nan sin predicciones)
+        '''
+        self._flush_latencies()
+        return self.latencies.quantile(q)
+
+    def feed(self,record):
+        '''
+        REGISTRO -> PREDICCIÓN POR REVOLUCIÓN: con campo 't' [s] se predice cada vez que transcurre un ciclo
+        (60/w) desde la predicción anterior, con las últimas mediciones; sin 't' cada registro es una revolución.
+        Retorna None si el registro no completa una revolución.
+        '''
+        if 't' not in record:
+            return self.update(record)
+        t = float(record['t'])
+        if self.next_t is not None and t < self.next_t:
+            self.measure(record)
+            self.n_records += 1
+            return None
+        prediction = self.update(record)
+        self.next_t = t + 60/self.p['w']
+        return prediction
+
+
+def _passthrough(key,value):
+    '''
+    VALOR DE UN CAMPO DE PASSTHROUGH: número para NUMERIC_PASSTHROUGH (revolution entera si lo es), tal cual si no
+    se puede convertir
+    '''
+    if key not in NUMERIC_PASSTHROUGH:
+        return value
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return value
+    return int(number) if key == 'revolution' and number.is_integer() else number
+
+
+class RecordParser:
+
+    """ LÍNEAS DE TEXTO -> REGISTROS: JSON POR LÍNEA O CSV CON ENCABEZADO (se detecta con la primera línea) """
+
+    def __init__(self,delimiter=','):
+        self.delimiter = delimiter
+        self.header = None
+        self.json = None
+
+    def parse(self,line):
+        '''
+        Retorna el registro (diccionario) o None para el encabezado y las líneas vacías.
+        '''
+        line = line.strip()
+        if not line:
+            return None
+        if self.json is None:
+            self.json = line.startswith('{')
+        if self.json:
+            return json.loads(line)
+        values = [value.strip() for value in line.split(self.delimiter)]
+        if self.header is None:
+            self.header = values
+            return None
+        return dict(zip(self.header, values))
+
+
+def iter_predictions(lines,sensor=None,per_revolution=True,**params):
+    '''
+    VERSIÓN SÍNCRONA: iterable de líneas (archivo abierto, sys.stdin...) -> predicciones
+    '''
+    sensor = sensor or SoftSensor(**params)
+    parser = RecordParser()
+    records = filter(None, map(parser.parse, lines))
+    return filter(None, map(sensor.feed if per_revolution else sensor.update, records))
+
+
+#### LECTOR ASÍNCRONO CON CONTRAPRESIÓN ####
+
+async def _open_source(source):
+    '''
+    source: ruta de archivo, '-' (entrada estándar), 'tcp://host:puerto' o 'unix:///ruta/socket'
+    Retorna (lector de líneas asíncrono, función de cierre).
+    '''
+    if source.startswith('tcp://'):
+        host, _, port = source[len('tcp://'):].rpartition(':')
+        reader, writer = await asyncio.open_connection(host or '127.0.0.1', int(port))
+        return _stream_lines(reader), writer.close
+    if source.startswith('unix://'):
+        reader, writer = await asyncio.open_unix_connection(source[len('unix://'):])
+        return _stream_lines(reader), writer.close
+    if source == '-':
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader(limit=2**20)
+        try:
+            transport, _ = await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+            return _stream_lines(reader), transport.close
+        except ValueError:
+            return _file_lines(sys.stdin), lambda: None    # entrada redirigida desde un archivo regular
+    fh = open(source, newline='')
+    return _file_lines(fh), fh.close
+
+
+async def _stream_lines(reader):
+    while True:
+        line = await reader.readline()
+        if not line:
+            return
+        yield line.decode()
+
+
+async def _file_lines(fh,block=256):
+    # un archivo regular no bloquea el lazo de eventos; se cede el control cada bloque de líneas
+    for i, line in enumerate(fh):
+        yield line
+        if i % block == block-1:
+            await asyncio.sleep(0)
+
+
+async def stream(source,emit,sensor=None,maxsize=1024,per_revolution=True,**params):
+    '''
+    PREDICCIONES EN LÍNEA DESDE UNA FUENTE
+    source: ver _open_source
+    emit: función llamada con cada predicción (diccionario)
+    maxsize: Capacidad de la cola entre el lector y el sensor. Con la cola llena el lector espera (no descarta):
+             en tuberías y sockets deja de leer y el emisor queda frenado por el búfer del sistema operativo.
+    Retorna el SoftSensor, con n_records, n_predictions, max_latency [s] y latency_quantile.
+    '''
+    sensor = sensor or SoftSensor(**params)
+    queue = asyncio.Queue(maxsize)
+    lines, close = await _open_source(source)
+    parser = RecordParser()
+
+    async def produce():
+        try:
+            async for line in lines:
+                record = parser.parse(line)
+                if record is not None:
+                    await queue.put(record)
+        finally:
+            await queue.put(None)
+            close()
+
+    step = sensor.feed if per_revolution else sensor.update
+
+    async def consume():
+        done = False
+        while not done:
+            batch = [await queue.get()]
+            # vacía lo acumulado en la cola sin volver al lazo de eventos en cada registro
+            while not queue.empty() and len(batch) < maxsize:
+                batch.append(queue.get_nowait())
+            for record in batch:
+                if record is None:
+                    done = True
+                    break
+                prediction = step(record)
+                if prediction is not None:
+                    emit(prediction)
+
+    await asyncio.gather(produce(), consume())
+    return sensor
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sensor virtual de humedad y pol en cachaza")
+    parser.add_argument('source', help="archivo, '-' (entrada estándar), tcp://host:puerto o unix:///ruta")
+    parser.add_argument('--param', action='append', default=[], metavar='NOMBRE=VALOR',
+                        help="parámetro fijo del ciclo (claves de cycle.DEFAULTS)")
+    parser.add_argument('--every-record', action='store_true', help="una predicción por registro, no por revolución")
+    parser.add_argument('--queue', type=int, default=1024, help="capacidad de la cola del lector")
+    args = parser.parse_args(argv)
+
+    params = {}
+    for item in args.param:
+        name, _, value = item.partition('=')
+        params[name] = value.lower() == 'true' if name == 'incompressible' else float(value)
+
+    out = sys.stdout
+    emit = lambda prediction: out.write(json.dumps(prediction) + '\n')
+    sensor = asyncio.run(stream(args.source, emit, maxsize=args.queue, per_revolution=not args.every_record, **params))
+    out.flush()
+    p50, p99 = 1e3*sensor.latency_quantile([0.5, 0.99])
+    print("registros: {}  predicciones: {}  latencia p50: {:.3f} ms  p99: {:.3f} ms  máxima: {:.3f} ms".format(
+        sensor.n_records, sensor.n_predictions, p50, p99, 1e3*sensor.max_latency), file=sys.stderr)
+    if p99 > 1e3*LATENCY_TARGET:
+        print("p99 por encima del objetivo de {:.1f} ms".format(1e3*LATENCY_TARGET), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
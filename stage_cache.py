@@ -0,0 +1,240 @@
+import functools
+import hashlib
+import os
+import pickle
+import sys
+from collections import OrderedDict
+
+import numpy as np
+
+from RVDF import RVDF
+import filtration
+import dewatering
+import washing
+import bx_calc
+import cycle
+import trajectory
+from pol_calc import pol_calc
+
+""" ------ CACHÉ POR ETAPA DIRECCIONADA POR CONTENIDO ------ """
+### Cada etapa se indexa solo con los parámetros que lee de los objetos RVDF y slurry_cake, de modo que un
+### barrido que cambia únicamente parámetros aguas abajo (wsh_Q, e, Bx_0...) reutiliza la filtración y el secado.
+### La clave incluye además un hash del código de las etapas (code_salt), de modo que el nivel en disco no sirve
+### resultados calculados con fórmulas o formatos anteriores.
+
+CACHE_VERSION = 1       # formato de los resultados guardados; subirlo invalida el nivel en disco
+
+####### PARÁMETROS LEÍDOS POR CADA ETAPA #########
+STAGE_KEYS = {
+    'filtration': (('P_diff', 'Af', 'Rm', 'rd', 'L', 'w', 'filtration_angle'), ('u', 'alpha', 'c', 's', 'k')),
+    'dewatering': (('P_diff',), ('epsilon', 'alpha', 'solid_dens', 'filtrate_dens', 'surface_tension', 'u', 'k')),
+    'washing': (('wsh_angle', 'w', 'rd', 'L'), ('epsilon',)),
+}
+
+
+def _normalize(value):
+    if isinstance(value, np.ndarray):
+        return ('ndarray', value.dtype.str, value.shape, value.tobytes())
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return float(value).hex()
+    if callable(value):
+        raise TypeError("No se puede usar caché con parámetros callable")
+    return value
+
+
+@functools.lru_cache(maxsize=None)
+def code_salt():
+    '''
+    HASH DEL CÓDIGO DE LAS ETAPAS Y DE CACHE_VERSION: un cambio en las fórmulas o en los resultados invalida las
+    entradas guardadas en disco por versiones anteriores
+    '''
+    digest = hashlib.blake2b(str(CACHE_VERSION).encode(), digest_size=16)
+    for module in (filtration, dewatering, washing, bx_calc, trajectory, sys.modules[RVDF.__module__],
+                   sys.modules[pol_calc.__module__], dewatering.adaptive, dewatering.dewatering_fv):
+        with open(module.__file__, 'rb') as fh:
+            digest.update(fh.read())
+    return digest.hexdigest()
+
+
+def stage_key(stage,values):
+    '''
+    CLAVE DE CONTENIDO: hash de la versión del código, de la etapa y de los valores normalizados que lee
+    values: secuencia de pares (nombre, valor)
+    '''
+    payload = repr((code_salt(), stage, tuple((name, _normalize(v)) for name, v in values))).encode()
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
+def _nbytes(value):
+    if isinstance(value, np.ndarray):
+        return value.nbytes + 112
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(_nbytes(v) for v in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_nbytes(v) for v in value.values())
+    return sys.getsizeof(value)
+
+
+def _freeze(value):
+    # los resultados compartidos desde la caché no deben modificarse en sitio
+    if isinstance(value, np.ndarray):
+        value.flags.writeable = False
+    elif isinstance(value, (tuple, list)):
+        for v in value:
+            _freeze(v)
+    return value
+
+
+class StageCache:
+
+    """ CACHÉ LRU ACOTADA POR MEMORIA, CON CONTADORES Y NIVEL OPCIONAL EN DISCO """
+
+    def __init__(self,max_bytes=256*2**20,disk_dir=None):
+        '''
+        max_bytes: Memoria máxima de los resultados guardados [bytes]
+        disk_dir: Directorio del nivel en disco (None: solo memoria)
+        '''
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.entries = OrderedDict()        # clave -> (resultado, tamaño)
+        self.nbytes = 0
+        self.hits = {}
+        self.misses = {}
+        self.disk_hits = {}
+        if disk_dir is not None:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def _disk_path(self,key):
+        return os.path.join(self.disk_dir, key[:2], key + '.pkl')
+
+    def get_or_compute(self,stage,values,compute):
+        '''
+        stage: nombre de la etapa (para los contadores)
+        values: pares (nombre, valor) que definen el resultado
+        compute: función sin argumentos que calcula el resultado
+        '''
+        key = stage_key(stage, values)
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits[stage] = self.hits.get(stage, 0) + 1
+            return self.entries[key][0]
+
+        if self.disk_dir is not None and os.path.exists(self._disk_path(key)):
+            with open(self._disk_path(key), 'rb') as fh:
+                result = pickle.load(fh)
+            self.disk_hits[stage] = self.disk_hits.get(stage, 0) + 1
+        else:
+            result = compute()
+            self.misses[stage] = self.misses.get(stage, 0) + 1
+            if self.disk_dir is not None:
+                path = self._disk_path(key)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path + '.tmp', 'wb') as fh:
+                    pickle.dump(result, fh, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(path + '.tmp', path)
+
+        self._store(key, _freeze(result))
+        return result
+
+    def _store(self,key,result):
+        size = _nbytes(result)
+        if size > self.max_bytes:
+            return
+        self.entries[key] = (result, size)
+        self.nbytes += size
+        while self.nbytes > self.max_bytes:
+            _, (_, old) = self.entries.popitem(last=False)
+            self.nbytes -= old
+
+    def clear(self):
+        self.entries.clear()
+        self.nbytes = 0
+
+    def stats(self):
+        '''
+        CONTADORES POR ETAPA: {etapa: {'hits', 'disk_hits', 'misses'}} y uso de memoria
+        '''
+        stages = set(self.hits) | set(self.misses) | set(self.disk_hits)
+        out = {stage: {'hits': self.hits.get(stage, 0), 'disk_hits': self.disk_hits.get(stage, 0),
+                       'misses': self.misses.get(stage, 0)} for stage in sorted(stages)}
+        out['entries'] = len(self.entries)
+        out['nbytes'] = self.nbytes
+        return out
+
+    #### ETAPAS ####
+
+    def _object_values(self,stage,filtro,slurry):
+        filtro_keys, slurry_keys = STAGE_KEYS[stage]
+        return [(name, getattr(filtro, name)) for name in filtro_keys] + \
+               [(name, getattr(slurry, name)) for name in slurry_keys]
+
+    def volume(self,filtro,slurry,ts,tf,method='auto',tol=None):
+        ''' filtration.volume con caché '''
+        values = self._object_values('filtration', filtro, slurry) + \
+                 [('ts', ts), ('tf', tf), ('method', method), ('tol', tol)]
+        return self.get_or_compute('filtration', values, lambda: filtration.volume(filtro, slurry, ts, tf, method, tol))
+
+    def dewatering_process(self,filtro,slurry,thickness,dew_A,dew_t,zone,r,ts,tol=None,model='correlation'):
+        ''' dewatering.dewatering_process con caché (zone y r son informativos y no forman parte de la clave) '''
+        values = self._object_values('dewatering', filtro, slurry) + \
+                 [('thickness', thickness), ('dew_A', dew_A), ('dew_t', dew_t), ('ts', ts), ('tol', tol), ('model', model)]
+        return self.get_or_compute('dewatering%d' % zone, values,
+                                   lambda: dewatering.dewatering_process(filtro, slurry, thickness, dew_A, dew_t, zone, r,
+                                                                         ts, tol, model))
+
+    def water_wash(self,filtro,slurry,e,wsh_Q,thickness,Saturation):
+        ''' washing.water_wash con caché '''
+        values = self._object_values('washing', filtro, slurry) + \
+                 [('e', e), ('wsh_Q', wsh_Q), ('thickness', thickness), ('Saturation', Saturation)]
+        return self.get_or_compute('washing', values,
+                                   lambda: washing.water_wash(filtro, slurry, e, wsh_Q, thickness, Saturation))
+
+    def calc_Bx(self,Bx_0,Vf,SS_agua,V_agua,r_torta):
+        ''' bx_calc.calc_Bx con caché '''
+        values = [('Bx_0', Bx_0), ('Vf', Vf), ('SS_agua', SS_agua), ('V_agua', V_agua), ('r_torta', r_torta)]
+        return self.get_or_compute('Bx', values, lambda: bx_calc.calc_Bx(Bx_0, Vf, SS_agua, V_agua, r_torta))
+
+    def pol_calc(self,msr,filter_area,wwr):
+        ''' pol_calc.pol_calc con caché '''
+        values = [('msr', msr), ('filter_area', filter_area), ('wwr', wwr)]
+        return self.get_or_compute('pol', values, lambda: pol_calc(msr, filter_area, wwr))
+
+    def cycle_trajectory(self,filtro,slurry,wsh_Q,ts,n_cycles=1,tol=None):
+        ''' trajectory.cycle_trajectory con caché '''
+        values = self._object_values('filtration', filtro, slurry) + \
+                 self._object_values('dewatering', filtro, slurry) + \
+                 [(name, getattr(filtro, name)) for name in ('tf', 'dew_angle1', 'wsh_angle', 'dew_angle2')] + \
+                 [('wsh_Q', wsh_Q), ('ts', ts), ('n_cycles', n_cycles), ('tol', tol)]
+        return self.get_or_compute('trajectory', values,
+                                   lambda: trajectory.cycle_trajectory(filtro, slurry, wsh_Q, ts, n_cycles, tol))
+
+    def cycle(self,ts=0.1,tol=None,model='correlation',**params):
+        '''
+        CICLO COMPLETO POR ETAPAS CON CACHÉ (misma cadena que process_simulation.py)
+        tol: tolerancia de la malla adaptativa de la filtración y el secado (None: muestras cada ts)
+        model: modelo de secado ('correlation' o 'fv', ver dewatering.dewatering_state)
+        params: claves de cycle.DEFAULTS, escalares
+        Retorna un diccionario con los resultados finales del ciclo.
+        '''
+        filtro, lodos = cycle.build(**params)
+        p = dict(cycle.DEFAULTS)
+        p.update(params)
+        rd, L, w = filtro.rd, filtro.L, filtro.w
+
+        form = self.volume(filtro, lodos, ts, filtro.tf, tol=tol)
+        thickness = float(form.l[-1])
+        dew1 = self.dewatering_process(filtro, lodos, thickness, RVDF.drum_filter_area(rd, L, filtro.dew_angle1),
+                                       RVDF.angle_to_time(filtro.dew_angle1, w), 1, 0, ts, tol, model)
+        wash = self.water_wash(filtro, lodos, p['e'], p['wsh_Q'], thickness, dew1.S)
+        dew2 = self.dewatering_process(filtro, lodos, thickness, RVDF.drum_filter_area(rd, L, filtro.dew_angle2),
+                                       RVDF.angle_to_time(filtro.dew_angle2, w), 2, wash.r, ts, tol, model)
+        Bx = self.calc_Bx(p['Bx_0'], form.Vf, p['SS_agua'], wash.Vf_wsh, wash.r)
+        pol = self.pol_calc(form.W_cake, filtro.Af, p['wsh_Q'])
+
+        V_total = form.Vf + dew1.V_filtrate_dew + wash.Vf_wsh + dew2.V_filtrate_dew
+        return {'Vf': form.Vf, 'Vf_dew1': dew1.V_filtrate_dew, 'Vf_wsh': wash.Vf_wsh, 'Vf_dew2': dew2.V_filtrate_dew,
+                'thickness': thickness, 'W_cake': form.W_cake, 'S': dew2.S, 'M': dew2.M, 'irreduc_S': dew2.irreduc_sat,
+                'r': wash.r, 'retention': dew2.S*wash.r, 'V_total': V_total, 'rate': V_total/(60/w),
+                'Bx': Bx, 'pol': pol}
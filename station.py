@@ -0,0 +1,180 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from RVDF import RVDF
+import cycle
+import bx_calc
+from dynamic import MudTank
+
+""" ------ ESTACIÓN DE FILTRACIÓN: VARIOS TAMBORES CON TANQUE DE LODOS Y CABEZAL DE LAVADO COMUNES ------ """
+### Cada tambor tiene su geometría, velocidad, vacío y ángulos; todos toman lodos del mismo tanque (mismo nivel y
+### concentración) y agua del mismo cabezal de lavado. En cada paso de tiempo los ciclos de todos los tambores se
+### evalúan en una sola llamada a cycle.evaluate con arreglos de longitud N; los tambores con un modelo propio
+### (función picklable) se evalúan en paralelo en un ProcessPoolExecutor.
+
+STATION_FIELDS = ('step', 't', 'nivel', 'c', 'feed', 'wash_water', 'rate', 'Vf', 'solids', 'M', 'Bx', 'pol',
+                  'overflow')
+
+DRUM_OUTPUTS = ('Vf', 'V_total', 'rate', 'thickness', 'W_cake', 'M', 'Bx', 'pol', 'wsh_Q')
+
+
+class Station:
+
+    """ ESTACIÓN DE N FILTROS ROTATORIOS AL VACÍO """
+
+    def __init__(self,drums,capacity,wash_header=None,nivel=None,ts=None,**params):
+        '''
+        drums: lista con un diccionario por tambor (claves de cycle.DEFAULTS: rd, L, w, P_diff, ángulos, Rm...)
+               y opcionalmente 'model': función (p, ts) -> diccionario como cycle.evaluate, para tambores con un
+               modelo distinto (debe ser picklable para evaluarse en procesos)
+        capacity: Volumen del tanque de lodos común al nivel 1 [m3]
+        wash_header: Caudal total del cabezal de agua de lavado [m3/s], repartido según el área de lavado de cada
+                     tambor (None: wsh_Q de cada tambor)
+        nivel: Nivel inicial del tanque [] (por defecto cycle.DEFAULTS['nivel'])
+        ts: Tiempo de muestreo [s] de las etapas (None: tiempos exactos)
+        params: Parámetros comunes a todos los tambores (lodos y torta)
+        '''
+        if not drums:
+            raise ValueError("La estación necesita al menos un tambor")
+        drums = [dict(drum) for drum in drums]
+        self.models = [drum.pop('model', None) for drum in drums]
+        for drum in drums:
+            if 'nivel' in drum or 'c' in drum:
+                raise ValueError("nivel y c los fija el tanque común, no cada tambor")
+
+        merged = dict(params)
+        for name in set().union(*drums):
+            default = params.get(name, cycle.DEFAULTS.get(name))
+            values = [drum.get(name, default) for drum in drums]
+            if name == 'filtrate_dens':
+                # None en un arreglo sería nan: cada tambor sin densidad propia la toma de su Bx_0
+                values = [bx_calc.calc_dens(drum.get('Bx_0', params.get('Bx_0', cycle.DEFAULTS['Bx_0'])))
+                          if value is None else value for drum, value in zip(drums, values)]
+            merged[name] = np.array(values, dtype=bool if name == 'incompressible' else float)
+        if nivel is not None:
+            merged['nivel'] = nivel
+        self.params, shape = cycle.complete_params(merged)
+        self.n_drums = len(drums)
+        if shape != (self.n_drums,):
+            self.params = {name: (np.broadcast_to(v, (self.n_drums,)) if isinstance(v, np.ndarray) else v)
+                           for name, v in self.params.items()}
+
+        #### CABEZAL DE LAVADO: reparto proporcional al área de lavado ####
+        if wash_header is not None:
+            wsh_A = RVDF.drum_filter_area(self.params['rd'], self.params['L'], self.params['wsh_angle'])
+            self.params['wsh_Q'] = wash_header*wsh_A/np.sum(wsh_A)
+
+        self.capacity = capacity
+        self.ts = ts
+        p = self.params
+        self.tank = MudTank(capacity, float(p['nivel'][0]), float(p['c'][0]), float(p['solid_dens'][0]))
+
+    def drum_params(self,i,nivel=None,c=None):
+        '''
+        PARÁMETROS ESCALARES DEL TAMBOR i (con el nivel y la concentración del tanque)
+        '''
+        p = {name: (v[i].item() if isinstance(v, np.ndarray) else v) for name, v in self.params.items()}
+        p['nivel'] = min(self.tank.nivel, 1.0) if nivel is None else nivel
+        p['c'] = self.tank.c if c is None else c
+        return p
+
+    def filters(self):
+        '''
+        OBJETOS RVDF Y slurry_cake DE CADA TAMBOR EN EL ESTADO ACTUAL DEL TANQUE (para las funciones por etapa)
+        '''
+        return [cycle.build(**self.drum_params(i)) for i in range(self.n_drums)]
+
+    def evaluate(self,nivel=None,c=None,pool=None):
+        '''
+        CICLO DE TODOS LOS TAMBORES EN EL ESTADO DEL TANQUE
+        pool: Executor para los tambores con modelo propio (None: en este proceso)
+        Retorna un diccionario salida -> arreglo (N,) con las salidas de cycle.OUTPUTS.
+        '''
+        p = dict(self.params)
+        p['nivel'] = min(self.tank.nivel, 1.0) if nivel is None else nivel
+        p['c'] = self.tank.c if c is None else c
+
+        custom = [i for i, model in enumerate(self.models) if model is not None]
+        if pool is not None:
+            futures = {i: pool.submit(self.models[i], self.drum_params(i, p['nivel'], p['c']), self.ts) for i in custom}
+
+        with np.errstate(all='ignore'):
+            res = cycle.evaluate(p, self.ts)
+        n = self.n_drums
+        res = {name: (res[name] if np.shape(res[name]) == (n,) else np.full(n, res[name], dtype=float))
+               for name in cycle.OUTPUTS}
+        if custom:
+            res = {name: np.array(v, dtype=float) for name, v in res.items()}
+
+        for i in custom:
+            out = futures[i].result() if pool is not None else self.models[i](self.drum_params(i, p['nivel'], p['c']), self.ts)
+            for name in cycle.OUTPUTS:
+                res[name][i] = out[name]
+        return res
+
+    def simulate(self,feed,duration,dt=60.0,c_feed=None,workers=None):
+        '''
+        GENERADOR DE REGISTROS DE LA ESTACIÓN
+        feed: Caudal de líquido alimentado al tanque [m3/s]; escalar, serie por paso o función feed(t)
+        duration: Tiempo simulado [s]
+        dt: Paso de tiempo [s]; en cada paso cada tambor procesa dt/cycle_time revoluciones en estado cuasi estacionario
+        c_feed: Sólidos en la alimentación [kg/m3] (por defecto la concentración inicial del tanque)
+        workers: Procesos para los tambores con modelo propio (None: en este proceso)
+        Genera un diccionario por paso con las claves de STATION_FIELDS y 'drums': salida -> arreglo (N,) de
+        DRUM_OUTPUTS. El Brix se pondera por el filtrado de cada tambor y la pol y la humedad por sus sólidos.
+
+        Ejemplo (turno de 8 h con 6 tambores):
+            st = Station([{'w': 1.2}, {'w': 1.0}, {'w': 1.4, 'P_diff': 30000}]*2, capacity=20)
+            records = list(st.simulate(feed=1.5e-3, duration=8*3600))
+        '''
+        if c_feed is None:
+            c_feed = self.tank.c
+        if callable(feed):
+            feed_at = feed
+        elif np.ndim(feed) == 0:
+            feed_at = lambda t: feed
+        else:
+            series = np.asarray(feed, dtype=float)
+            feed_at = lambda t: series[min(int(t//dt), series.size-1)]
+
+        pool = ProcessPoolExecutor(max_workers=workers) if workers and any(self.models) else None
+        try:
+            for n in range(int(np.ceil(duration/dt))):
+                t = n*dt
+                Q_feed = float(feed_at(t))
+                nivel, c = min(self.tank.nivel, 1.0), self.tank.c
+                res = self.evaluate(nivel, c, pool)
+
+                formed = np.isfinite(res['Vf']) & (res['Vf'] > 0)     # tambores sumergidos que forman torta
+                revs = np.where(formed, dt/res['cycle_time'], 0.0)     # revoluciones en el paso
+                Vf = np.where(formed, res['Vf'], 0.0)*revs
+                solids = c*Vf                                           # sólidos extraídos en la torta [kg]
+                retained = np.where(formed, self.params['epsilon']*res['Af']*res['thickness'], 0.0)*revs
+                V_total = np.where(formed, res['V_total'], 0.0)*revs
+                wash_water = np.where(formed, self.params['wsh_Q'], 0.0)
+
+                filtrate = np.where(formed, res['Vf'] + res['Vf_wsh'], 0.0)*revs    # filtrado con Brix [m3]
+                W = np.where(formed, res['W_cake'], 0.0)
+                record = {'step': n, 't': t, 'nivel': nivel, 'c': c, 'feed': Q_feed,
+                          'wash_water': float(np.sum(wash_water)), 'rate': float(np.sum(V_total))/dt,
+                          'Vf': float(np.sum(Vf)), 'solids': float(np.sum(solids)),
+                          'M': _weighted(res['M'], W), 'Bx': _weighted(res['Bx'], filtrate),
+                          'pol': _weighted(res['pol'], W)}
+                record['overflow'] = self.tank.step(Q_feed*dt, c_feed, float(np.sum(Vf + retained)),
+                                                    record['solids'])
+                record['drums'] = {name: (self.params['wsh_Q'] if name == 'wsh_Q' else res[name]) for name in DRUM_OUTPUTS}
+
+                yield record
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+
+def _weighted(values,weights):
+    '''
+    PROMEDIO PONDERADO DE LOS TAMBORES QUE FORMAN TORTA (nan si ninguno)
+    '''
+    mask = (weights > 0) & np.isfinite(values)
+    total = np.sum(weights[mask])
+    return float(np.sum(values[mask]*weights[mask])/total) if total > 0 else np.nan
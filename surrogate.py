@@ -0,0 +1,286 @@
+import functools
+import json
+import os
+
+import numpy as np
+
+import cycle
+
+""" ------ TABLAS SUSTITUTAS PRECALCULADAS DEL CICLO COMPLETO ------ """
+### Evalúa cycle.run_cycles (u otro evaluador vectorizado) en una malla regular sobre la envolvente de operación y la guarda como .npy con
+### memoria mapeada (más un .json con los ejes y los parámetros fijos). Varios procesos que abren la misma tabla
+### comparten sus páginas a través de la caché del sistema operativo. Las consultas interpolan de forma
+### multilineal (2^d esquinas) o con splines cúbicos (scipy.ndimage.map_coordinates sobre coeficientes
+### guardados al construir la tabla).
+###
+### Una consulta multilineal cuesta ~5 us por punto (lee 2^d filas de la tabla): más que la cadena vectorizada con
+### la correlación de secado (~1 us por punto), de modo que la tabla solo acelera modelos costosos, como el secado
+### por volúmenes finitos (model='fv', ~10 ms por punto).
+
+####### EJES DE LA MALLA: nombre -> (mínimo, máximo, puntos, escala) #########
+AXES = {
+    'P_diff': (10000, 60000, 11, 'lin'),        # Caída de presión [Pa]
+    'w': (0.6, 2.0, 9, 'lin'),                  # Velocidad de rotación [rpm]
+    'nivel': (0.5, 1.0, 9, 'lin'),              # Nivel del tanque de lodos []
+    'wsh_Q': (0.0005, 0.003, 9, 'log'),         # Tasa de lavado con agua [m3/s]
+    'k': (5e-14, 5e-13, 9, 'log'),              # Permeabilidad [m2]
+    'epsilon': (0.4, 0.6, 9, 'lin'),            # Porosidad []
+}
+
+OUTPUTS = ('M', 'pol', 'S', 'Bx', 'rate', 'V_total', 'thickness', 'W_cake', 'retention')
+
+ERR_MARGIN = 2.0        # factor sobre |segunda diferencia|/8 en la estimación del error multilineal
+
+
+def _to_grid(x,axis):
+    '''
+    VALOR FÍSICO -> COORDENADA CONTINUA DE LA MALLA (0 ... puntos-1)
+    '''
+    low, high, n, scale = axis
+    if scale == 'log':
+        x, low, high = np.log(x), np.log(low), np.log(high)
+    return (np.asarray(x, dtype=float) - low)/(high - low)*(n - 1)
+
+
+def _from_grid(i,axis):
+    low, high, n, scale = axis
+    if scale == 'log':
+        return np.exp(np.log(low) + (np.log(high) - np.log(low))*i/(n - 1))
+    return low + (high - low)*i/(n - 1)
+
+
+def _error_estimate(values):
+    '''
+    ESTIMACIÓN HEURÍSTICA DEL ERROR MULTILINEAL EN CADA NODO: ERR_MARGIN veces la suma sobre los ejes de
+    |segunda diferencia|/8 (error de la interpolación lineal de una parábola en el centro de la celda). No es una
+    cota: los quiebres del modelo entre nodos (ramas de la correlación) no se ven en las segundas diferencias.
+    '''
+    values = np.asarray(values)
+    bound = np.zeros(values.shape)
+    for axis in range(values.ndim):
+        if values.shape[axis] < 3:
+            continue
+        d2 = ERR_MARGIN*np.abs(np.diff(values, n=2, axis=axis))/8
+        pad = [(0, 0)]*values.ndim
+        pad[axis] = (1, 1)
+        bound += np.pad(d2, pad, mode='edge')
+    return bound
+
+
+def build(path,axes=None,outputs=OUTPUTS,fixed=None,ts=None,spline=False,chunk=2**16,validate=2000,seed=0,
+          model='correlation',evaluator=None):
+    '''
+    CONSTRUYE LA TABLA Y LA GUARDA EN path + '.npy' / '.err.npy' / '.json' (y '.spline.npy' con spline=True)
+    axes: ejes de la malla (por defecto AXES)
+    outputs: salidas de cycle.OUTPUTS guardadas
+    fixed: parámetros fijos del ciclo (claves de cycle.DEFAULTS que no son ejes)
+    ts: tiempo de muestreo [s] de las etapas (None: tiempos exactos)
+    spline: guarda también los coeficientes de spline cúbico (scipy); cada consulta cúbica combina 4^d
+            coeficientes por punto, de modo que en 6 ejes es del orden de mil veces más lenta que la multilineal
+    chunk: puntos evaluados por llamada a cycle.run_cycles (acota la memoria)
+    validate: puntos aleatorios para estimar el error frente al modelo físico (0: no se valida)
+    model: modelo de secado de cycle.run_cycles, 'correlation' o 'fv'. Con 'fv' cada punto cuesta ~10 ms: la
+           malla por defecto (650 000 puntos) tarda horas, conviene reducir los ejes
+    evaluator: función (ts=..., **params) -> diccionario de arreglos en lugar de cycle.run_cycles (model se ignora)
+    Retorna la tabla abierta (Surrogate).
+    '''
+    axes = dict(AXES if axes is None else axes)
+    fixed = dict(fixed or {})
+    unknown = (set(axes) | set(fixed)) - set(cycle.DEFAULTS)
+    if unknown or set(axes) & set(fixed) or (evaluator is None and set(outputs) - set(cycle.OUTPUTS)):
+        raise ValueError("Ejes, parámetros fijos o salidas no válidos")
+    if evaluator is None:
+        if model not in ('correlation', 'fv'):
+            raise ValueError("model debe ser 'correlation' o 'fv'")
+        evaluator_name, evaluator = 'cycle.run_cycles', functools.partial(cycle.run_cycles, model=model)
+    else:
+        evaluator_name, model = evaluator.__module__ + '.' + evaluator.__qualname__, None
+
+    shape = tuple(axis[2] for axis in axes.values())
+    n_out = len(outputs)
+    table = np.lib.format.open_memmap(path + '.npy', mode='w+', dtype='f8', shape=shape + (n_out,))
+    flat = table.reshape(-1, n_out)
+    for start in range(0, flat.shape[0], chunk):
+        index = np.unravel_index(np.arange(start, min(start+chunk, flat.shape[0])), shape)
+        params = {name: _from_grid(i, axis) for (name, axis), i in zip(axes.items(), index)}
+        with np.errstate(all='ignore'):
+            res = evaluator(ts=ts, **fixed, **params)
+        for j, name in enumerate(outputs):
+            flat[start:start+len(index[0]), j] = res[name]
+    table.flush()
+
+    # estimación local del error multilineal, en un archivo aparte para no ensanchar las filas de las consultas normales
+    bound = np.lib.format.open_memmap(path + '.err.npy', mode='w+', dtype='f8', shape=shape + (n_out,))
+    for j in range(n_out):
+        bound[..., j] = _error_estimate(table[..., j])
+    bound.flush()
+    del table, flat, bound
+
+    if spline:
+        from scipy.ndimage import spline_filter     # importación diferida: solo para la interpolación cúbica
+        values = np.load(path + '.npy', mmap_mode='r')
+        coeffs = np.lib.format.open_memmap(path + '.spline.npy', mode='w+', dtype='f8',
+                                           shape=(len(outputs),) + shape)
+        for j in range(n_out):
+            coeffs[j] = spline_filter(np.ascontiguousarray(values[..., j]), order=3, mode='mirror')
+        coeffs.flush()
+        del coeffs, values
+
+    meta = {'axes': {name: list(axis) for name, axis in axes.items()}, 'outputs': list(outputs),
+            'fixed': fixed, 'ts': ts, 'spline': spline, 'evaluator': evaluator_name, 'model': model}
+    with open(path + '.json', 'w') as fh:
+        json.dump(meta, fh, indent=1)
+
+    surrogate = Surrogate(path)
+    if validate:
+        meta['error'] = {method: surrogate.error(validate, method, seed, evaluator)
+                         for method in (('linear', 'cubic') if spline else ('linear',))}
+        with open(path + '.json', 'w') as fh:
+            json.dump(meta, fh, indent=1)
+        surrogate.meta = meta
+    return surrogate
+
+
+class Surrogate:
+
+    """ TABLA PRECALCULADA ABIERTA CON MEMORIA MAPEADA """
+
+    def __init__(self,path):
+        '''
+        path: ruta base de la tabla (sin extensión)
+        '''
+        with open(path + '.json') as fh:
+            self.meta = json.load(fh)
+        self.path = path
+        self.axes = {name: tuple(axis) for name, axis in self.meta['axes'].items()}
+        self.outputs = tuple(self.meta['outputs'])
+        self.values = np.load(path + '.npy', mmap_mode='r')        # (malla..., salidas)
+        self.bounds = np.load(path + '.err.npy', mmap_mode='r')     # estimación del error multilineal en cada nodo
+        self.coeffs = np.load(path + '.spline.npy', mmap_mode='r') if self.meta['spline'] else None
+
+    def _coordinates(self,params,bounds):
+        missing = set(self.axes) - set(params)
+        unknown = set(params) - set(self.axes)
+        if missing or unknown:
+            raise TypeError("La consulta debe dar exactamente los ejes: " + ", ".join(self.axes))
+        coords = np.array(np.broadcast_arrays(*[_to_grid(params[name], axis) for name, axis in self.axes.items()]))
+        upper = np.array([axis[2] - 1 for axis in self.axes.values()], dtype=float).reshape((-1,) + (1,)*(coords.ndim-1))
+        outside = np.any((coords < 0) | (coords > upper), axis=0)
+        coords = np.clip(coords, 0, upper)
+        if bounds == 'clip':
+            outside = np.zeros(outside.shape, dtype=bool)
+        elif bounds != 'nan':
+            raise ValueError("bounds debe ser 'nan' o 'clip'")
+        return coords, outside
+
+    def linear(self,coords,chunk=4096,table=None):
+        '''
+        INTERPOLACIÓN MULTILINEAL: coords (ejes, puntos...) -> (puntos..., salidas)
+        table: arreglo (malla..., columnas) interpolado (por defecto self.values)
+        Cada esquina es una fila contigua de la tabla aplanada; los pesos de las 2^d esquinas se forman como
+        producto tensorial eje por eje y los puntos se procesan por bloques.
+        '''
+        table = self.values if table is None else table
+        d = coords.shape[0]
+        shape = np.array(table.shape[:-1])
+        n_col = table.shape[-1]
+        table = np.asarray(table).reshape(-1, n_col)                        # vista sin copia del archivo mapeado
+        strides = np.cumprod(np.r_[1, shape[:0:-1]])[::-1]                  # paso de cada eje en la tabla aplanada
+        bits = (np.arange(2**d)[:, None] >> np.arange(d)) & 1               # esquina -> bit de cada eje
+        offsets = bits @ strides
+
+        flat = coords.reshape(d, -1)
+        out = np.empty((flat.shape[1], n_col))
+        for start in range(0, flat.shape[1], chunk):
+            c = flat[:, start:start+chunk]
+            base = np.minimum(np.floor(c), shape[:, None] - 2).astype(np.intp)
+            frac = c - base
+            weight = np.ones((1, c.shape[1]))
+            for i in range(d):
+                weight = np.concatenate((weight*(1 - frac[i]), weight*frac[i]))    # bit i de la esquina
+            corners = np.take(table, (strides @ base)[:, None] + offsets, axis=0)   # (puntos, esquinas, salidas)
+            out[start:start+chunk] = np.einsum('mc,mco->mo', weight.T, corners, optimize=True)
+        return out.reshape(coords.shape[1:] + (n_col,))
+
+    def cubic(self,coords):
+        '''
+        INTERPOLACIÓN CON SPLINE CÚBICO SOBRE LOS COEFICIENTES GUARDADOS
+        '''
+        if self.coeffs is None:
+            raise ValueError("La tabla se construyó sin spline=True")
+        from scipy.ndimage import map_coordinates
+
+        flat = coords.reshape(coords.shape[0], -1)
+        out = np.stack([map_coordinates(self.coeffs[j], flat, order=3, mode='mirror', prefilter=False)
+                        for j in range(len(self.outputs))], axis=-1)
+        return out.reshape(coords.shape[1:] + (len(self.outputs),))
+
+    def __call__(self,method='linear',bounds='nan',estimate=False,**params):
+        '''
+        CONSULTA DE LA TABLA
+        method: 'linear' (multilineal) o 'cubic' (spline)
+        bounds: 'nan' (fuera de la envolvente -> nan) o 'clip' (se usa el borde de la malla)
+        estimate: agrega '<salida>_err', estimación heurística del error de la interpolación multilineal a partir
+                  de las segundas diferencias de la malla (interpolada de .err.npy; duplica el costo de la consulta).
+                  No es una cota: la fracción de puntos cubiertos la da error() ('coverage')
+        params: valores de todos los ejes, escalares o arreglos compatibles
+        Retorna un diccionario salida -> arreglo con la forma de broadcasting de params.
+        '''
+        if method not in ('linear', 'cubic'):
+            raise ValueError("method debe ser 'linear' o 'cubic'")
+        coords, outside = self._coordinates(params, bounds)
+        out = self.linear(coords) if method == 'linear' else self.cubic(coords)
+        out[outside] = np.nan
+
+        res = {name: out[..., j] for j, name in enumerate(self.outputs)}
+        if estimate:
+            err = self.linear(coords, table=self.bounds)
+            err[outside] = np.nan
+            res.update({name + '_err': err[..., j] for j, name in enumerate(self.outputs)})
+        return res
+
+    def error(self,n=2000,method='linear',seed=0,evaluator=None):
+        '''
+        ERROR FRENTE AL MODELO FÍSICO EN n PUNTOS ALEATORIOS DE LA ENVOLVENTE
+        evaluator: evaluador de la tabla (por defecto cycle.run_cycles con el modelo de secado de la tabla;
+                   obligatorio si la tabla se construyó con otro evaluador)
+        Retorna salida -> {'max_abs', 'rms', 'max_rel', 'p99_rel', 'coverage'} (puntos con resultado físico finito;
+        los errores relativos se refieren al máximo de |salida| en la muestra, no a cada punto, para salidas que
+        pasan por 0; coverage es la fracción de puntos con error <= estimación de estimate=True).
+        '''
+        if evaluator is None:
+            if self.meta.get('model') is None:
+                raise ValueError("La tabla se construyó con el evaluador " + self.meta['evaluator'] + ": páselo")
+            evaluator = functools.partial(cycle.run_cycles, model=self.meta['model'])
+        rng = np.random.default_rng(seed)
+        params = {name: _from_grid(rng.uniform(0, axis[2] - 1, n), axis) for name, axis in self.axes.items()}
+        with np.errstate(all='ignore'):
+            exact = evaluator(ts=self.meta['ts'], **self.meta['fixed'], **params)
+            approx = self(method, estimate=True, **params)
+
+        stats = {}
+        for name in self.outputs:
+            ok = np.isfinite(exact[name]) & np.isfinite(approx[name])
+            err = np.abs(approx[name][ok] - exact[name][ok])
+            rel = err/max(np.max(np.abs(exact[name][ok])), 1e-300) if err.size else err     # relativo al rango
+            stats[name] = {'max_abs': float(err.max()) if err.size else np.nan,
+                           'rms': float(np.sqrt(np.mean(err**2))) if err.size else np.nan,
+                           'max_rel': float(rel.max()) if rel.size else np.nan,
+                           'p99_rel': float(np.percentile(rel, 99)) if rel.size else np.nan,
+                           'coverage': float(np.mean(err <= approx[name + '_err'][ok])) if err.size else np.nan}
+        return stats
+
+    def nbytes(self):
+        '''
+        TAMAÑO DE LA TABLA EN DISCO [bytes] (compartido entre procesos por la caché de páginas)
+        '''
+        return self.values.nbytes + self.bounds.nbytes + (self.coeffs.nbytes if self.coeffs is not None else 0)
+
+
+def open_table(path):
+    '''
+    ABRE UNA TABLA EXISTENTE (comparte páginas con otros procesos que abran el mismo archivo)
+    '''
+    if not os.path.exists(path + '.json'):
+        raise FileNotFoundError(path + '.json')
+    return Surrogate(path)
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from RVDF import RVDF
+import filtration
+import dewatering
+import washing
+import bx_calc
+from pol_calc import pol_calc
+
+""" ------ UTILIDADES COMUNES DE LAS PRUEBAS ------ """
+
+
+def scalar_cycle(filtro,lodos,ts,wsh_Q=0.0015,e=0.8,Bx_0=15,method='odeint'):
+    '''
+    CADENA ESCALAR DE process_simulation.py (con odeint, el integrador original, por defecto)
+    Retorna un diccionario con los nombres de cycle.OUTPUTS.
+    '''
+    rd, L, w = filtro.rd, filtro.L, filtro.w
+    form = filtration.volume(filtro, lodos, ts, filtro.tf, method)
+    thickness = float(form.l[-1])
+    dew1 = dewatering.dewatering_process(filtro, lodos, thickness, RVDF.drum_filter_area(rd, L, filtro.dew_angle1),
+                                         RVDF.angle_to_time(filtro.dew_angle1, w), 1, 0, ts)
+    wash = washing.water_wash(filtro, lodos, e, wsh_Q, thickness, dew1.S)
+    dew2 = dewatering.dewatering_process(filtro, lodos, thickness, RVDF.drum_filter_area(rd, L, filtro.dew_angle2),
+                                         RVDF.angle_to_time(filtro.dew_angle2, w), 2, wash.r, ts)
+    V_total = form.Vf + dew1.V_filtrate_dew + wash.Vf_wsh + dew2.V_filtrate_dew
+    return {
+        'Vf': form.Vf, 'thickness': thickness, 'W_cake': form.W_cake,
+        'S_dew1': dew1.S, 'Vf_dew1': dew1.V_filtrate_dew, 'Vf_wsh': wash.Vf_wsh, 'r': wash.r,
+        'S': dew2.S, 'M': dew2.M, 'Vf_dew2': dew2.V_filtrate_dew, 'V_total': V_total, 'rate': V_total/(60/w),
+        'Bx': bx_calc.calc_Bx(Bx_0, form.Vf, 0, wash.Vf_wsh, wash.r),
+        'pol': pol_calc(form.W_cake, filtro.Af, wsh_Q),
+    }
+
+
+@pytest.fixture
+def scalar_chain():
+    return scalar_cycle
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(0)
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+import adaptive
+import cycle
+import filtration
+
+""" ------ PRUEBAS: MALLAS ADAPTATIVAS (adaptive.py y filtration.volume con tol) ------ """
+
+
+@pytest.mark.parametrize('tol', [1e-2, 1e-3, 1e-4])
+def test_refine_meets_interpolation_tolerance(tol):
+    fun = lambda t: np.sqrt(t) + 0.1*np.sin(3*t)
+    t, y = adaptive.refine(fun, 0, 10, tol)
+    assert t[0] == 0 and t[-1] == 10 and np.all(np.diff(t) > 0)
+    dense = np.linspace(0, 10, 200001)
+    err = np.max(np.abs(np.interp(dense, t, y[0]) - fun(dense)))
+    # el estimador del punto medio puede subestimar el error en un factor ~2 cerca de la raíz
+    assert err < 2*tol*np.max(np.abs(y))
+    assert t.size < 0.5*dense.size
+
+
+def test_refine_controls_integral():
+    fun = lambda t: 1/np.sqrt(t + 1e-3)
+    exact = 2*(np.sqrt(10 + 1e-3) - np.sqrt(1e-3))
+    t, y = adaptive.refine(fun, 0, 10, 1e-4, integral=(0,))
+    assert abs(filtration.auc(t, y[0]) - exact) < 1e-4*exact
+
+
+def test_fewer_points_for_smoother_tolerance():
+    fun = lambda t: np.exp(-t)
+    sizes = [adaptive.refine(fun, 0, 5, tol)[0].size for tol in (1e-2, 1e-3, 1e-4)]
+    assert sizes[0] < sizes[1] < sizes[2]
+
+
+def test_max_points():
+    t, _ = adaptive.refine(lambda t: np.sqrt(t), 0, 1, 1e-12, max_points=500)
+    assert t.size < 1000
+
+
+def test_filtration_volume_with_tol():
+    filtro, lodos = cycle.build()
+    exact = filtration.ruth_volume(filtro.tf, filtro.P_diff, filtro.Af, lodos.u, lodos.alpha, lodos.c, filtro.Rm)
+    for tol in (1e-3, 1e-5):
+        res = filtration.volume(filtro, lodos, None, filtro.tf, tol=tol)
+        assert res.t[-1] == pytest.approx(filtro.tf)
+        assert res.Vf == pytest.approx(float(exact), rel=1e-12)
+        # el volumen integrado de q por trapecios cumple la tolerancia
+        assert filtration.auc(res.t, res.q) == pytest.approx(float(exact) - 1e-4, rel=tol)
+    assert len(filtration.volume_series(filtro, lodos, filtro.tf, 1e-2)) < 50      # decenas de puntos por zona
+
+
+def test_series_interpolation_and_exact():
+    filtro, lodos = cycle.build()
+    series = filtration.volume_series(filtro, lodos, filtro.tf, 1e-4)
+    t = np.linspace(0, filtro.tf, 1001)
+    exact = series.exact(t)
+    np.testing.assert_allclose(series(t)['v'], exact['v'], atol=2e-4*np.max(series['v']))
+    with pytest.raises(ValueError):
+        adaptive.AdaptiveSeries(series.t, {'v': series['v']}).exact(t)
@@ -0,0 +1,139 @@
+import csv
+import json
+
+import numpy as np
+import pytest
+
+import batch_runner
+import cycle
+from results_store import ResultsStore
+
+""" ------ PRUEBAS: CORRIDA POR LOTES DE ESCENARIOS (batch_runner.py) ------ """
+
+
+def grid_scenarios():
+    # 3 x 4 x 2 escenarios que comparten etapas aguas arriba (P_diff, w) y difieren en el lavado
+    return [{'id': 's{}'.format(i), 'P_diff': P, 'w': w, 'wsh_Q': Q}
+            for i, (P, w, Q) in enumerate((P, w, Q) for P in (20000, 30000, 45000) for w in (0.8, 1.0, 1.2, 1.5)
+                                          for Q in (0.001, 0.002))]
+
+
+def expected(scenarios, name):
+    return np.array([float(cycle.run_cycles(**{k: v for k, v in s.items() if k != 'id'})[name]) for s in scenarios])
+
+
+def test_results_match_run_cycles_in_file_order(tmp_path):
+    scenarios = grid_scenarios()
+    summary = batch_runner.run(scenarios, str(tmp_path / 'out'), chunk_size=5, workers=1)
+    assert summary['unique'] == summary['computed'] == 24 and summary['skipped'] == 0
+
+    shuffled = [scenarios[i] for i in np.random.default_rng(3).permutation(24)]
+    labels, res = batch_runner.collect(shuffled, str(tmp_path / 'out'), columns=('pol', 'M', 'P_diff'))
+    assert labels == [s['id'] for s in shuffled]
+    np.testing.assert_allclose(res['P_diff'], [s['P_diff'] for s in shuffled])
+    for name in ('pol', 'M'):
+        np.testing.assert_allclose(res[name], expected(shuffled, name), rtol=1e-12)
+
+
+def test_duplicates_are_evaluated_once(tmp_path):
+    scenarios = [{'P_diff': 30000}, {'P_diff': '30000', 'w': cycle.DEFAULTS['w']}, {'P_diff': 30000.0, 'id': 'x'},
+                 {'P_diff': 40000}, {'P_diff': 40000, 'Rm': -0.0}]
+    X, labels = batch_runner.normalize(scenarios)
+    keys = batch_runner.scenario_keys(X)
+    assert len(set(keys)) == 2 and labels[2] == 'x'
+
+    summary = batch_runner.run(scenarios, str(tmp_path / 'out'), workers=1)
+    assert summary['scenarios'] == 5 and summary['unique'] == summary['computed'] == 2
+    assert len(ResultsStore(str(tmp_path / 'out'), background=False)) == 2
+    _, res = batch_runner.collect(scenarios, str(tmp_path / 'out'), columns=('pol',))
+    assert res['pol'][0] == res['pol'][1] == res['pol'][2] != res['pol'][3] == res['pol'][4]
+
+
+def test_resume_skips_finished_keys(tmp_path):
+    scenarios = grid_scenarios()
+    out = str(tmp_path / 'out')
+    first = batch_runner.run(scenarios[:10], out, chunk_size=4, workers=1)
+    assert first['computed'] == 10
+
+    second = batch_runner.run(scenarios, out, chunk_size=4, workers=1)
+    assert second['skipped'] == 10 and second['computed'] == 14
+    store = ResultsStore(out, background=False)
+    assert len(store) == 24 and len(set(store.column('key'))) == 24
+
+    third = batch_runner.run(scenarios, out, workers=1)
+    assert third['skipped'] == 24 and third['computed'] == 0
+
+
+def test_interrupted_run_resumes(tmp_path):
+    out = str(tmp_path / 'out')
+
+    def interrupt(done, total, seconds):
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        batch_runner.run(grid_scenarios(), out, chunk_size=6, workers=1, progress=interrupt)
+    assert len(ResultsStore(out, background=False)) == 6          # el bloque terminado quedó guardado
+
+    summary = batch_runner.run(grid_scenarios(), out, chunk_size=6, workers=1)
+    assert summary['skipped'] == 6 and summary['computed'] == 18
+    _, res = batch_runner.collect(grid_scenarios(), out, columns=('M',))
+    np.testing.assert_allclose(res['M'], expected(grid_scenarios(), 'M'), rtol=1e-12)
+
+
+def test_missing_scenarios_are_nan_and_config_must_match(tmp_path):
+    out = str(tmp_path / 'out')
+    batch_runner.run(grid_scenarios()[:3], out, workers=1)
+    _, res = batch_runner.collect(grid_scenarios()[:5], out, columns=('pol',))
+    assert np.all(np.isfinite(res['pol'][:3])) and np.all(np.isnan(res['pol'][3:]))
+    with pytest.raises(ValueError):
+        batch_runner.run(grid_scenarios(), out, ts=0.1, workers=1)
+
+
+def test_process_pool_matches_serial(tmp_path):
+    scenarios = grid_scenarios()
+    batch_runner.run(scenarios, str(tmp_path / 'serial'), chunk_size=5, workers=1)
+    summary = batch_runner.run(scenarios, str(tmp_path / 'pool'), chunk_size=5, workers=2)
+    assert summary['computed'] == 24 and summary['failed'] == 0
+    serial = batch_runner.collect(scenarios, str(tmp_path / 'serial'))[1]
+    pool = batch_runner.collect(scenarios, str(tmp_path / 'pool'))[1]
+    for name in serial:
+        np.testing.assert_array_equal(serial[name], pool[name], err_msg=name)
+
+
+def test_load_formats(tmp_path):
+    scenarios = [{'id': 'a', 'P_diff': 30000.0}, {'id': 'b', 'P_diff': 30000.0, 'w': 1.5}]
+    (tmp_path / 's.jsonl').write_text('\n'.join(json.dumps(s) for s in scenarios) + '\n')
+    (tmp_path / 's.json').write_text(json.dumps({'defaults': {'P_diff': 30000.0},
+                                                 'scenarios': [{'id': 'a'}, {'id': 'b', 'w': 1.5}]}))
+    with open(tmp_path / 's.csv', 'w', newline='') as fh:
+        writer = csv.writer(fh)
+        writer.writerow(['id', 'P_diff', 'w'])
+        writer.writerows([['a', '30000', ''], ['b', '30000', '1.5']])
+    loaded = [batch_runner.normalize(batch_runner.load_scenarios(str(tmp_path / name)))
+              for name in ('s.jsonl', 's.json', 's.csv')]
+    for X, labels in loaded:
+        np.testing.assert_array_equal(X, loaded[0][0])
+        assert labels == ['a', 'b']
+    with pytest.raises(ValueError):
+        batch_runner.load_scenarios(str(tmp_path / 's.txt'))
+
+
+def test_invalid_scenarios():
+    with pytest.raises(ValueError):
+        batch_runner.normalize([{'vacuum': 30000}])
+    with pytest.raises(ValueError):
+        batch_runner.normalize([{'incompressible': 'maybe'}])
+    with pytest.raises(ValueError):
+        batch_runner.run([{}], 'unused', outputs=('vacuum',))
+
+
+def test_main_writes_csv_in_file_order(tmp_path):
+    path = tmp_path / 's.jsonl'
+    path.write_text('\n'.join(json.dumps(s) for s in grid_scenarios()[::-1]) + '\n')
+    assert batch_runner.main([str(path), '--out', str(tmp_path / 'out'), '--workers', '1',
+                              '--csv', str(tmp_path / 'r.csv')]) == 0
+    with open(tmp_path / 'r.csv', newline='') as fh:
+        rows = list(csv.DictReader(fh))
+    assert [row['scenario'] for row in rows] == [s['id'] for s in grid_scenarios()[::-1]]
+    np.testing.assert_allclose([float(row['pol']) for row in rows], expected(grid_scenarios()[::-1], 'pol'),
+                               rtol=1e-12)
@@ -0,0 +1,62 @@
+import importlib.util
+import json
+import os
+
+import pytest
+
+""" ------ PRUEBAS: SUITE DE BENCHMARKS (benchmarks/run.py) ------ """
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope='module')
+def bench():
+    spec = importlib.util.spec_from_file_location('bench_run', os.path.join(ROOT, 'benchmarks', 'run.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def entry(name, time, **params):
+    return {'name': name, 'params': params, 'time': time, 'peak_bytes': 0}
+
+
+def test_every_case_runs(bench, tmp_path):
+    for name, fun in bench.stage_cases(0.1).items():
+        fun()
+    bench.batch_case(10)()
+    for fun in list(bench.instrument_cases().values()) + list(bench.surrogate_cases(5, str(tmp_path / 'fv')).values()):
+        fun()
+    assert bench.soft_sensor_latency(50) > 0
+
+
+def test_missed_targets(bench):
+    results = [dict(entry('slow', 2e-3, n=10), target=1e-3), dict(entry('fast', 5e-4, n=10), target=1e-3),
+               entry('free', 1.0, n=10)]
+    assert bench.missed_targets(results) == [(bench.case_id(results[0]), 1e-3, 2e-3)]
+
+
+def test_compare_flags_only_real_regressions(bench):
+    baseline = {'results': [entry('a', 1e-3, ts=0.1), entry('b', 1e-6, ts=0.1), entry('c', 1e-3, n=10)]}
+    results = [entry('a', 1.5e-3, ts=0.1),         # 50% más lento: regresión
+               entry('b', 3e-6, ts=0.1),           # triplica, pero por debajo de min_delta
+               entry('c', 1.1e-3, n=10),           # dentro de la tolerancia
+               entry('d', 1.0, n=1)]               # sin referencia
+    regressions = bench.compare(results, baseline, tolerance=0.25, min_delta=1e-5)
+    assert [name for name, _, _ in regressions] == [bench.case_id(results[0])]
+
+
+def test_main_exit_code_with_baseline(bench, tmp_path, monkeypatch):
+    fake = [entry('full_cycle', 2e-3, ts=0.1)]
+    monkeypatch.setattr(bench, 'run_suite', lambda *args, **kwargs: fake)
+    base = str(tmp_path / 'base.json')
+    with open(base, 'w') as fh:
+        json.dump({'results': [entry('full_cycle', 1e-3, ts=0.1)]}, fh)
+    out = str(tmp_path / 'out.json')
+    assert bench.main(['--quick', '--output', out, '--baseline', base, '--workers', '1']) == 1
+    with open(out) as fh:
+        assert json.load(fh)['results'] == fake
+    assert bench.main(['--quick', '--output', out, '--baseline', out, '--workers', '1']) == 0
+
+    fake.append(dict(entry('soft_sensor_p99', 2e-3, n=3000), target=1e-3))
+    assert bench.main(['--quick', '--output', out, '--workers', '1']) == 1
@@ -0,0 +1,96 @@
+import csv
+import os
+
+import numpy as np
+import pytest
+
+import calibration
+import cycle
+
+""" ------ PRUEBAS: CALIBRACIÓN CON REGISTROS DE PLANTA (calibration.py) ------ """
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TRUE = {'k': 3e-13, 'epsilon': 0.55, 'e': 0.7}
+
+
+def synthetic_records(tmp_path, noise=0.0, seed=0):
+    '''
+    REGISTROS GENERADOS CON EL MODELO (parámetros TRUE) EN VARIOS PUNTOS DE OPERACIÓN, GUARDADOS COMO CSV
+    '''
+    inputs = {'P_diff': np.array([15000, 20000, 30000, 40000, 25000, 35000]),
+              'w': np.array([0.8, 1.2, 1.0, 1.6, 2.0, 1.4]),
+              'nivel': np.array([0.95, 0.9, 0.8, 0.95, 0.85, 0.7])}
+    res = cycle.run_cycles(ts=0.1, **inputs, **TRUE)
+    outputs = ('M', 'S', 'Vf', 'V_total', 'Bx', 'pol', 'r', 'thickness', 'filtration_angle', 'cycle_time')
+    rng = np.random.default_rng(seed)
+    path = str(tmp_path / 'planta.csv')
+    with open(path, 'w', newline='') as fh:
+        writer = csv.writer(fh)
+        writer.writerow(tuple(inputs) + outputs)
+        for i in range(6):
+            row = [inputs[name][i] for name in inputs]
+            row += [res[name][i]*(1 + noise*rng.normal()) for name in outputs]
+            writer.writerow([repr(float(x)) for x in row])
+    return calibration.load_records(path, cache_dir=str(tmp_path / 'cache'))
+
+
+def test_recovers_parameters(tmp_path):
+    records = synthetic_records(tmp_path)
+    res = calibration.calibrate(records, initial={'k': 1e-13, 'epsilon': 0.45, 'e': 0.5})
+    assert res['success']
+    for name, value in TRUE.items():
+        assert res['params'][name] == pytest.approx(value, rel=1e-4), name
+    assert res['cost'] < 1e-12
+
+
+def test_confidence_intervals_cover_truth_with_noise(tmp_path):
+    records = synthetic_records(tmp_path, noise=0.01, seed=2)
+    res = calibration.calibrate(records)
+    for name in ('k', 'epsilon'):
+        lo, hi = res['ci'][name]
+        assert lo < res['params'][name] < hi
+        assert lo < TRUE[name] < hi, name
+
+
+def test_geometry_is_not_a_default_target(tmp_path):
+    records = synthetic_records(tmp_path)
+    res = calibration.calibrate(records)
+    assert not set(res['targets']) & set(calibration.GEOMETRY)
+    assert 'M' in res['targets'] and 'pol' in res['targets']
+    # se pueden pedir explícitamente
+    res = calibration.calibrate(records, targets=('M', 'filtration_angle'))
+    assert res['targets'] == ['M', 'filtration_angle']
+
+
+def test_record_inputs_derive_speed_from_cycle_time(tmp_path):
+    records = synthetic_records(tmp_path)
+    inputs = calibration.record_inputs(records)
+    assert set(inputs) >= {'P_diff', 'w', 'nivel'}
+    assert 'filtration_angle' not in inputs
+
+    data = np.zeros(2, dtype=[('cycle_time', 'f8'), ('M', 'f8')])
+    data['cycle_time'] = (50, 40)
+    np.testing.assert_allclose(calibration.record_inputs(data)['w'], (1.2, 1.5))
+
+
+def test_records_cache_is_reused(tmp_path):
+    records = synthetic_records(tmp_path)
+    path = str(tmp_path / 'planta.csv')
+    again = calibration.load_records(path, cache_dir=str(tmp_path / 'cache'))
+    assert isinstance(again, np.memmap)
+    np.testing.assert_array_equal(np.asarray(again['M']), np.asarray(records['M']))
+
+
+def test_plant_workbook(tmp_path):
+    pytest.importorskip('openpyxl')
+    records = calibration.load_records(os.path.join(ROOT, 'comparacion.xlsx'), cache_dir=str(tmp_path))
+    assert records.size == 2
+    assert records['filtration_angle'][0] == pytest.approx(72.134)
+    res = calibration.calibrate(records)
+    assert 'filtration_angle' not in res['targets'] and 'cycle_time' not in res['targets']
+
+
+def test_unknown_fit_parameter(tmp_path):
+    with pytest.raises(ValueError):
+        calibration.calibrate(synthetic_records(tmp_path), fit=('viscosidad',))
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+import cycle
+import process_simulation as ps
+
+""" ------ PRUEBAS: CICLO VECTORIZADO (cycle.py) ------ """
+
+
+def test_matches_process_simulation(scalar_chain):
+    ref = scalar_chain(ps.RVDF1, ps.LODOS_TORTA, 0.1, wsh_Q=ps.wsh_Q, Bx_0=ps.Bx_0)
+    res = cycle.run_cycles(ts=0.1)
+    assert float(res['filtration_angle']) == pytest.approx(ps.filtration_angle, rel=1e-12)
+    assert float(res['Af']) == pytest.approx(ps.Af, rel=1e-12)
+    for name, value in ref.items():
+        # la formación analítica difiere de odeint en ~2e-5 relativo (tolerancias de odeint)
+        assert float(res[name]) == pytest.approx(value, rel=1e-4), name
+
+
+def test_batch_matches_pointwise(scalar_chain):
+    P = np.linspace(10000, 60000, 5)
+    w = np.array([0.8, 1.2, 1.6])[:, None]
+    res = cycle.run_cycles(ts=0.1, P_diff=P, w=w)
+    assert res['M'].shape == (3, 5)
+    for i in range(3):
+        for j in range(5):
+            filtro, lodos = cycle.build(P_diff=P[j], w=w[i, 0])
+            ref = scalar_chain(filtro, lodos, 0.1, method='analytic')
+            for name in ('Vf', 'S', 'M', 'V_total', 'Bx', 'pol'):
+                assert res[name][i, j] == pytest.approx(ref[name], rel=1e-10), name
+
+
+def test_exact_times_without_ts():
+    res = cycle.run_cycles()
+    sampled = cycle.run_cycles(ts=1e-6)
+    for name in ('Vf', 'S', 'M', 'V_total'):
+        assert float(res[name]) == pytest.approx(float(sampled[name]), rel=1e-5)
+
+
+def test_outputs_and_shape():
+    res = cycle.run_cycles(P_diff=np.linspace(10000, 60000, 7))
+    assert tuple(res) == cycle.OUTPUTS
+    assert all(np.shape(value) == (7,) for value in res.values())
+
+
+def test_unknown_parameter():
+    with pytest.raises(TypeError):
+        cycle.run_cycles(presion=20000)
+    with pytest.raises(TypeError):
+        cycle.build(presion=20000)
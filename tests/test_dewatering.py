@@ -0,0 +1,115 @@
+import numpy as np
+import pytest
+
+from RVDF import RVDF
+import cycle
+import dewatering
+import dewatering_fv
+import stage_cache
+import trajectory
+
+""" ------ PRUEBAS: ETAPA DE SECADO (dewatering.py, dewatering_fv.py) ------ """
+
+
+def zone_one(**params):
+    filtro, lodos = cycle.build(**params)
+    thickness = float(cycle.run_cycles(**params)['thickness'])
+    dew_A = RVDF.drum_filter_area(filtro.rd, filtro.L, filtro.dew_angle1)
+    dew_t = RVDF.angle_to_time(filtro.dew_angle1, filtro.w)
+    return filtro, lodos, thickness, dew_A, dew_t
+
+
+@pytest.mark.parametrize('model', ['correlation', 'fv'])
+def test_adaptive_process_matches_exact_final_state(model):
+    filtro, lodos, thickness, dew_A, dew_t = zone_one()
+    res = dewatering.dewatering_process(filtro, lodos, thickness, dew_A, dew_t, 1, 0, 0.1, tol=1e-4, model=model)
+    S, M, irreduc_sat, V = dewatering.dewatering_state(filtro.P_diff, lodos.epsilon, lodos.alpha, lodos.solid_dens,
+                                                       lodos.filtrate_dens, lodos.surface_tension, lodos.u, lodos.k,
+                                                       thickness, dew_A, dew_t, model=model)
+    assert res.dew_time[0] == 0 and res.dew_time[-1] == dew_t
+    assert res.S == pytest.approx(float(S), rel=1e-12)
+    assert res.M == pytest.approx(float(M), rel=1e-12)
+    assert res.irreduc_sat == pytest.approx(float(irreduc_sat), rel=1e-12)
+    assert np.all(np.diff(res.S_arr) <= 1e-12)         # la saturación solo disminuye
+
+
+@pytest.mark.parametrize('model', ['correlation', 'fv'])
+def test_series_exact_uses_the_requested_model(model):
+    filtro, lodos, thickness, dew_A, dew_t = zone_one()
+    series = dewatering.dewatering_series(filtro, lodos, thickness, dew_A, dew_t, 1e-3, model)
+    t = np.linspace(0, dew_t, 7)
+    S = dewatering.dewatering_state(filtro.P_diff, lodos.epsilon, lodos.alpha, lodos.solid_dens, lodos.filtrate_dens,
+                                    lodos.surface_tension, lodos.u, lodos.k, thickness, dew_A, t, dew_t_end=dew_t,
+                                    model=model)[0]
+    np.testing.assert_allclose(series.exact(t)['S'], S, rtol=1e-12)
+
+
+def test_adaptive_close_to_sampled_process():
+    filtro, lodos, thickness, dew_A, dew_t = zone_one()
+    ref = dewatering.dewatering_process(filtro, lodos, thickness, dew_A, dew_t, 1, 0, 0.001)
+    res = dewatering.dewatering_process(filtro, lodos, thickness, dew_A, dew_t, 1, 0, 0.1, tol=1e-4)
+    S = np.interp(ref.dew_time, res.dew_time, res.S_arr)
+    assert np.max(np.abs(S - ref.S_arr)) < 2e-4*np.max(ref.S_arr)
+
+
+def test_adaptive_trajectory_and_cache():
+    filtro, lodos = cycle.build()
+    traj = trajectory.cycle_trajectory(filtro, lodos, 0.0015, 0.1, tol=1e-4)
+    ref = trajectory.cycle_trajectory(filtro, lodos, 0.0015, 0.001)       # muestreo fino: la última muestra ~ fin de zona
+    assert traj['V'][-1] == pytest.approx(ref['V'][-1], rel=1e-3)
+
+    cache = stage_cache.StageCache()
+    first = cache.cycle(tol=1e-4, model='fv')
+    assert cache.cycle(tol=1e-4, model='fv') == first
+    assert cache.stats()['dewatering1'] == {'hits': 1, 'disk_hits': 0, 'misses': 1}
+    cache.cycle(tol=1e-3, model='fv')
+    cache.cycle(tol=1e-4)
+    assert cache.stats()['dewatering1']['misses'] == 3         # tol y model forman parte de la clave
+
+
+def test_batched_fv_matches_scalar():
+    P_diff = np.linspace(20000, 60000, 5)
+    res = cycle.run_cycles(model='fv', P_diff=P_diff)
+    for i, P in enumerate(P_diff):
+        filtro, lodos, thickness, dew_A, dew_t = zone_one(P_diff=P)
+        S = dewatering.dewatering_state(filtro.P_diff, lodos.epsilon, lodos.alpha, lodos.solid_dens,
+                                        lodos.filtrate_dens, lodos.surface_tension, lodos.u, lodos.k, thickness,
+                                        dew_A, dew_t, model='fv')[0]
+        assert res['S_dew1'][i] == pytest.approx(float(S), rel=1e-10)
+    assert not np.allclose(res['S'], cycle.run_cycles(P_diff=P_diff)['S'])
+
+
+def test_fv_close_to_correlation():
+    # LAMBDA se ajustó a la correlación para 0.3 <= p* <= 10
+    p = np.array([0.5, 2.0, 8.0])
+    X = np.array([0.1, 0.5, 1.0, 1.5])[:, None]*p
+    fv = dewatering_fv.reduced_saturation(X, p)
+    corr = np.where(X <= 1.915, 1/(1 + 1.08*X**0.88), 1/(1 + 1.46*X**0.48))
+    assert np.max(np.abs(fv - corr)) < 0.05        # máximo medido 0.044 (p* = 8, X = 0.8)
+    assert np.all(np.diff(fv, axis=0) < 0)
+
+
+@pytest.mark.parametrize('p', [1.5, 10.0])
+def test_fv_grid_convergence(p):
+    # celdas y pasos se duplican juntos: Euler implícito da orden 1, la diferencia se reduce a la mitad
+    X = np.array([0.5, 2.0, 10.0, 50.0])
+    SR = {n: dewatering_fv.solve_profiles(X, p, n_cells=n, n_steps=n)[1][:, -1] for n in (100, 200, 400)}
+    coarse, fine = np.max(np.abs(SR[100] - SR[200])), np.max(np.abs(SR[200] - SR[400]))
+    assert fine < 6e-3
+    assert 1.7 < coarse/fine < 2.3
+    np.testing.assert_allclose(dewatering_fv.reduced_saturation(X, p, n_cells=400, n_steps=400), SR[400],
+                               rtol=1e-3)
+
+
+def test_fv_grouping_matches_direct_solve():
+    # con el mismo p* solo se resuelve el X máximo; los demás se interpolan en su historia
+    X = np.array([0.2, 0.7, 1.3])
+    g, SR, _ = dewatering_fv.solve_profiles(X, 2.0)
+    grouped = dewatering_fv.reduced_saturation(X, 2.0)
+    assert grouped[-1] == pytest.approx(SR[-1, -1], rel=1e-12)
+    np.testing.assert_allclose(grouped, SR[:, -1], rtol=1e-3)
+
+
+def test_unknown_model():
+    with pytest.raises(ValueError):
+        cycle.run_cycles(model='wakeman')
@@ -0,0 +1,75 @@
+import csv
+
+import numpy as np
+import pytest
+
+import cycle
+import dynamic
+
+""" ------ PRUEBAS: SIMULACIÓN DINÁMICA CON TANQUE DE LODOS (dynamic.py) ------ """
+
+
+def test_tank_initial_state():
+    tank = dynamic.MudTank(3.0, 0.8, 50, 500)
+    assert tank.nivel == pytest.approx(0.8)
+    assert tank.c == pytest.approx(50)
+
+
+def test_tank_balance_and_overflow():
+    tank = dynamic.MudTank(3.0, 0.8, 50, 500)
+    V, m = tank.V_liq, tank.m_solids
+    assert tank.step(0.1, 60, 0.05, 2.0) == 0.0
+    assert tank.V_liq == pytest.approx(V + 0.05)
+    assert tank.m_solids == pytest.approx(m + 6.0 - 2.0)
+
+    c = tank.c
+    overflow = tank.step(5.0, c, 0.0, 0.0)       # alimentación a la concentración del tanque: rebosa
+    assert overflow > 0
+    assert tank.nivel == pytest.approx(1.0)
+    assert tank.c == pytest.approx(c)
+
+
+def test_first_revolution_matches_cycle():
+    records = list(dynamic.simulate(feed=2.5e-4, capacity=3, n_revolutions=3, w=1.2))
+    ref = cycle.run_cycles(w=1.2)
+    first = records[0]
+    assert first['nivel'] == pytest.approx(cycle.DEFAULTS['nivel'])
+    for name in ('Vf', 'V_total', 'M', 'Bx', 'pol'):
+        assert first[name] == pytest.approx(float(ref[name]), rel=1e-12)
+    assert [r['revolution'] for r in records] == [0, 1, 2]
+    assert records[1]['t'] == pytest.approx(60/1.2)
+
+
+def test_solids_balance():
+    p = cycle.DEFAULTS
+    records = list(dynamic.simulate(feed=[1e-4, 3e-4, 0.0, 2e-4], capacity=3))
+    assert len(records) == 4        # la serie de alimentación fija el número de revoluciones
+    # sólidos en el tanque antes de la última revolución = iniciales + alimentados - extraídos en la torta
+    m0 = dynamic.MudTank(3, p['nivel'], p['c'], p['solid_dens']).m_solids
+    solids_in = sum(r['feed']*60/p['w']*p['c'] for r in records[:-1])
+    solids_out = sum(r['solids'] for r in records[:-1])
+    last = records[-1]
+    V_liq = last['nivel']*3/(1 + last['c']/p['solid_dens'])
+    assert last['c']*V_liq == pytest.approx(m0 + solids_in - solids_out, rel=1e-9)
+    assert all(r['overflow'] == 0 for r in records)
+
+
+def test_callable_feed_requires_revolutions():
+    with pytest.raises(ValueError):
+        next(dynamic.simulate(feed=lambda t: 1e-4, capacity=3))
+    records = list(dynamic.simulate(feed=lambda t: 1e-4*(1 + t/1000), capacity=3, n_revolutions=2))
+    assert records[1]['feed'] > records[0]['feed']
+
+
+def test_unknown_parameter():
+    with pytest.raises(TypeError):
+        next(dynamic.simulate(feed=1e-4, capacity=3, n_revolutions=1, presion=1))
+
+
+def test_write_records(tmp_path):
+    path = str(tmp_path / 'turno.csv')
+    n = dynamic.write_records(dynamic.simulate(feed=2.5e-4, capacity=3, n_revolutions=5), path)
+    with open(path, newline='') as fh:
+        rows = list(csv.DictReader(fh))
+    assert n == len(rows) == 5
+    assert tuple(rows[0]) == dynamic.RECORD_FIELDS
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+import cycle
+import filtration
+
+""" ------ PRUEBAS: SOLUCIÓN ANALÍTICA DE RUTH (filtration.py) ------ """
+
+
+@pytest.fixture
+def base():
+    filtro, lodos = cycle.build()
+    t = np.arange(0, filtro.tf, 0.1)
+    return filtro, lodos, t
+
+
+@pytest.mark.parametrize('Rm', [0, 1e11, 1e12])
+def test_analytic_matches_odeint(base, Rm):
+    filtro, lodos, t = base
+    args = (filtro.P_diff, filtro.Af, lodos.u, lodos.alpha, lodos.c, Rm)
+    v = filtration.ruth_volume(t, *args)
+    v_ode = filtration.odeint_volume(t, *args)
+    np.testing.assert_allclose(v, v_ode, rtol=1e-4)
+
+
+def test_rate_is_ode_rhs(base):
+    filtro, lodos, t = base
+    for Rm in (0, 1e11):
+        args = (filtro.P_diff, filtro.Af, lodos.u, lodos.alpha, lodos.c, Rm)
+        v = filtration.ruth_volume(t, *args)
+        np.testing.assert_allclose(filtration.ruth_rate(v, *args), filtration.f(v, t, *args), rtol=1e-12)
+        # dV/dt de la forma cerrada por diferencias centradas
+        h = 1e-4
+        dv = (filtration.ruth_volume(t[1:] + h, *args) - filtration.ruth_volume(t[1:] - h, *args))/(2*h)
+        np.testing.assert_allclose(filtration.ruth_rate(v[1:], *args), dv, rtol=1e-6)
+
+
+def test_rate_reduces_to_original_without_medium(base):
+    filtro, lodos, t = base
+    A, P, u, alpha, c = filtro.Af, filtro.P_diff, lodos.u, lodos.alpha, lodos.c
+    v = filtration.ruth_volume(t, P, A, u, alpha, c, 0)
+    np.testing.assert_allclose(filtration.ruth_rate(v, P, A, u, alpha, c, 0), A*A*P/(u*alpha*c*v), rtol=1e-12)
+
+
+@pytest.mark.parametrize('Rm', [0, 1e11])
+def test_thickness_is_original_formula(base, Rm):
+    filtro, lodos, t = base
+    A, P, u, alpha, c, k = filtro.Af, filtro.P_diff, lodos.u, lodos.alpha, lodos.c, lodos.k
+    v, q, l = filtration.analytic_volume(t, P, A, u, alpha, c, Rm, k)
+    q_original = (A*A*P)/(u*alpha*c*v)          # caudal de la versión original (sin Rm)
+    np.testing.assert_allclose(l, (k*A*P)/(u*q_original), rtol=1e-12)
+
+
+def test_volume_methods_agree(base):
+    filtro, lodos, _ = base
+    auto = filtration.volume(filtro, lodos, 0.1, filtro.tf)
+    ode = filtration.volume(filtro, lodos, 0.1, filtro.tf, method='odeint')
+    assert auto.t.shape == ode.t.shape
+    np.testing.assert_allclose(auto.v, ode.v, rtol=1e-4)
+    np.testing.assert_allclose(auto.l, ode.l, rtol=1e-4)
+    assert auto.W_cake == ode.W_cake
+
+
+def test_time_dependent_medium(base):
+    filtro, lodos, _ = base
+    filtro.Rm = lambda t: 1e11*(1 + 0.1*np.asarray(t))
+    with pytest.raises(ValueError):
+        filtration.volume(filtro, lodos, 0.1, filtro.tf, method='analytic')
+    res = filtration.volume(filtro, lodos, 0.1, filtro.tf)
+    assert np.all(np.diff(res.v) > 0)
+
+
+def test_unknown_method(base):
+    filtro, lodos, _ = base
+    with pytest.raises(ValueError):
+        filtration.volume(filtro, lodos, 0.1, filtro.tf, method='euler')
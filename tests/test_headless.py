@@ -0,0 +1,41 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import cycle
+import filtration
+
+""" ------ PRUEBAS: NÚCLEO DE CÁLCULO SIN GRÁFICAS NI DEPENDENCIAS PESADAS ------ """
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CORE = ('RVDF', 'filtration', 'dewatering', 'dewatering_fv', 'washing', 'bx_calc', 'pol_calc', 'cycle', 'report',
+        'trajectory', 'stage_cache', 'sensitivity', 'surrogate', 'results_store', 'soft_sensor', 'batch_runner',
+        'process_simulation')
+FORBIDDEN = ('matplotlib', 'sklearn', 'scipy')
+
+
+def loaded_after_import(modules):
+    probe = ("import json, sys\nfor name in %r: __import__(name)\n"
+             "print(json.dumps(sorted(m for m in %r if m in sys.modules)))" % (modules, FORBIDDEN))
+    out = subprocess.run([sys.executable, '-c', probe], cwd=ROOT, check=True, capture_output=True, text=True).stdout
+    return json.loads(out)
+
+
+def test_core_does_not_import_heavy_modules():
+    assert loaded_after_import(CORE) == []
+
+
+@pytest.mark.parametrize('module', ['plotting', 'report'])
+def test_reporting_layers_import_lazily(module):
+    assert loaded_after_import((module,)) == []
+
+
+def test_compute_functions_do_not_print(capsys):
+    filtro, lodos = cycle.build()
+    filtration.volume(filtro, lodos, 0.1, filtro.tf)
+    cycle.run_cycles(ts=0.1)
+    assert capsys.readouterr().out == ''
@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+import cycle
+import montecarlo
+
+""" ------ PRUEBAS: PROPAGACIÓN DE INCERTIDUMBRE (montecarlo.py) ------ """
+
+SPECS = {
+    'k': ('lognormal', np.log(2*10**-13), 0.3),
+    'epsilon': ('uniform', 0.4, 0.6),
+    'u': ('normal', 0.4, 0.04),
+}
+
+
+def reference_samples(specs, n_samples, chunk_size, seed, outputs, fixed=None):
+    '''
+    MISMAS MUESTRAS QUE iter_monte_carlo, GUARDADAS COMPLETAS
+    '''
+    sizes = [chunk_size]*(n_samples//chunk_size) + ([n_samples % chunk_size] if n_samples % chunk_size else [])
+    values = {name: [] for name in outputs}
+    for n, s in zip(sizes, np.random.SeedSequence(seed).spawn(len(sizes))):
+        params = dict(fixed or {})
+        params.update(montecarlo.sample(specs, n, np.random.default_rng(s)))
+        with np.errstate(all='ignore'):
+            res = cycle.run_cycles(**params)
+        valid = np.all([np.isfinite(res[name]) for name in outputs], axis=0)
+        for name in outputs:
+            values[name].append(res[name][valid])
+    return {name: np.concatenate(parts) for name, parts in values.items()}
+
+
+def test_quantiles_match_percentile():
+    n, chunk = 60000, 7000
+    res = montecarlo.monte_carlo(SPECS, n, chunk_size=chunk, workers=1, seed=3, percentiles=(5, 25, 50, 75, 95))
+    ref = reference_samples(SPECS, n, chunk, 3, montecarlo.OUTPUTS)
+    assert res['n'] == n
+    for name in montecarlo.OUTPUTS:
+        x = ref[name]
+        spread = np.percentile(x, 95) - np.percentile(x, 5)
+        for p in (5, 25, 50, 75, 95):
+            assert abs(res[name]['p%g' % p] - np.percentile(x, p)) < 0.01*spread, (name, p)
+        assert res[name]['mean'] == pytest.approx(np.mean(x), rel=1e-10)
+        assert res[name]['std'] == pytest.approx(np.std(x, ddof=1), rel=1e-8)
+        assert res[name]['min'] == np.min(x) and res[name]['max'] == np.max(x)
+
+
+def test_sketch_is_exact_below_size(rng):
+    x = rng.normal(size=500)
+    sketch = montecarlo.QuantileSketch(1000)
+    sketch.update(x[:200])
+    sketch.update(x[200:])
+    # con todas las muestras guardadas el cuantil es el de los puntos medios de cada peso
+    np.testing.assert_allclose(sketch.quantile([0.1, 0.5, 0.9]),
+                               np.percentile(x, [10, 50, 90], method='hazen'), rtol=1e-12)
+
+
+def test_running_stats_merge(rng):
+    x = rng.normal(3, 2, 1000)
+    a, b = montecarlo.RunningStats(), montecarlo.RunningStats()
+    a.update(x[:300])
+    b.update(x[300:])
+    a.merge(b)
+    assert a.n == 1000
+    assert a.mean == pytest.approx(x.mean(), rel=1e-12)
+    assert a.std == pytest.approx(x.std(ddof=1), rel=1e-12)
+
+
+def test_result_does_not_depend_on_workers():
+    kwargs = dict(chunk_size=2000, seed=1, fixed={'P_diff': 30000})
+    serial = montecarlo.monte_carlo(SPECS, 8000, workers=1, **kwargs)
+    parallel = montecarlo.monte_carlo(SPECS, 8000, workers=2, **kwargs)
+    assert serial == parallel
+
+
+def test_latin_hypercube_is_stratified(rng):
+    n = 200
+    samples = montecarlo.sample({'epsilon': ('uniform', 0.4, 0.6)}, n, rng, method='lhs')
+    strata = np.floor((samples['epsilon'] - 0.4)/0.2*n).astype(int)
+    assert sorted(strata) == list(range(n))
+
+
+def test_invalid_specs():
+    with pytest.raises(ValueError):
+        montecarlo.monte_carlo({'k': ('beta', 1, 2)}, 10, workers=1)
+    with pytest.raises(ValueError):
+        montecarlo.monte_carlo(SPECS, 10, fixed={'k': 1e-13}, workers=1)
+    with pytest.raises(TypeError):
+        montecarlo.monte_carlo({'kk': ('uniform', 0, 1)}, 10, workers=1)
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+import cycle
+import optimization
+
+""" ------ PRUEBAS: OPTIMIZACIÓN DEL PUNTO DE OPERACIÓN (optimization.py) ------ """
+
+BOUNDS = {'w': (0.5, 3.0), 'P_diff': (10000, 60000), 'wsh_Q': (0.0005, 0.004)}
+
+
+def test_optimum_is_feasible_and_beats_grid():
+    res = optimization.optimize(pol_max=45, M_max=42, bounds=BOUNDS, n_grid=4, n_starts=2)
+    assert res['success']
+    out = res['outputs']
+    assert out['pol'] <= 45*(1 + 1e-6) and out['M'] <= 42*(1 + 1e-6)
+    for name, (lo, hi) in BOUNDS.items():
+        assert lo - 1e-9 <= res['params'][name] <= hi + 1e-9
+
+    # el resultado reproduce el ciclo y no es peor que el mejor punto factible de la malla
+    check = cycle.run_cycles(**res['params'])
+    assert float(check['rate']) == pytest.approx(out['rate'], rel=1e-12)
+    evaluator = optimization.CycleEvaluator(tuple(BOUNDS))
+    X, grid = optimization.grid_screen(evaluator, BOUNDS, 4)
+    ok = optimization.feasible(X, grid, tuple(BOUNDS), 45, 42)
+    assert out['rate'] >= grid['rate'][ok].max()
+
+
+def test_infeasible_limits():
+    res = optimization.optimize(pol_max=1e-6, bounds=BOUNDS, n_grid=3, n_starts=1)
+    assert not res['success'] and 'params' not in res
+
+
+def test_pareto_front_is_non_dominated(rng):
+    rate, pol = rng.uniform(size=300), rng.uniform(size=300)
+    front = optimization.pareto_front(rate, pol)
+    dominated = [(rate > rate[i]) & (pol <= pol[i]) | (rate >= rate[i]) & (pol < pol[i]) for i in range(300)]
+    expected = [i for i in range(300) if not dominated[i].any()]
+    assert sorted(front) == sorted(expected)
+    assert np.all(np.diff(pol[front]) > 0)
+
+
+def test_evaluator_caches_points():
+    evaluator = optimization.CycleEvaluator(('w', 'P_diff'))
+    X = np.array([[1.2, 20000], [1.5, 30000], [1.2, 20000]])
+    first = evaluator(X)
+    assert (evaluator.misses, evaluator.hits) == (2, 1)
+    again = evaluator(X[:2])
+    assert evaluator.hits == 3
+    np.testing.assert_array_equal(first['rate'][:2], again['rate'])
+    assert first['rate'][0] == pytest.approx(float(cycle.run_cycles(w=1.2, P_diff=20000)['rate']))
+
+
+def test_angle_sum_uses_fixed_and_defaults():
+    total = optimization.angle_sum(np.array([[80.0]]), ('filtration_angle',), fixed={'wsh_angle': 20})
+    d = cycle.DEFAULTS
+    assert total[0] == 80 + 20 + d['dew_angle1'] + d['dew_angle2']
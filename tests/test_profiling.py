@@ -0,0 +1,118 @@
+import json
+import time
+
+import numpy as np
+import pytest
+
+import cycle
+import profiling
+
+""" ------ PRUEBAS: PERFILADO POR ETAPA (profiling.py) ------ """
+
+
+@profiling.instrument('test.inner')
+def inner(x):
+    time.sleep(0.002)
+    return np.zeros(x)
+
+
+@profiling.instrument('test.outer')
+def outer(x):
+    time.sleep(0.002)
+    return inner(x), inner(x)
+
+
+def test_disabled_is_transparent():
+    # el costo por llamada desactivado se mide en benchmarks/run.py (instrument_disabled frente a plain_call)
+    assert profiling.active() is None
+    assert outer(3)[0].shape == (3,)
+    assert profiling.span('x') is profiling._NULL_SPAN
+    profiling.count(nfe=1)          # sin perfilador no hace nada
+
+    def plain(x, scale=2):
+        '''DOBLE'''
+        return scale*x
+
+    wrapped = profiling.instrument()(plain)
+    assert wrapped(3) == plain(3) and wrapped(3, scale=4) == 12
+    assert wrapped.__name__ == 'plain' and wrapped.__doc__ == 'DOBLE' and wrapped.__wrapped__ is plain
+    assert outer.__name__ == 'outer' and outer.__module__ == __name__
+
+    with profiling.profile() as prof:
+        pass
+    assert prof.stats == {} and prof.events == []      # las llamadas previas no quedaron registradas
+
+
+def test_nested_stages_total_self_and_sizes():
+    with profiling.profile() as prof:
+        outer(1000)
+    assert profiling.active() is None
+    stats = prof.summary()['stages']
+    assert stats['test.outer']['calls'] == 1 and stats['test.inner']['calls'] == 2
+    assert stats['test.inner']['out_bytes'] == 2*8000 and stats['test.outer']['out_bytes'] == 2*8000
+    assert stats['test.outer']['total'] >= stats['test.inner']['total']
+    assert stats['test.outer']['self'] == pytest.approx(stats['test.outer']['total'] - stats['test.inner']['total'])
+    assert stats['test.outer']['in_elements'] == 1
+
+
+def test_cycle_stages_and_solver_counters():
+    filtro, lodos = cycle.build()
+    with profiling.profile() as prof:
+        profiling._process_chain(filtro, lodos, 0.1, 'odeint')
+        cycle.run_cycles(P_diff=np.linspace(10000, 60000, 50))
+    stats = prof.summary()['stages']
+    for stage in ('filtration', 'dewatering1', 'washing', 'dewatering2', 'brix', 'pol', 'cycle.run_cycles',
+                  'cycle.formation', 'cycle.dewatering_zones'):
+        assert stats[stage]['calls'] >= 1, stage
+    solver = stats['filtration.odeint_volume']['solver']
+    assert solver['nfe'] > 0 and solver['nst'] > 0 and solver['failed'] == 0
+    assert stats['cycle.formation']['in_elements'] == 50
+
+
+def test_exception_restores_state():
+    @profiling.instrument('test.fails')
+    def fails():
+        raise RuntimeError
+
+    with pytest.raises(RuntimeError):
+        with profiling.profile() as prof:
+            fails()
+    assert profiling.active() is None
+    assert prof.stats['test.fails']['calls'] == 1 and prof._stack() == []
+
+
+def test_exports(tmp_path):
+    with profiling.profile(json_path=str(tmp_path / 's.json'), trace_path=str(tmp_path / 't.json')) as prof:
+        outer(10)
+    summary = json.loads((tmp_path / 's.json').read_text())
+    assert summary['stages']['test.inner']['calls'] == 2 and summary['elapsed'] == prof.elapsed
+    events = json.loads((tmp_path / 't.json').read_text())['traceEvents']
+    assert sorted(e['name'] for e in events) == ['test.inner', 'test.inner', 'test.outer']
+    assert all(e['ph'] == 'X' and e['dur'] > 0 for e in events)
+    outer_event = next(e for e in events if e['name'] == 'test.outer')
+    assert all(outer_event['ts'] <= e['ts'] <= outer_event['ts'] + outer_event['dur'] for e in events)
+
+
+def test_event_limit_keeps_statistics():
+    with profiling.profile(max_events=2) as prof:
+        outer(1)
+    assert len(prof.events) == 2 and prof.dropped == 1
+    assert prof.stats['test.inner']['calls'] == 2
+
+    with profiling.profile(trace=False) as prof:
+        outer(1)
+    assert prof.events == [] and prof.dropped == 0
+
+
+def test_report_sorted_by_self_time():
+    with profiling.profile() as prof:
+        outer(1)
+    lines = prof.report().splitlines()
+    assert lines[1].startswith('test.inner') and lines[2].startswith('test.outer')
+    assert lines[-1].startswith('tiempo total perfilado')
+
+
+def test_main(tmp_path, capsys):
+    assert profiling.main(['--n', '100', '--json', str(tmp_path / 's.json')]) == 0
+    assert 'sweep' in capsys.readouterr().out
+    assert 'scalar_cycle' in json.loads((tmp_path / 's.json').read_text())['stages']
@@ -0,0 +1,104 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+import cycle
+from results_store import ResultsStore, RESULT_COLUMNS
+
+""" ------ PRUEBAS: ALMACÉN COLUMNAR DE RESULTADOS (results_store.py) ------ """
+
+# expresión -> máscara equivalente con NumPy sobre las columnas completas (sin descartar bloques)
+QUERIES = {
+    "pol < 2 and M < 75": lambda d: (d['pol'] < 2) & (d['M'] < 75),
+    "10000 <= P_diff < 30000 or not M > 80": lambda d: ((10000 <= d['P_diff']) & (d['P_diff'] < 30000)) | ~(d['M'] > 80),
+    "moisture >= 78 and (brix < 14 or pol > 3)": lambda d: (d['M'] >= 78) & ((d['Bx'] < 14) | (d['pol'] > 3)),
+    "not (P_diff > 40000 and pol < 2.5)": lambda d: ~((d['P_diff'] > 40000) & (d['pol'] < 2.5)),
+    "M != 75": lambda d: d['M'] != 75,
+    "-1 < pol <= 0.5": lambda d: (-1 < d['pol']) & (d['pol'] <= 0.5),
+    "pol > 1e300": lambda d: d['pol'] > 1e300,
+    "P_diff == 25000": lambda d: d['P_diff'] == 25000,
+}
+
+
+def synthetic(rng, n):
+    data = {'P_diff': rng.choice(np.linspace(10000, 60000, 11), n), 'M': rng.uniform(70, 85, n),
+            'pol': rng.normal(2.5, 1.5, n), 'Bx': rng.uniform(12, 16, n)}
+    data['M'][rng.random(n) < 0.05] = np.nan
+    data['pol'][rng.random(n) < 0.02] = np.inf
+    data['M'][:50] = 75.0
+    return data
+
+
+@pytest.fixture(params=[(False, True), (True, False)], ids=['npy-thread', 'npz-sync'])
+def store(request, tmp_path, rng):
+    compress, background = request.param
+    data = synthetic(rng, 5000)
+    with ResultsStore(str(tmp_path / 'st'), compress=compress, background=background, chunk_rows=700) as st:
+        for part in np.array_split(np.arange(5000), 3):
+            st.append({name: value[part] for name, value in data.items()})
+    return ResultsStore(str(tmp_path / 'st'), background=False), data
+
+
+@pytest.mark.parametrize('expr', list(QUERIES))
+def test_query_matches_brute_force(store, expr):
+    st, data = store
+    expected = np.flatnonzero(QUERIES[expr](data))
+    res = st.query(expr, columns=('P_diff', 'pol'))
+    np.testing.assert_array_equal(res['_row'], expected)
+    np.testing.assert_array_equal(res['pol'], data['pol'][expected])
+    assert st.count(expr) == expected.size
+
+
+def test_pruned_chunks_are_not_opened(tmp_path):
+    with ResultsStore(str(tmp_path / 'st'), background=False) as st:
+        for low in (0, 10, 20):
+            st.append({'x': np.arange(low, low + 10, dtype=float), 'y': np.zeros(10)})
+    os.remove(str(tmp_path / 'st' / 'chunk_000000' / 'x.npy'))       # el bloque [0, 9] no debe leerse
+    np.testing.assert_array_equal(st.query("x >= 15", columns=('x',))['x'], np.arange(15, 30))
+
+
+def test_chunk_without_valid_values(tmp_path):
+    # un bloque solo con nan no cumple "y < 1" pero sí "y != 0" (como np.not_equal)
+    with ResultsStore(str(tmp_path / 'st'), background=False) as st:
+        st.append({'y': np.zeros(5)})
+        st.append({'y': np.full(5, np.nan)})
+    assert st.count("y < 1") == 5
+    np.testing.assert_array_equal(st.query("y != 0")['_row'], np.arange(5, 10))
+
+
+def test_layout_schema_and_reopen(store):
+    st, data = store
+    assert len(st) == 5000 and set(st.columns) == set(data)
+    meta = json.load(open(os.path.join(st.path, 'store.json')))
+    assert all(chunk['rows'] <= 700 for chunk in meta['chunks'])
+    np.testing.assert_array_equal(st.column('moisture'), data['M'])
+    assert sum(block['M'].size for block in st.scan(('M',))) == 5000
+
+    st.append({name: value[:10] for name, value in data.items()})
+    assert len(ResultsStore(st.path, background=False)) == 5010
+    with pytest.raises(ValueError):
+        st.append({'P_diff': np.zeros(3)})
+
+
+def test_append_cycles_and_trajectories(tmp_path):
+    P = np.linspace(20000, 50000, 4)
+    with ResultsStore(str(tmp_path / 'st')) as st:
+        st.append_cycles(P_diff=P, w=1.2, trajectories=True)
+    res = cycle.run_cycles(P_diff=P, w=1.2)
+    assert set(st.columns) == {'P_diff', 'w'} | set(RESULT_COLUMNS)
+    np.testing.assert_array_equal(st.column('pol'), res['pol'])
+    dew1 = st.trajectory('dew1_S', 2)
+    assert dew1[0] == 1.0 and dew1[-1] > 0
+    with pytest.raises(IndexError):
+        st.trajectory('dew1_S', 4)
+
+
+def test_invalid_expressions(store):
+    st, _ = store
+    for expr in ("pol + 1 < 2", "pol < M", "pol <", "len(pol) > 1"):
+        with pytest.raises(ValueError):
+            st.query(expr)
+    with pytest.raises(KeyError):
+        st.query("vacuum > 1")
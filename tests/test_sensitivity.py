@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+import cycle
+import sensitivity
+from sensitivity import SensitivityResult
+
+""" ------ PRUEBAS: SENSIBILIDADES POR DIFERENCIACIÓN AUTOMÁTICA (sensitivity.py) ------ """
+
+INPUTS = ('P_diff', 'w', 'nivel', 'wsh_Q', 'k', 'epsilon', 'u', 'c', 'e', 'Bx_0')
+
+
+@pytest.fixture(scope='module')
+def result():
+    return sensitivity.jacobian(inputs=INPUTS, P_diff=np.linspace(15000, 55000, 5), w=1.2)
+
+
+def test_values_match_run_cycles(result):
+    ref = cycle.run_cycles(P_diff=np.linspace(15000, 55000, 5), w=1.2)
+    for name in result.outputs:
+        np.testing.assert_allclose(result.values[name], ref[name], rtol=1e-12, err_msg=name)
+
+
+@pytest.mark.parametrize('output', ['M', 'pol', 'rate', 'Bx'])
+def test_jacobian_matches_finite_differences(result, output):
+    fd = sensitivity.finite_differences(output, INPUTS, P_diff=np.linspace(15000, 55000, 5), w=1.2)
+    J = result.jacobian[:, result.outputs.index(output)]
+    p, _ = cycle.complete_params({'P_diff': np.linspace(15000, 55000, 5), 'w': 1.2})
+    x = np.stack([np.broadcast_to(p[name], (5,)) for name in INPUTS], axis=-1)
+    y = result.values[output][:, None]
+    # se comparan elasticidades (adimensionales): las derivadas nulas dejan ruido de redondeo en las diferencias
+    np.testing.assert_allclose(J*x/y, fd*x/y, atol=1e-5)
+
+
+def test_elasticity_definition(result):
+    i, j = result.outputs.index('M'), result.inputs.index('P_diff')
+    expected = result.jacobian[:, i, j]*np.linspace(15000, 55000, 5)/result.values['M']
+    np.testing.assert_allclose(result.elasticity[:, i, j], expected, rtol=1e-12)
+
+    zero = sensitivity.jacobian(outputs=('M',), inputs=('Rm', 'P_diff'))
+    assert zero.elasticity[0, 0] == 0.0        # entrada nula (Rm = 0): elasticidad 0
+
+
+def test_rank_orders_by_mean_absolute_elasticity():
+    # 'a' sube la salida en un punto y la baja en el otro: su media con signo es 0 pero es la más influyente
+    E = np.array([[[1.0, 0.5, np.nan]], [[-1.0, 0.5, np.nan]]])
+    res = SensitivityResult({}, None, E, ('M',), ('a', 'b', 'c'))
+    ranking = sensitivity.rank(res, 'M')
+    assert [name for name, _, _ in ranking] == ['a', 'b', 'c']
+    assert ranking[0][1:] == (1.0, 0.0) and ranking[1][1:] == (0.5, 0.5)
+    assert np.isnan(ranking[2][1])
+    assert sensitivity.rank(res, 'M', n=1) == ranking[:1]
+
+
+def test_rank_matches_elasticities(result):
+    ranking = sensitivity.rank(result, 'M')
+    E = result.elasticity[:, result.outputs.index('M')]
+    magnitude = np.nanmean(np.abs(E), axis=0)
+    assert [m for _, m, _ in ranking] == sorted(magnitude, reverse=True)
+    for name, m, mean in ranking:
+        assert mean == pytest.approx(np.nanmean(E[:, result.inputs.index(name)]))
+
+
+def test_invalid_inputs():
+    with pytest.raises(ValueError):
+        sensitivity.jacobian(inputs=('vacuum',))
+    with pytest.raises(ValueError):
+        sensitivity.jacobian(inputs=('filtrate_dens',))
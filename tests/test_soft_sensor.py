@@ -0,0 +1,104 @@
+import asyncio
+import json
+
+import numpy as np
+import pytest
+
+import cycle
+import soft_sensor
+from soft_sensor import SoftSensor
+
+""" ------ PRUEBAS: SENSOR VIRTUAL EN LÍNEA (soft_sensor.py) ------ """
+
+
+def historian(path, n, dt=0.5, seed=0):
+    # registros cada dt segundos con vacío y nivel variables, rpm constante
+    rng = np.random.default_rng(seed)
+    with open(path, 'w') as fh:
+        fh.write('t,vacuum,rpm,level,wash_flow\n')
+        for i in range(n):
+            fh.write('{},{},1.0,{},0.0015\n'.format(i*dt, 25000 + 2000*rng.random(), 0.85 + 0.1*rng.random()))
+    return path
+
+
+def test_prediction_matches_run_cycles():
+    sensor = SoftSensor()
+    pred = sensor.update({'vacuum': 30000, 'rpm': 1.2, 'level': 0.9, 'wash_flow': 0.002, 'revolution': 7})
+    ref = cycle.run_cycles(P_diff=30000, w=1.2, nivel=0.9, wsh_Q=0.002)
+    assert pred['revolution'] == 7
+    for name in soft_sensor.PREDICTIONS:
+        assert pred[name] == pytest.approx(float(ref[name]), rel=1e-12), name
+
+
+def test_vacuum_change_reuses_geometry():
+    sensor = SoftSensor()
+    before = dict(sensor.computed)
+    sensor.update({'vacuum': 31000})
+    assert sensor.computed['geometry'] == before['geometry']
+    assert sensor.computed['formation'] == before['formation'] + 1
+    sensor.update({'vacuum': 31000})
+    assert sensor.computed['formation'] == before['formation'] + 1
+
+
+def test_invalid_values_keep_last_measurement():
+    sensor = SoftSensor()
+    sensor.update({'vacuum': 30000})
+    sensor.update({'vacuum': '', 'rpm': 'nan'})
+    assert sensor.p['P_diff'] == 30000 and sensor.p['w'] == cycle.DEFAULTS['w']
+
+
+def test_counts_every_record_and_one_prediction_per_revolution(tmp_path):
+    path = historian(tmp_path / 'h.csv', 600)          # 300 s a 1 rpm: 5 revoluciones
+    sensor = SoftSensor()
+    with open(path) as fh:
+        predictions = list(soft_sensor.iter_predictions(fh, sensor))
+    assert [p['t'] for p in predictions] == [0.0, 60.0, 120.0, 180.0, 240.0]
+    assert sensor.n_records == 600
+    assert sensor.n_predictions == 5
+
+
+def test_stream_with_small_queue_does_not_drop(tmp_path):
+    path = historian(tmp_path / 'h.csv', 3000)
+    out = []
+    sensor = asyncio.run(soft_sensor.stream(str(path), out.append, maxsize=4, per_revolution=False))
+    assert sensor.n_records == sensor.n_predictions == len(out) == 3000
+    assert [p['t'] for p in out] == [0.5*i for i in range(3000)]
+
+
+def test_csv_and_json_give_the_same_predictions(tmp_path):
+    rows = [{'t': 30.0*i, 'revolution': i//2, 'vacuum': 25000 + 500*i, 'level': 0.9} for i in range(6)]
+    (tmp_path / 'h.csv').write_text('t,revolution,vacuum,level\n' +
+                                    ''.join('{t},{revolution},{vacuum},{level}\n'.format(**row) for row in rows))
+    (tmp_path / 'h.jsonl').write_text(''.join(json.dumps(row) + '\n' for row in rows))
+    outputs = []
+    for name in ('h.csv', 'h.jsonl'):
+        with open(tmp_path / name) as fh:
+            outputs.append([{key: value for key, value in p.items() if key != 'latency_ms'}
+                            for p in soft_sensor.iter_predictions(fh, per_revolution=False)])
+    assert outputs[0] == outputs[1]
+    assert [(p['t'], p['revolution']) for p in outputs[0]] == [(row['t'], row['revolution']) for row in rows]
+    assert all(type(p['revolution']) is int for p in outputs[0])
+
+
+def test_latency_quantile_matches_percentile(tmp_path):
+    # el objetivo LATENCY_TARGET se verifica en benchmarks/run.py (depende de la máquina)
+    path = historian(tmp_path / 'h.csv', 3000)
+    with open(path) as fh:
+        sensor = SoftSensor()
+        latencies = [p['latency_ms'] for p in soft_sensor.iter_predictions(fh, sensor, per_revolution=False)]
+    p99 = sensor.latency_quantile(0.99)
+    assert p99 == pytest.approx(1e-3*np.percentile(latencies, 99), rel=0.1)
+
+
+def test_main_reports_counts_and_latency(tmp_path, capsys):
+    path = historian(tmp_path / 'h.csv', 240)
+    assert soft_sensor.main([str(path)]) == 0
+    captured = capsys.readouterr()
+    lines = captured.out.splitlines()
+    assert len(lines) == 2 and json.loads(lines[0])['t'] == 0.0
+    assert 'registros: 240  predicciones: 2' in captured.err and 'p99' in captured.err
+
+
+def test_unknown_parameter():
+    with pytest.raises(TypeError):
+        SoftSensor(vacuum=30000)
@@ -0,0 +1,117 @@
+import numpy as np
+import pytest
+
+from RVDF import RVDF
+import cycle
+import filtration
+import dewatering
+import stage_cache
+
+""" ------ PRUEBAS: CACHÉ POR ETAPA (stage_cache.py) ------ """
+
+
+def test_hits_and_misses():
+    cache = stage_cache.StageCache()
+    first = cache.cycle(ts=0.1)
+    second = cache.cycle(ts=0.1)
+    assert first == second
+    stats = cache.stats()
+    for stage in ('filtration', 'dewatering1', 'washing', 'dewatering2', 'Bx', 'pol'):
+        assert stats[stage] == {'hits': 1, 'disk_hits': 0, 'misses': 1}, stage
+
+
+def test_matches_uncached_chain(scalar_chain):
+    filtro, lodos = cycle.build(P_diff=30000)
+    ref = scalar_chain(filtro, lodos, 0.1, method='auto')
+    res = stage_cache.StageCache().cycle(ts=0.1, P_diff=30000)
+    for name in ('Vf', 'S', 'M', 'V_total', 'Bx', 'pol'):
+        assert res[name] == ref[name], name
+
+
+def test_downstream_change_reuses_upstream_stages():
+    cache = stage_cache.StageCache()
+    cache.cycle(ts=0.1, wsh_Q=0.0015)
+    cache.cycle(ts=0.1, wsh_Q=0.0025)
+    stats = cache.stats()
+    assert stats['filtration'] == {'hits': 1, 'disk_hits': 0, 'misses': 1}
+    assert stats['dewatering1']['hits'] == 1
+    assert stats['washing']['misses'] == 2 and stats['pol']['misses'] == 2
+
+
+def test_upstream_change_invalidates():
+    cache = stage_cache.StageCache()
+    a = cache.cycle(ts=0.1, P_diff=20000)
+    b = cache.cycle(ts=0.1, P_diff=25000)
+    assert cache.stats()['filtration']['misses'] == 2
+    assert a['Vf'] != b['Vf']
+    # el mismo objeto modificado en sitio también cambia la clave
+    filtro, lodos = cycle.build()
+    first = cache.volume(filtro, lodos, 0.1, filtro.tf)
+    lodos.k = 3e-13
+    assert cache.volume(filtro, lodos, 0.1, filtro.tf) is not first
+
+
+def test_settings_are_part_of_the_key():
+    cache = stage_cache.StageCache()
+    filtro, lodos = cycle.build()
+    fixed = cache.volume(filtro, lodos, 0.1, filtro.tf)
+    adaptive = cache.volume(filtro, lodos, 0.1, filtro.tf, tol=1e-4)
+    assert adaptive.t.size != fixed.t.size
+    assert cache.stats()['filtration']['misses'] == 2
+
+    thickness = float(fixed.l[-1])
+    args = (filtro, lodos, thickness, RVDF.drum_filter_area(filtro.rd, filtro.L, 35), RVDF.angle_to_time(35, filtro.w), 2, 0, 0.1)
+    corr = cache.dewatering_process(*args)
+    fv = cache.dewatering_process(*args, model='fv')
+    assert fv.S != corr.S
+    assert fv.S == dewatering.dewatering_process(*args, model='fv').S
+    assert cache.dewatering_process(*args, model='fv') is fv
+
+
+def test_lru_eviction_by_bytes():
+    filtro, lodos = cycle.build()
+    size = stage_cache._nbytes(filtration.volume(filtro, lodos, 0.5, filtro.tf))
+    cache = stage_cache.StageCache(max_bytes=int(2.5*size))
+    results = [cache.volume(filtro, lodos, ts, filtro.tf) for ts in (0.5, 0.6, 0.7)]
+    assert cache.nbytes <= 2.5*size
+    assert cache.stats()['entries'] == 2
+    # la entrada más reciente sigue guardada, la más antigua se recalcula
+    assert cache.volume(filtro, lodos, 0.7, filtro.tf) is results[2]
+    assert cache.volume(filtro, lodos, 0.5, filtro.tf) is not results[0]
+
+
+def test_disk_tier(tmp_path):
+    first = stage_cache.StageCache(disk_dir=str(tmp_path)).cycle(ts=0.1)
+    other = stage_cache.StageCache(disk_dir=str(tmp_path))
+    assert other.cycle(ts=0.1) == first
+    stats = other.stats()
+    assert stats['filtration'] == {'hits': 0, 'disk_hits': 1, 'misses': 0}
+
+
+def test_code_version_invalidates_disk_tier(tmp_path, monkeypatch):
+    stage_cache.StageCache(disk_dir=str(tmp_path)).cycle(ts=0.1)
+    key = stage_cache.stage_key('Bx', [('Bx_0', 15)])
+    monkeypatch.setattr(stage_cache, 'CACHE_VERSION', stage_cache.CACHE_VERSION + 1)
+    stage_cache.code_salt.cache_clear()
+    try:
+        assert stage_cache.stage_key('Bx', [('Bx_0', 15)]) != key
+        other = stage_cache.StageCache(disk_dir=str(tmp_path))
+        other.cycle(ts=0.1)
+        assert other.stats()['filtration'] == {'hits': 0, 'disk_hits': 0, 'misses': 1}
+    finally:
+        stage_cache.code_salt.cache_clear()
+
+
+def test_cached_arrays_are_read_only():
+    cache = stage_cache.StageCache()
+    filtro, lodos = cycle.build()
+    res = cache.volume(filtro, lodos, 0.1, filtro.tf)
+    with pytest.raises(ValueError):
+        res.v[0] = 0
+
+
+def test_callable_parameters_are_rejected():
+    filtro, lodos = cycle.build()
+    filtro.Rm = lambda t: 1e11
+    with pytest.raises(TypeError):
+        stage_cache.StageCache().volume(filtro, lodos, 0.1, filtro.tf)
@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+from RVDF import RVDF
+import cycle
+from station import Station, STATION_FIELDS, DRUM_OUTPUTS
+
+""" ------ PRUEBAS: ESTACIÓN DE VARIOS TAMBORES (station.py) ------ """
+
+DRUMS = [{'w': 1.2}, {'w': 1.0}, {'w': 1.4, 'P_diff': 30000}]
+
+
+def wet_cake_model(p, ts):
+    # modelo propio de un tambor (a nivel de módulo para que sea picklable): la correlación con 5 % más de humedad
+    res = cycle.run_cycles(ts=ts, **p)
+    out = {name: float(v) for name, v in res.items()}
+    out['M'] *= 1.05
+    return out
+
+
+def test_drums_match_single_drum_cycles():
+    st = Station(DRUMS, capacity=20)
+    res = st.evaluate()
+    for i, drum in enumerate(DRUMS):
+        ref = cycle.run_cycles(**drum)
+        for name in ('Vf', 'M', 'Bx', 'pol', 'V_total', 'cycle_time'):
+            assert res[name][i] == pytest.approx(float(ref[name]), rel=1e-12), (i, name)
+
+
+def test_filtrate_density_on_some_drums():
+    # los tambores sin densidad propia la calculan con su Bx_0, como cycle.run_cycles
+    drums = [{'filtrate_dens': 1080.0}, {}, {'Bx_0': 12.0}]
+    st = Station(drums, capacity=3, Bx_0=14.0)
+    res = st.evaluate()
+    for i, drum in enumerate(drums):
+        ref = cycle.run_cycles(**dict({'Bx_0': 14.0}, **drum))
+        for name in ('rate', 'M', 'Bx', 'pol'):
+            assert res[name][i] == pytest.approx(float(ref[name]), rel=1e-12), (i, name)
+    for record in st.simulate(feed=5e-4, duration=120):
+        for name in ('rate', 'M', 'Bx'):
+            assert np.all(np.isfinite(record['drums'][name])) and np.isfinite(record[name]), name
+
+
+def test_wash_header_split_by_wash_area():
+    drums = [{'rd': 1.5}, {'rd': 1.2, 'L': 3.0}]
+    st = Station(drums, capacity=20, wash_header=0.004)
+    p = st.params
+    wsh_A = RVDF.drum_filter_area(p['rd'], p['L'], p['wsh_angle'])
+    assert np.sum(p['wsh_Q']) == pytest.approx(0.004)
+    np.testing.assert_allclose(p['wsh_Q']/wsh_A, p['wsh_Q'][0]/wsh_A[0])
+
+
+def test_records_and_weighted_quality():
+    st = Station(DRUMS, capacity=20)
+    records = list(st.simulate(feed=1.5e-3, duration=600, dt=60))
+    assert len(records) == 10
+    assert [r['step'] for r in records] == list(range(10))
+    first = records[0]
+    assert set(STATION_FIELDS) <= set(first) and set(first['drums']) == set(DRUM_OUTPUTS)
+
+    res = st.evaluate(first['nivel'], first['c'])
+    W = res['W_cake']
+    filtrate = (res['Vf'] + res['Vf_wsh'])*60/res['cycle_time']
+    assert first['pol'] == pytest.approx(np.sum(res['pol']*W)/np.sum(W))
+    assert first['M'] == pytest.approx(np.sum(res['M']*W)/np.sum(W))
+    assert first['Bx'] == pytest.approx(np.sum(res['Bx']*filtrate)/np.sum(filtrate))
+    assert min(first['drums']['pol']) <= first['pol'] <= max(first['drums']['pol'])
+
+
+def test_tank_drains_without_feed():
+    st = Station(DRUMS, capacity=20)
+    levels = [r['nivel'] for r in st.simulate(feed=0.0, duration=1800, dt=60)]
+    assert np.all(np.diff(levels) < 0)
+
+
+def test_custom_model_in_pool_matches_serial():
+    drums = DRUMS + [{'w': 1.1, 'model': wet_cake_model}]
+    serial = Station(drums, capacity=20).evaluate()
+    st = Station(drums, capacity=20)
+    records = list(st.simulate(feed=1.5e-3, duration=120, dt=60, workers=2))
+    assert records[0]['drums']['M'][3] == pytest.approx(serial['M'][3])
+    assert serial['M'][3] == pytest.approx(1.05*float(cycle.run_cycles(w=1.1)['M']))
+
+
+def test_invalid_drums():
+    with pytest.raises(ValueError):
+        Station([], capacity=20)
+    with pytest.raises(ValueError):
+        Station([{'nivel': 0.5}], capacity=20)
@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+import cycle
+import surrogate
+
+""" ------ PRUEBAS: TABLAS SUSTITUTAS (surrogate.py) ------ """
+
+AXES = {'P_diff': (10000, 60000, 6, 'lin'), 'w': (0.6, 2.0, 5, 'lin'), 'k': (5e-14, 5e-13, 5, 'log')}
+
+
+@pytest.fixture(scope='module')
+def table(tmp_path_factory):
+    return surrogate.build(str(tmp_path_factory.mktemp('tab') / 'cycle'), axes=AXES, validate=500, spline=True)
+
+
+def random_points(axes, n, seed):
+    rng = np.random.default_rng(seed)
+    return {name: surrogate._from_grid(rng.uniform(0, axis[2] - 1, n), axis) for name, axis in axes.items()}
+
+
+def test_nodes_reproduce_the_model(table):
+    nodes = np.meshgrid(*[surrogate._from_grid(np.arange(axis[2]), axis) for axis in AXES.values()], indexing='ij')
+    params = dict(zip(AXES, nodes))
+    ref = cycle.run_cycles(**params)
+    for method in ('linear', 'cubic'):
+        res = table(method, **params)
+        for name in ('M', 'pol', 'rate'):
+            np.testing.assert_allclose(res[name], ref[name], rtol=1e-9, err_msg=method + name)
+
+
+def test_linear_error_and_heuristic_coverage(table):
+    err = table.meta['error']['linear']
+    assert err['M']['p99_rel'] < 0.01 and err['S']['p99_rel'] < 0.01
+    for name in ('M', 'pol', 'S', 'Bx', 'rate'):
+        assert err[name]['coverage'] >= 0.95, name
+
+    # coverage es la fracción de puntos cuyo error no supera la estimación de estimate=True
+    params = random_points(AXES, 300, 5)
+    res = table(estimate=True, **params)
+    exact = cycle.run_cycles(**params)
+    stats = table.error(300, seed=5)
+    assert stats['M']['coverage'] == pytest.approx(np.mean(np.abs(res['M'] - exact['M']) <= res['M_err']))
+
+
+def test_bounds(table):
+    assert np.isnan(table(P_diff=70000, w=1.0, k=1e-13)['M'])
+    clipped = table(bounds='clip', P_diff=70000, w=1.0, k=1e-13)['M']
+    assert clipped == pytest.approx(float(table(P_diff=60000, w=1.0, k=1e-13)['M']))
+    with pytest.raises(TypeError):
+        table(P_diff=30000, w=1.0)
+
+
+def test_open_table_shares_the_file(table):
+    other = surrogate.open_table(table.path)
+    assert other.meta == table.meta and other.nbytes() == table.nbytes()
+    with pytest.raises(FileNotFoundError):
+        surrogate.open_table(table.path + '_missing')
+
+
+def test_fv_table(tmp_path):
+    # la comparación de tiempos con el modelo está en benchmarks/run.py (surrogate_fv, run_cycles_fv)
+    axes = {'P_diff': (10000, 60000, 4, 'lin'), 'k': (5e-14, 5e-13, 3, 'log')}
+    table = surrogate.build(str(tmp_path / 'fv'), axes=axes, model='fv', validate=20)
+    assert table.meta['model'] == 'fv' and table.meta['evaluator'] == 'cycle.run_cycles'
+    assert table.meta['error']['linear']['M']['p99_rel'] < 0.02
+
+    node = table(P_diff=10000, k=5e-14)['M']
+    assert node == pytest.approx(float(cycle.run_cycles(model='fv', P_diff=10000, k=5e-14)['M']), rel=1e-9)
+    assert node != pytest.approx(float(cycle.run_cycles(P_diff=10000, k=5e-14)['M']), rel=1e-6)
+
+
+def test_custom_evaluator_needs_evaluator_for_error(tmp_path):
+    def evaluator(ts=None, **params):
+        return {'twice': 2*params['P_diff']}
+
+    table = surrogate.build(str(tmp_path / 'custom'), axes={'P_diff': AXES['P_diff']}, outputs=('twice',),
+                            validate=10, evaluator=evaluator)
+    assert table.meta['model'] is None and table.meta['error']['linear']['twice']['max_rel'] < 1e-12
+    assert table(P_diff=12345.0)['twice'] == pytest.approx(24690.0)
+    with pytest.raises(ValueError):
+        table.error(10)
+
+
+def test_invalid_arguments(tmp_path):
+    with pytest.raises(ValueError):
+        surrogate.build(str(tmp_path / 'bad'), axes={'vacuum': (1, 2, 3, 'lin')})
+    with pytest.raises(ValueError):
+        surrogate.build(str(tmp_path / 'bad'), axes=AXES, model='wakeman')
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from RVDF import RVDF
+import cycle
+import dewatering
+import filtration
+import trajectory
+import process_simulation as ps
+
+""" ------ PRUEBAS: TRAYECTORIA PREASIGNADA DEL CICLO (trajectory.py) ------ """
+
+
+def appended_trajectory(filtro, lodos, wsh_Q, ts, method):
+    '''
+    CONSTRUCCIÓN ORIGINAL CON np.append (final de process_simulation.py en la versión base)
+    '''
+    rd, L, w = filtro.rd, filtro.L, filtro.w
+    form = filtration.volume(filtro, lodos, ts, filtro.tf, method)
+    v, thickness = form.v, float(form.l[-1])
+    dew1 = dewatering.dewatering_process(filtro, lodos, thickness, RVDF.drum_filter_area(rd, L, filtro.dew_angle1),
+                                         RVDF.angle_to_time(filtro.dew_angle1, w), 1, 0, ts)
+    dew2 = dewatering.dewatering_process(filtro, lodos, thickness, RVDF.drum_filter_area(rd, L, filtro.dew_angle2),
+                                         RVDF.angle_to_time(filtro.dew_angle2, w), 2, 0, ts)
+    arrays = np.append(v, dew1.V_filtrate_dew_arr + v[-1])
+    arrays = np.append(arrays, wsh_Q*np.arange(0, RVDF.angle_to_time(filtro.wsh_angle, w), ts) + arrays[-1])
+    arrays = np.append(arrays, dew2.V_filtrate_dew_arr + arrays[-1])
+    derivative = np.diff(arrays)/ts
+    return arrays, derivative
+
+
+@pytest.mark.parametrize('ts, rtol', [(0.1, 3e-5), (0.013, 1e-4)])
+def test_matches_baseline_within_odeint_error(ts, rtol):
+    # la versión base integraba la formación con odeint: la diferencia es el error de odeint (~2e-5 a ts = 0.1 s)
+    V, rate = appended_trajectory(ps.RVDF1, ps.LODOS_TORTA, ps.wsh_Q, ts, 'odeint')
+    traj = trajectory.cycle_trajectory(ps.RVDF1, ps.LODOS_TORTA, ps.wsh_Q, ts)
+    assert traj.size == V.size
+    np.testing.assert_allclose(traj['V'], V, rtol=rtol)
+    np.testing.assert_allclose(traj['t'], np.arange(V.size)*ts, rtol=1e-12)
+
+
+def test_preallocation_adds_no_error():
+    V, rate = appended_trajectory(ps.RVDF1, ps.LODOS_TORTA, ps.wsh_Q, 0.1, 'analytic')
+    traj = trajectory.cycle_trajectory(ps.RVDF1, ps.LODOS_TORTA, ps.wsh_Q, 0.1)
+    np.testing.assert_allclose(traj['V'], V, rtol=1e-12)
+    np.testing.assert_allclose(traj['rate'][:-1], rate, rtol=1e-9)
+    assert traj['rate'][-1] == traj['rate'][-2]
+
+
+def test_zones_in_order():
+    filtro, lodos = cycle.build()
+    traj = trajectory.cycle_trajectory(filtro, lodos, 0.0015, 0.1)
+    counts = [int(np.ceil(t/0.1)) for t in trajectory.zone_times(filtro)]
+    np.testing.assert_array_equal(traj['zone'], np.repeat(np.arange(4), counts))
+
+
+def test_repeated_cycles():
+    filtro, lodos = cycle.build()
+    one = trajectory.cycle_trajectory(filtro, lodos, 0.0015, 0.1)
+    three = trajectory.cycle_trajectory(filtro, lodos, 0.0015, 0.1, n_cycles=3)
+    n = one.size
+    assert three.size == 3*n
+    period = n*0.1
+    V_cycle = one['V'][-1]
+    for k in range(3):
+        np.testing.assert_allclose(three['t'][k*n:(k+1)*n], one['t'] + k*period, rtol=1e-12, atol=1e-12)
+        np.testing.assert_allclose(three['V'][k*n:(k+1)*n], one['V'] + k*V_cycle, rtol=1e-12)
+        np.testing.assert_array_equal(three['zone'][k*n:(k+1)*n], one['zone'])
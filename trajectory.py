@@ -0,0 +1,140 @@
+import numpy as np
+
+from RVDF import RVDF
+import filtration
+import dewatering
+
+""" ------ TRAYECTORIA DEL CICLO COMPLETO EN UN ARREGLO PREASIGNADO ------ """
+### Reemplaza la concatenación con append del final de process_simulation.py: se calcula el número de muestras
+### de cada zona, se reserva un único arreglo estructurado y cada zona se escribe en su tramo. La formación usa la
+### forma cerrada de Ruth, de modo que frente a los arreglos originales (odeint) V difiere en el error de odeint,
+### ~2e-5 relativo con ts = 0.1 s.
+
+ZONES = ('formation', 'dewatering1', 'washing', 'dewatering2')
+
+TRAJECTORY_DTYPE = np.dtype([
+    ('t', 'f8'),        # Tiempo [s]
+    ('V', 'f8'),        # Volumen filtrado acumulado [m3]
+    ('rate', 'f8'),     # Tasa de filtración [m3/s]
+    ('zone', 'u1'),     # Índice de la zona en ZONES
+])
+
+
+def zone_times(filtro):
+    '''
+    DURACIÓN DE CADA ZONA [s]: formación, secado 1, lavado, secado 2
+    '''
+    w = filtro.w
+    return (filtro.tf, RVDF.angle_to_time(filtro.dew_angle1, w), RVDF.angle_to_time(filtro.wsh_angle, w),
+            RVDF.angle_to_time(filtro.dew_angle2, w))
+
+
+def _adaptive_first_cycle(filtro,slurry,wsh_Q,tol,n_cycles):
+    '''
+    PRIMER CICLO EN MALLA ADAPTATIVA: cada zona con su propia malla (adaptive.refine) sobre [0, t_zona); el
+    punto final de cada zona coincide con el inicial de la siguiente y se omite, como en np.arange. El lavado es
+    lineal en el tiempo y solo necesita su punto inicial.
+    Retorna (traj, n, period, V_cycle).
+    '''
+    rd, L = filtro.rd, filtro.L
+    times = zone_times(filtro)
+    form = filtration.volume_series(filtro, slurry, times[0], tol)
+    thickness = float(form['l'][-1])
+    dew = [dewatering.dewatering_series(filtro, slurry, thickness, RVDF.drum_filter_area(rd, L, angle), t_zone, tol)
+           for angle, t_zone in ((filtro.dew_angle1, times[1]), (filtro.dew_angle2, times[3]))]
+    zones = [(form.t, form['v']), (dew[0].t, dew[0]['V_filtrate_dew']),
+             (np.array([0.0, times[2]]), np.array([0.0, times[2]*wsh_Q])), (dew[1].t, dew[1]['V_filtrate_dew'])]
+
+    bounds = np.cumsum([0] + [t.size - 1 for t, _ in zones])
+    n = int(bounds[-1])
+    traj = np.empty(n*n_cycles, dtype=TRAJECTORY_DTYPE)
+    first = traj[:n]
+    start = np.cumsum((0.0,) + times[:-1])
+    V_start = 0.0
+    for i, (t, V) in enumerate(zones):
+        seg = first[bounds[i]:bounds[i+1]]
+        seg['zone'] = i
+        np.add(t[:-1], start[i], out=seg['t'])
+        np.add(V[:-1], V_start, out=seg['V'])
+        V_start += V[-1]
+    return traj, n, float(sum(times)), V_start
+
+
+def _repeat_cycles(traj,n,period,V_cycle):
+    '''
+    COMPLETA LOS CICLOS SIGUIENTES A PARTIR DEL PRIMERO (traj[:n]) Y LA TASA DE FILTRACIÓN
+    period: Duración de un ciclo [s]
+    V_cycle: Volumen filtrado en un ciclo [m3]
+    '''
+    first = traj[:n]
+    n_cycles = traj.size//n if n else 1
+
+    #### CICLOS SIGUIENTES: mismo perfil desplazado en tiempo y volumen ####
+    if n_cycles > 1:
+        cycles = traj.reshape(n_cycles, n)
+        offsets = np.arange(1, n_cycles)[:, None]
+        cycles['t'][1:] = first['t'] + offsets*period
+        cycles['V'][1:] = first['V'] + offsets*V_cycle
+        cycles['zone'][1:] = first['zone']
+
+    #### TASA DE FILTRACIÓN (diferencias hacia adelante) ####
+    rate = traj['rate']
+    if traj.size > 1:
+        np.subtract(traj['V'][1:], traj['V'][:-1], out=rate[:-1])
+        rate[:-1] /= np.diff(traj['t'])
+        rate[-1] = rate[-2]
+    else:
+        rate[:] = 0.0
+
+    return traj
+
+
+def cycle_trajectory(filtro,slurry,wsh_Q,ts,n_cycles=1,tol=None):
+    '''
+    TRAYECTORIA DEL VOLUMEN FILTRADO EN UNO O VARIOS CICLOS
+    filtro: RVDF (con ángulo real de filtración, Af y tf)
+    slurry: slurry_cake
+    wsh_Q: Tasa de lavado con agua [m3/s]
+    ts: Tiempo de muestreo [s]
+    n_cycles: Número de ciclos consecutivos
+    tol: None (muestras cada ts) o tolerancia relativa de la malla adaptativa (ts se ignora)
+    Retorna un arreglo estructurado con campos t, V, rate y zone (TRAJECTORY_DTYPE).
+    '''
+    if tol is not None:
+        return _repeat_cycles(*_adaptive_first_cycle(filtro, slurry, wsh_Q, tol, n_cycles))
+
+    rd, L = filtro.rd, filtro.L
+    counts = [int(np.ceil(t_zone/ts)) for t_zone in zone_times(filtro)]      # muestras de np.arange(0, t, ts)
+    bounds = np.cumsum([0] + counts)
+    n = int(bounds[-1])
+
+    traj = np.empty(n*n_cycles, dtype=TRAJECTORY_DTYPE)
+    first = traj[:n]
+    V = first['V']
+
+    for i in range(len(ZONES)):
+        first['zone'][bounds[i]:bounds[i+1]] = i
+        first['t'][bounds[i]:bounds[i+1]] = np.arange(counts[i])*ts     # tiempo local de la zona
+
+    #### FORMACIÓN DE LA TORTA ####
+    seg = V[bounds[0]:bounds[1]]
+    v = filtration.ruth_volume(first['t'][bounds[0]:bounds[1]], filtro.P_diff, filtro.Af, slurry.u, slurry.alpha,
+                               slurry.c, filtro.Rm)
+    seg[:] = v
+    thickness = float(filtration.cake_thickness(seg[-1], filtro.Af, slurry.alpha, slurry.c, slurry.k))
+
+    #### SECADO 1, LAVADO Y SECADO 2 ####
+    def dewatering_zone(i, angle):
+        t = first['t'][bounds[i]:bounds[i+1]]
+        V_dew = dewatering.dewatering_state(filtro.P_diff, slurry.epsilon, slurry.alpha, slurry.solid_dens,
+                                            slurry.filtrate_dens, slurry.surface_tension, slurry.u, slurry.k,
+                                            thickness, RVDF.drum_filter_area(rd, L, angle), t, t[-1])[3]
+        np.add(V_dew, V[bounds[i]-1], out=V[bounds[i]:bounds[i+1]])
+
+    dewatering_zone(1, filtro.dew_angle1)
+    np.multiply(first['t'][bounds[2]:bounds[3]], wsh_Q, out=V[bounds[2]:bounds[3]])
+    V[bounds[2]:bounds[3]] += V[bounds[2]-1]
+    dewatering_zone(3, filtro.dew_angle2)
+
+    first['t'] = np.arange(n)*ts      # tiempo continuo del ciclo, como times_array en process_simulation.py
+    return _repeat_cycles(traj, n, n*ts, V[-1])